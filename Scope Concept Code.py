@@ -1,28 +1,3037 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, ttk
 import os
 import shutil
-from collections import Counter
+from collections import Counter, deque
 import re
 import datetime
 import json
 import sys
-from tkinter import font
+import io
+import time
+import queue
+import threading
+import multiprocessing
+import concurrent.futures
+import errno
+import mmap
+import hashlib
+import tempfile
+import sqlite3
+import contextlib
+import bisect
+import array
+import zlib
+import gzip
+import bz2
+import lzma
+import struct
+import tarfile
+import zipfile
+import stat
+import argparse
+import math
+import urllib.parse
+import cProfile
+import pstats
+import tracemalloc
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; stage memory is then only measured with tracemalloc
+    resource = None
+
+try:
+    import zstandard
+except ImportError:  # Optional; only needed to export and import .tar.zst archives
+    zstandard = None
+
+
+def _user_cache_dir():
+    """Returns Scope's folder in the per-user cache directory of the platform."""
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "Scope", "Cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/Scope")
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "scope")
+
 
 # --- Global Data Storage and Configuration ---
 SESSIONS_INDEX_FILE = "scope_sessions_index_file.json"
+SESSION_SUMMARY_CACHE_FILE = "scope_sessions_summaries.json"  # Session list summaries, kept beside the index
 EXCEPTION_DEFINITIONS_FILE = "exceptions_data.json"
 SESSION_BASE_DIR = "Scope_Sessions"
 SESSION_DATA_FILENAME = "session.json"
+SESSION_STATE_FILENAME = "session_state.json"
+SESSION_LOG_INDEX_FILENAME = "log_index.db"
 SESSION_LOGS_SUBDIR = "logs"
+# "json" keeps each session in its folder; "sqlite" keeps them all in SESSION_DB_FILE.
+SESSION_STORE = os.environ.get("SCOPE_SESSION_STORE", "json")
+SESSION_DB_FILE = "scope_sessions.db"
 
 ESCALATION_TEMPLATE_FILE = "EscalationTemplate.md"
 
+# Number of worker processes used to analyze selected log files in parallel.
+# Set SCOPE_ANALYSIS_WORKERS=1 to analyze files one after another in the Scope process.
+ANALYSIS_WORKERS = int(os.environ.get("SCOPE_ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1
+ANALYSIS_PROGRESS_INTERVAL = 4 * 1024 * 1024  # Bytes scanned between progress reports / cancel checks
+ANALYSIS_POLL_INTERVAL_MS = 100
+# Per-file analysis results are kept here and reused for logs analyzed before; an empty value turns the cache off
+ANALYSIS_CACHE_DIR = os.environ.get("SCOPE_ANALYSIS_CACHE_DIR", os.path.join(_user_cache_dir(), "analysis"))
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get("SCOPE_ANALYSIS_CACHE_MAX_MB", "1024")) * 1024 * 1024  # Least recently used entries are evicted beyond this
+EXPORT_DEFLATE_LEVEL = 6  # Default zlib level for zip exports
+EXPORT_ZSTD_LEVEL = 3
+NOTES_AUTOSAVE_DELAY_MS = 750  # Notes are saved once typing has paused this long
+SEARCH_DELAY_MS = 150  # The trace list is searched once typing has paused this long
+NOTES_FORMAT_DELAY_MS = 100  # Notes markup is re-tagged once typing has paused this long
+# With more search hits than this in the displayed trace, only the lines in view (plus a margin)
+# are highlighted, and the highlight follows scrolling.
+TRACE_HIGHLIGHT_VISIBLE_ONLY_HITS = 2000
+TRACE_HIGHLIGHT_MARGIN_LINES = 200
+
+# --- Stack Trace Extraction ---
+# Traces are found by classifying log lines one at a time: a header line opens a trace,
+# and the trace closes at the first line that starts a new log record. Every check is
+# anchored at a line start, so a log is processed in a single linear pass.
+TRACEBACK_HEADER = "Traceback (most recent call last):"
+EXCEPTION_SUFFIX_PATTERN = re.compile(r"(?:Error|Exception|Warning|Throwable)(?=[:\s]|$)")
+EXCEPTION_NAME_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.")
+EXCEPTION_SEGMENT_START_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+# Lines that continue a Java trace after a blank line ("at ...", "Caused by:", "... N more").
+TRACE_CONTINUATION_PATTERN = re.compile(r"(?:\s*at\s+|Caused by:|\s*\.\.\.\s+\d+\s+more\s*$)", re.MULTILINE)
+# Lines that start a new record ("ERROR: ...", a date) or close a wrapped message ("))", ")}").
+TRACE_TERMINATOR_PATTERN = re.compile(r"\s*(?:[A-Z]+:\s+\S+|\d{4}-\d{2}-\d{2})|\s*\)\s*\}\s*$|\s*\)\s*\)\s*$", re.MULTILINE)
+TRACEBACK_TERMINATOR_PATTERN = re.compile(r"[A-Z]+:\s+\S+|\d{4}-\d{2}-\d{2}")
+
+
+def _is_blank(line):
+    return not line or line.isspace()
+
+
+def _find_exception_name_start(line, suffix_match):
+    """Returns where the dotted exception name ending at suffix_match starts, or None.
+    Only the name's own characters are visited, which keeps header detection linear."""
+    token_start = suffix_match.start()
+    while token_start > 0 and line[token_start - 1] in EXCEPTION_NAME_CHARS:
+        token_start -= 1
+    if (line.rfind(".", token_start, suffix_match.start()) + 1 or token_start) == suffix_match.start():
+        return None  # A bare "Error"/"Exception" is not a class name.
+    name_start = None
+    segment_end = suffix_match.end()
+    while True:
+        segment_start = line.rfind(".", token_start, segment_end) + 1 or token_start
+        if segment_start == segment_end or line[segment_start] not in EXCEPTION_SEGMENT_START_CHARS:
+            break
+        name_start = segment_start
+        if segment_start == token_start:
+            break
+        segment_end = segment_start - 1
+    if name_start == token_start and token_start > 0:
+        preceding_char = line[token_start - 1]
+        if preceding_char.isalnum() or preceding_char == "_":
+            # No word boundary before the name: it can only start after its first dot.
+            first_dot = line.find(".", token_start, suffix_match.end())
+            name_start = first_dot + 1 if first_dot != -1 and first_dot + 1 < suffix_match.end() else None
+    return name_start
+
+
+def _find_trace_header(line):
+    """Returns (start, end, is_traceback) for the first trace header on a line, or None."""
+    traceback_start = line.find(TRACEBACK_HEADER)
+    for suffix_match in EXCEPTION_SUFFIX_PATTERN.finditer(line):
+        if traceback_start != -1 and suffix_match.start() >= traceback_start:
+            break
+        name_start = _find_exception_name_start(line, suffix_match)
+        if name_start is not None:
+            return name_start, suffix_match.end(), False
+    if traceback_start != -1:
+        return traceback_start, traceback_start + len(TRACEBACK_HEADER), True
+    return None
+
+
+class _LineLookahead:
+    """Buffers just enough upcoming lines from a line iterator to classify the current one."""
+
+    def __init__(self, lines, track_line_starts=False):
+        self._lines = iter(lines)
+        self._skip_to_candidate = getattr(self._lines, "skip_to_candidate", None)
+        self._buffer = []
+        self._line_starts = [] if track_line_starts else None  # The line source's line_start for each buffered line
+        self._base = 0
+        self._exhausted = False
+        self._nonblank_run = (0, None)
+        self._terminator_cache = {}
+
+    def get(self, index):
+        while index - self._base >= len(self._buffer):
+            if self._exhausted:
+                return None
+            if not self._buffer and self._skip_to_candidate:
+                # Nothing is pending, so the parser is between traces and may jump ahead.
+                self._skip_to_candidate()
+            line = next(self._lines, None)
+            if line is None:
+                self._exhausted = True
+                return None
+            if not line.endswith("\n"):
+                line += "\n"
+            self._buffer.append(line)
+            if self._line_starts is not None:
+                self._line_starts.append(self._lines.line_start)
+        return self._buffer[index - self._base]
+
+    def line_start(self, index):
+        return self._line_starts[index - self._base]
+
+    def release(self, index):
+        del self._buffer[:index - self._base]
+        if self._line_starts is not None:
+            del self._line_starts[:index - self._base]
+        self._base = index
+        self._terminator_cache = {k: v for k, v in self._terminator_cache.items() if k >= index}
+
+    def next_nonblank(self, index):
+        run_start, run_end = self._nonblank_run
+        if run_end is not None and run_start <= index <= run_end:
+            return run_end
+        probe = index
+        while True:
+            line = self.get(probe)
+            if line is None:
+                return None
+            if not _is_blank(line):
+                self._nonblank_run = (index, probe)
+                return probe
+            probe += 1
+
+    def window(self, index, nonblank_lines):
+        """Joins lines from index onward until nonblank_lines non-blank lines are included."""
+        parts = []
+        while nonblank_lines and (line := self.get(index)) is not None:
+            parts.append(line)
+            if not _is_blank(line):
+                nonblank_lines -= 1
+            index += 1
+        return "".join(parts)
+
+    def starts_record_after_blank(self, index):
+        line = self.get(index)
+        if line is None or line[0].isspace():
+            return False
+        return not TRACE_CONTINUATION_PATTERN.match(self.window(index, 3))
+
+    def ends_java_trace(self, index):
+        line = self.get(index)
+        if line is None:
+            return True
+        if line == "\n" and self.starts_record_after_blank(index + 1):
+            return True
+        nonblank_index = self.next_nonblank(index)
+        if nonblank_index is None:
+            return False
+        if nonblank_index not in self._terminator_cache:
+            self._terminator_cache[nonblank_index] = bool(TRACE_TERMINATOR_PATTERN.match(self.window(nonblank_index, 2)))
+        return self._terminator_cache[nonblank_index]
+
+    def ends_traceback(self, index):
+        line = self.get(index)
+        return line is not None and not line[0].isspace() and bool(TRACEBACK_TERMINATOR_PATTERN.match(self.window(index, 2)))
+
+
+def iter_stack_traces(lines, trace_starts=None):
+    """Yields each stack trace in an iterable of log lines as soon as it completes.
+
+    Java traces run from the exception name until a line that starts a new log record;
+    Python tracebacks run until a line starting with a date or an upper-case "LEVEL:".
+    Only the trace in progress and a few lookahead lines are held in memory.
+    If a list is given as trace_starts, the line source's line_start for the line each trace
+    starts on is appended to it before the trace is yielded."""
+    lookahead = _LineLookahead(lines, trace_starts is not None)
+    index = 0
+    while (line := lookahead.get(index)) is not None:
+        header = _find_trace_header(line)
+        if header is None:
+            index += 1
+            lookahead.release(index)
+            continue
+        if trace_starts is not None:
+            trace_starts.append(lookahead.line_start(index))
+        start, end, is_traceback = header
+        trace_lines = [line[start:]]
+        if is_traceback:
+            while True:
+                if lookahead.get(index + 1) is None:
+                    yield "".join(trace_lines)
+                    break
+                if lookahead.ends_traceback(index + 1):
+                    yield "".join(trace_lines)[:-1]
+                    break
+                index += 1
+                trace_lines.append(lookahead.get(index))
+            index += 1
+        elif end == len(line) - 1 and lookahead.starts_record_after_blank(index + 1):
+            yield line[start:end]
+            index += 1
+        else:
+            index += 1
+            while not lookahead.ends_java_trace(index):
+                trace_lines.append(lookahead.get(index))
+                index += 1
+            yield "".join(trace_lines)
+        lookahead.release(index)
+
+
+# --- Stack Trace Classification ---
+FULL_EXCEPTION_NAME_PATTERN = re.compile(
+    r'\b(?:[a-zA-Z_][a-zA-Z0-9_]*\.)*[a-zA-Z_][a-zA-Z0-9_]*(?:Error|Exception|Warning|Throwable|RuntimeException)\b(?=:\s|$)'
+)
+SIMPLE_EXCEPTION_NAME_PATTERN = re.compile(
+    r'([a-zA-Z_][a-zA-Z0-9_]*(?:Error|Exception|Warning|Throwable|RuntimeException))\b$'
+)
+
+
+class PackageKeyIndex:
+    """Aho-Corasick automaton over the package keys of exception_definitions (dotted keys
+    without a "weighting"). longest_match returns the longest key contained in a name, the
+    earliest defined one on ties, in time proportional to the length of the name."""
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self.transitions = [{}]
+        self.fail = [0]
+        self.best_output = [None]  # (length, definition order, key) of the longest key ending at the node
+        for order, (defined_key, def_data) in enumerate(definitions.items()):
+            if "." not in defined_key or "weighting" in def_data:
+                continue
+            node = 0
+            for ch in defined_key:
+                next_node = self.transitions[node].get(ch)
+                if next_node is None:
+                    next_node = self.transitions[node][ch] = len(self.transitions)
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.best_output.append(None)
+                node = next_node
+            self.best_output[node] = (len(defined_key), order, defined_key)
+
+        pending = list(self.transitions[0].values())
+        for node in pending:  # Breadth first, so a node's fail target is always finished before it
+            for ch, child in self.transitions[node].items():
+                fail_node = self.fail[node]
+                while fail_node and ch not in self.transitions[fail_node]:
+                    fail_node = self.fail[fail_node]
+                self.fail[child] = self.transitions[fail_node].get(ch, 0)
+                if self.best_output[child] is None:
+                    self.best_output[child] = self.best_output[self.fail[child]]
+                pending.append(child)
+
+    def longest_match(self, name):
+        best = None
+        node = 0
+        for ch in name:
+            while node and ch not in self.transitions[node]:
+                node = self.fail[node]
+            node = self.transitions[node].get(ch, 0)
+            output = self.best_output[node]
+            if output and (best is None or output[0] > best[0] or (output[0] == best[0] and output[1] < best[1])):
+                best = output
+        return best[2] if best else None
+
+
+_package_key_index = None
+
+
+def _get_package_key_index():
+    """Returns the index for the current exception_definitions, building it when they were (re)loaded."""
+    global _package_key_index
+    if _package_key_index is None or _package_key_index.definitions is not exception_definitions:
+        _package_key_index = PackageKeyIndex(exception_definitions)
+    return _package_key_index
+
+
+def load_exception_definitions():
+    global exception_definitions
+    if not os.path.exists(EXCEPTION_DEFINITIONS_FILE):
+        raise FileNotFoundError(f"Exception definitions file '{EXCEPTION_DEFINITIONS_FILE}' not found.")
+    try:
+        with open(EXCEPTION_DEFINITIONS_FILE, 'r', encoding='utf-8') as f:
+            exception_definitions = json.load(f)
+        _get_package_key_index()
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Failed to parse JSON in '{EXCEPTION_DEFINITIONS_FILE}': {e}")
+    except Exception as e:
+        raise RuntimeError(f"Failed to load exception definitions from '{EXCEPTION_DEFINITIONS_FILE}': {e}")
+
+
+def classify_stack_trace(trace_content):
+    """Returns the weight, display name and definition keys for a single stack trace."""
+    displayed_exception_name = "Unknown Error"
+
+    best_exception_class_key = None
+    best_log_package_key = None
+
+    highest_exc_weight = 0
+
+    extracted_full_name_from_log = None
+    extracted_simple_name_from_log = None
+
+    lines = trace_content.split('\n')
+    for line in lines:
+        full_match = FULL_EXCEPTION_NAME_PATTERN.search(line)
+        if full_match:
+            extracted_full_name_from_log = full_match.group(0)
+            simple_match = SIMPLE_EXCEPTION_NAME_PATTERN.search(extracted_full_name_from_log)
+            if simple_match:
+                extracted_simple_name_from_log = simple_match.group(1)
+            break
+
+    if extracted_full_name_from_log:
+        displayed_exception_name = extracted_full_name_from_log
+
+        if extracted_simple_name_from_log and extracted_simple_name_from_log in exception_definitions:
+            def_data = exception_definitions[extracted_simple_name_from_log]
+            if "weighting" in def_data:
+                best_exception_class_key = extracted_simple_name_from_log
+                highest_exc_weight = def_data["weighting"]
+
+        best_log_package_key = _get_package_key_index().longest_match(extracted_full_name_from_log)
+
+    return {
+        "weight": max(highest_exc_weight, 1),
+        "exception_name": displayed_exception_name,
+        "exception_class_key": best_exception_class_key,
+        "log_package_key": best_log_package_key
+    }
+
+
+# --- Stack Trace Fingerprinting ---
+# Traces that differ only in run-specific details (query IDs, timestamps, addresses, thread
+# numbers, "... N more" counts) are grouped under one fingerprint, computed from the trace text
+# after these rules are applied in order. Rules can be replaced by a TRACE_NORMALIZATION_FILE
+# holding a list of {"name", "pattern", "replacement"} objects; an empty list disables grouping.
+DEFAULT_TRACE_NORMALIZATION_RULES = [
+    {"name": "query_id", "pattern": r"\b\d{8}_\d{6}_\d{5}_[a-z0-9]{5}\b", "replacement": "<query_id>"},
+    {"name": "uuid", "pattern": r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b", "replacement": "<uuid>"},
+    {"name": "timestamp", "pattern": r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?", "replacement": "<timestamp>"},
+    {"name": "hex_address", "pattern": r"\b0x[0-9a-fA-F]+\b|(?<=@)[0-9a-fA-F]{6,}\b", "replacement": "<hex>"},
+    {"name": "thread_name", "pattern": r"\b(pool|Thread|thread|worker|executor|dispatcher|scheduler)-\d+(?:-thread-\d+)?\b", "replacement": r"\1-<n>"},
+    {"name": "more_frames", "pattern": r"\.\.\.\s+\d+\s+more\b", "replacement": "... <n> more"},
+    {"name": "long_number", "pattern": r"\b\d{6,}\b", "replacement": "<n>"},
+]
+TRACE_NORMALIZATION_FILE = "trace_normalization.json"
+
+
+def compile_trace_normalization_rules(rules):
+    return [(re.compile(rule["pattern"]), rule["replacement"]) for rule in rules]
+
+
+trace_normalization_rules = compile_trace_normalization_rules(DEFAULT_TRACE_NORMALIZATION_RULES)
+
+
+def load_trace_normalization_rules():
+    global trace_normalization_rules
+    if not os.path.exists(TRACE_NORMALIZATION_FILE):
+        return  # Keep DEFAULT_TRACE_NORMALIZATION_RULES
+    try:
+        with open(TRACE_NORMALIZATION_FILE, 'r', encoding='utf-8') as f:
+            trace_normalization_rules = compile_trace_normalization_rules(json.load(f))
+    except json.JSONDecodeError as e:
+        raise RuntimeError(f"Failed to parse JSON in '{TRACE_NORMALIZATION_FILE}': {e}")
+    except Exception as e:
+        raise RuntimeError(f"Failed to load trace normalization rules from '{TRACE_NORMALIZATION_FILE}': {e}")
+
+
+def normalize_stack_trace(trace_content):
+    for pattern, replacement in trace_normalization_rules:
+        trace_content = pattern.sub(replacement, trace_content)
+    return trace_content
+
+
+def _trace_digest(trace_content):
+    return hashlib.blake2b(trace_content.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+
+
+def fingerprint_stack_trace(trace_content):
+    return hashlib.blake2b(normalize_stack_trace(trace_content).encode('utf-8', 'surrogatepass'), digest_size=8).hexdigest()
+
+
+class _TraceGroups:
+    """Groups trace occurrences by fingerprint. Each group keeps the first body seen as its
+    representative, the occurrence count and the digests of the distinct bodies (variants)."""
+
+    def __init__(self):
+        self.groups = {}
+        self._fingerprints = {}  # Variant digest -> fingerprint, so repeated bodies skip normalization
+
+    def add(self, trace_content):
+        digest = _trace_digest(trace_content)
+        fingerprint = self._fingerprints.get(digest)
+        if fingerprint is None:
+            fingerprint = self._fingerprints[digest] = fingerprint_stack_trace(trace_content)
+        group = self.groups.get(fingerprint)
+        if group is None:
+            group = self.groups[fingerprint] = [trace_content, 0, set()]
+        group[1] += 1
+        group[2].add(digest)
+        return fingerprint
+
+
+# --- Pipeline Instrumentation ---
+# Every analysis records the wall time, bytes processed and peak memory of each stage and saves
+# them to ANALYSIS_PROFILE_FILENAME in the session folder. Stages run by the worker processes are
+# added up over the files, so with several workers they can sum to more than the total time.
+# A stage's memory is how far it raised the RSS of the process running it above the RSS at its
+# start: to the process's new peak if the stage set one, otherwise to the RSS when it ended. With
+# SCOPE_PROFILE_TRACEMALLOC=1 it is the peak of Python allocations during the stage above those at
+# its start instead (which is slower). The process's overall peak RSS is saved with each run.
+# SCOPE_PROFILE_STAGE names a stage to run under cProfile, or is "slowest" to profile them all and
+# keep the slowest; its stats are saved as analysis_<stage>.prof beside the profile.
+ANALYSIS_PROFILE_FILENAME = "analysis_profile.json"
+PROFILE_STAGE = os.environ.get("SCOPE_PROFILE_STAGE", "")
+PROFILE_TRACEMALLOC = os.environ.get("SCOPE_PROFILE_TRACEMALLOC") == "1"
+ANALYSIS_STAGES = ("read", "copy", "extraction", "occurrences", "classification", "cache_write", "aggregation", "index", "json_dump", "dashboard")
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, KiB elsewhere
+
+
+def _current_rss_bytes():
+    """Returns the resident set size of this process, or None where /proc/self/statm is not available."""
+    try:
+        with open("/proc/self/statm", 'rb') as f:
+            return int(f.read().split()[1]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _memory_sample():
+    if PROFILE_TRACEMALLOC:
+        return tracemalloc.get_traced_memory()[0], None
+    return _current_rss_bytes(), _peak_rss_bytes()
+
+
+def _memory_increase(before, after):
+    """Bytes by which a stage raised memory above the sample before it was run, given the samples
+    (current, peak) taken before and after it (see the comment above)."""
+    if PROFILE_TRACEMALLOC:
+        return max(after[0] - before[0], 0)
+    (rss_before, peak_before), (rss_after, peak_after) = before, after
+    if peak_before is None:
+        return None if rss_before is None else max(rss_after - rss_before, 0)
+    if rss_before is None:
+        return peak_after - peak_before  # Only the growth of the process peak is known
+    return max((peak_after if peak_after > peak_before else rss_after) - rss_before, 0)
+
+
+class PipelineProfile:
+    """Wall time, bytes and memory increase per analysis stage, added up over every run of the stage
+    (the memory increase is the largest of any run)."""
+
+    def __init__(self, task=""):
+        self.task = task
+        self.started_at = datetime.datetime.now().isoformat(timespec='seconds')
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.profiled_stage = None  # Stage whose cProfile stats were saved
+
+    @contextlib.contextmanager
+    def stage(self, name, byte_count=0):
+        """Times the body as stage name. Yields a dict whose "bytes" the body can set once it knows them."""
+        metrics = {"bytes": byte_count}
+        profiler = cProfile.Profile() if PROFILE_STAGE in (name, "slowest") else None
+        if PROFILE_TRACEMALLOC:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        memory_before = _memory_sample()
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield metrics
+        finally:
+            if profiler:
+                profiler.disable()
+        seconds = time.perf_counter() - started
+        memory_after = (tracemalloc.get_traced_memory()[1], None) if PROFILE_TRACEMALLOC else _memory_sample()
+        profile_path = None
+        if profiler:
+            fd, profile_path = tempfile.mkstemp(prefix="scope_profile_", suffix=".prof")
+            os.close(fd)
+            profiler.dump_stats(profile_path)
+        self.add(name, {"seconds": seconds, "bytes": metrics["bytes"], "runs": 1,
+                        "memory_increase": _memory_increase(memory_before, memory_after),
+                        "profile_paths": [profile_path] if profile_path else []})
+
+    def add(self, name, stage):
+        totals = self.stages.get(name)
+        if totals is None:
+            self.stages[name] = {**stage, "profile_paths": list(stage["profile_paths"])}
+            return
+        totals["seconds"] += stage["seconds"]
+        totals["bytes"] += stage["bytes"]
+        totals["runs"] += stage["runs"]
+        if stage["memory_increase"] is not None:
+            totals["memory_increase"] = max(totals["memory_increase"] or 0, stage["memory_increase"])
+        totals["profile_paths"] += stage["profile_paths"]
+
+    def merge(self, stages):
+        for name, stage in stages.items():
+            self.add(name, stage)
+
+    def discard_profiles(self):
+        """Removes the cProfile stats of stages that will not be saved."""
+        for stage in self.stages.values():
+            for profile_path in stage["profile_paths"]:
+                with contextlib.suppress(OSError):
+                    os.remove(profile_path)
+            stage["profile_paths"] = []
+
+    def _ordered_stages(self):
+        return sorted(self.stages.items(), key=lambda item: ANALYSIS_STAGES.index(item[0]) if item[0] in ANALYSIS_STAGES else len(ANALYSIS_STAGES))
+
+    def summary_lines(self):
+        lines = [f"Stage timings ({time.perf_counter() - self.started:,.1f} s in total):"]
+        for name, stage in self._ordered_stages():
+            line = f"  {name:<15}{stage['seconds']:9.2f} s"
+            if stage["bytes"]:
+                megabytes = stage["bytes"] / (1024 * 1024)
+                line += f"{megabytes:11,.1f} MB{megabytes / max(stage['seconds'], 1e-9):9,.1f} MB/s"
+            else:
+                line += " " * 28
+            if stage["memory_increase"] is not None:
+                line += f"  memory +{stage['memory_increase'] / (1024 * 1024):,.0f} MB"
+            lines.append(line)
+        peak_rss = _peak_rss_bytes()
+        if peak_rss is not None:
+            lines.append(f"  Peak RSS of the Scope process: {peak_rss / (1024 * 1024):,.0f} MB")
+        return lines
+
+    def save(self, session_root_path):
+        """Adds this run to the session's ANALYSIS_PROFILE_FILENAME, replacing an earlier save of the
+        same run, and saves the cProfile stats of the profiled stage."""
+        profiled = {name: stage["profile_paths"] for name, stage in self.stages.items() if stage["profile_paths"]}
+        if profiled:
+            slowest = max(profiled, key=lambda name: self.stages[name]["seconds"])
+            if self.profiled_stage is None or self.stages[slowest]["seconds"] > self.stages[self.profiled_stage]["seconds"]:
+                if self.profiled_stage:
+                    with contextlib.suppress(OSError):
+                        os.remove(os.path.join(session_root_path, f"analysis_{self.profiled_stage}.prof"))
+                pstats.Stats(*profiled[slowest]).dump_stats(os.path.join(session_root_path, f"analysis_{slowest}.prof"))
+                self.profiled_stage = slowest
+            self.discard_profiles()
+
+        profile_path = os.path.join(session_root_path, ANALYSIS_PROFILE_FILENAME)
+        try:
+            with open(profile_path, 'r', encoding='utf-8') as f:
+                runs = json.load(f)
+        except (OSError, ValueError):
+            runs = []
+        peak_rss = _peak_rss_bytes()
+        run = {"task": self.task, "started_at": self.started_at, "total_seconds": round(time.perf_counter() - self.started, 3),
+               "memory_measure": "tracemalloc" if PROFILE_TRACEMALLOC else "rss", "profiled_stage": self.profiled_stage,
+               "process_peak_rss_mb": None if peak_rss is None else round(peak_rss / (1024 * 1024), 1),
+               "stages": {name: {"seconds": round(stage["seconds"], 3), "bytes": stage["bytes"], "runs": stage["runs"],
+                                 "memory_increase_mb": None if stage["memory_increase"] is None else round(stage["memory_increase"] / (1024 * 1024), 1)}
+                          for name, stage in self._ordered_stages()}}
+        write_json_atomic(profile_path, [old_run for old_run in runs if old_run.get("started_at") != self.started_at] + [run])
+
+
+_analysis_profile = None  # PipelineProfile of the running analysis job, set by _run_profiled_job
+
+
+def _profile_stage(name, byte_count=0):
+    """PipelineProfile.stage of the running job's profile, or a no-op outside of profiled jobs."""
+    if _analysis_profile is None:
+        return contextlib.nullcontext({"bytes": byte_count})
+    return _analysis_profile.stage(name, byte_count)
+
+
+def _run_profiled_job(function, job):
+    """Calls function(*job) with its stages recorded. Returns (result, stages)."""
+    global _analysis_profile
+    _analysis_profile = PipelineProfile()
+    try:
+        return function(*job), _analysis_profile.stages
+    except BaseException:
+        _analysis_profile.discard_profiles()
+        raise
+    finally:
+        _analysis_profile = None
+
+
+# --- Parallel Analysis ---
+class AnalysisCancelled(Exception):
+    """Raised inside a running analysis once the user presses Cancel."""
+
+
+# Set in each worker process (and in the Scope process for serial analysis) so that
+# analyze_log_file can report progress and notice cancellation.
+_analysis_progress_queue = None
+_analysis_cancel_event = None
+
+
+class _AnalysisProgress:
+    def __init__(self):
+        self.pending_bytes = 0
+        self.pending_traces = 0
+
+    def advance(self, byte_count):
+        self.pending_bytes += byte_count
+        if self.pending_bytes >= ANALYSIS_PROGRESS_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if _analysis_cancel_event is not None and _analysis_cancel_event.is_set():
+            raise AnalysisCancelled()
+        if _analysis_progress_queue is not None and (self.pending_bytes or self.pending_traces):
+            _analysis_progress_queue.put(("progress", self.pending_bytes, self.pending_traces))
+        self.pending_bytes = 0
+        self.pending_traces = 0
+
+
+# A line can only open a trace if it contains one of these; any other line is skipped
+# without being decoded while no trace is in progress.
+TRACE_PREFILTER_LITERALS = (b"Exception", b"Error", b"Throwable", b"Warning", b"Traceback")
+
+
+class _MappedLogLines:
+    """Iterates the lines of a memory-mapped log, decoding them the way a text-mode read
+    would (UTF-8 ignoring errors, universal newlines) but only when they are actually used."""
+
+    def __init__(self, data, progress, start=0, lines_before_start=None, digest=None):
+        self.data = data
+        self.position = start
+        self.progress = progress
+        self.digest = digest  # Updated with the data scanned so far, in chunks
+        self._hashed_position = start
+        self.split_lines = []
+        self.literal_positions = dict.fromkeys(TRACE_PREFILTER_LITERALS, -1)
+        self.line_start = start
+        # Lines are only counted when a trace is located, from start on if the lines before it are known
+        self._counted_position, self._counted_lines = (start, lines_before_start) if lines_before_start is not None else (0, 0)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.split_lines:
+            return self.split_lines.pop()
+        start = self.position
+        if start >= len(self.data):
+            raise StopIteration
+        end = self.data.find(b"\n", start) + 1 or len(self.data)
+        self._advance(end)
+        self.line_start = start
+        line = self.data[start:end].decode("utf-8", "ignore")
+        if "\r" not in line:
+            return line
+        parts = line.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        lines = [part + "\n" for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+        self.split_lines = lines[:0:-1]
+        return lines[0]
+
+    def skip_to_candidate(self):
+        if self.split_lines:
+            return
+        candidate = len(self.data)
+        for literal, found in self.literal_positions.items():
+            if found < self.position:
+                found = self.data.find(literal, self.position)
+                self.literal_positions[literal] = found = len(self.data) if found == -1 else found
+            candidate = min(candidate, found)
+        if candidate < len(self.data):
+            candidate = self.data.rfind(b"\n", self.position, candidate) + 1
+        self._advance(max(self.position, candidate))
+
+    def _advance(self, position):
+        self.progress.advance(position - self.position)
+        self.position = position
+        if self.digest is not None and position - self._hashed_position >= ANALYSIS_PROGRESS_INTERVAL:
+            self.hash_to(position)
+
+    def hash_to(self, position):
+        """Adds the data up to position to digest, while it is still in the page cache."""
+        while self._hashed_position < position:
+            end = min(position, self._hashed_position + ANALYSIS_PROGRESS_INTERVAL)
+            self.digest.update(self.data[self._hashed_position:end])
+            self._hashed_position = end
+
+    def count_lines(self, offset):
+        """Returns the number of lines before offset. Offsets must not decrease from call to call."""
+        while self._counted_position < offset:
+            end = min(offset, self._counted_position + OCCURRENCE_LINE_COUNT_CHUNK)
+            self._counted_lines += self.data[self._counted_position:end].count(b"\n")
+            self._counted_position = end
+        return self._counted_lines
+
+    def locate(self, line_start):
+        """Returns (byte offset, line number, timestamp) of the line starting at line_start."""
+        timestamp = None
+        position = line_start
+        for _ in range(OCCURRENCE_TIMESTAMP_LOOKBACK_LINES):
+            timestamp = parse_log_timestamp(self.data[position:position + 64])
+            if timestamp is not None or position == 0:
+                break
+            position = self.data.rfind(b"\n", 0, position - 1) + 1
+        return line_start, self.count_lines(line_start) + 1, timestamp
+
+
+class _ProgressReader:
+    """File wrapper that reports the bytes read from it as progress, and adds them to digest if one is given."""
+
+    def __init__(self, f, progress, digest=None):
+        self.f = f
+        self.progress = progress
+        self.digest = digest
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.progress.advance(len(data))
+        if self.digest is not None:
+            self.digest.update(data)
+        return data
+
+    def seek(self, *args):
+        if self.digest is not None:
+            self.digest.sequential = False  # What is read no longer follows the file's content in order
+        return self.f.seek(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+
+FICLONE = 0x40049409  # Linux ioctl that makes dst a copy-on-write clone of src
+
+
+def _clone_file(src, dst):
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        return False
+
+
+def _copy_file_range(src, dst):
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    while True:
+        try:
+            chunk = os.copy_file_range(src.fileno(), dst.fileno(), 1024 * 1024 * 1024)
+        except OSError as e:
+            if copied == 0 and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                return False
+            raise
+        if chunk == 0:
+            return True
+        copied += chunk
+
+
+def copy_log_file(source_path, copy_path):
+    """Copies a log into the session byte for byte without passing it through Python: as a
+    copy-on-write clone where the filesystem supports it, otherwise with a kernel-side copy
+    (copy_file_range, or the sendfile/fcopyfile path of shutil.copyfile)."""
+    with open(source_path, 'rb') as src, open(copy_path, 'wb') as dst:
+        copied = _clone_file(src, dst) or _copy_file_range(src, dst)
+    if not copied:
+        shutil.copyfile(source_path, copy_path)
+    shutil.copystat(source_path, copy_path)
+
+
+# Compressed logs are recognised by their first bytes and decompressed as a stream while they are
+# read, so only the compressed original is kept in the session. A zip archive is read member by
+# member; members may themselves be compressed with one of the other formats.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+COMPRESSED_LOG_MAGIC = ((b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"), (ZSTD_MAGIC, "zstd"),
+                        (b"PK\x03\x04", "zip"), (b"PK\x05\x06", "zip"))
+COMPRESSED_LOG_EXTENSIONS = (".gz", ".bz2", ".xz", ".zst", ".zip")
+LOG_FILE_EXTENSIONS = (".log", ".txt") + COMPRESSED_LOG_EXTENSIONS
+
+
+def _compression_of(head):
+    for magic, compression in COMPRESSED_LOG_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def detect_log_compression(path):
+    """Returns "gzip", "bz2", "xz", "zstd" or "zip" for a compressed log, None for a plain one."""
+    with open(path, 'rb') as f:
+        return _compression_of(f.read(6))
+
+
+def _open_decompressed(f, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    if compression == "bz2":
+        return bz2.BZ2File(f)
+    if compression == "xz":
+        return lzma.LZMAFile(f)
+    if zstandard is None:
+        raise RuntimeError("Reading .zst logs needs the 'zstandard' package (pip install zstandard)")
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True))
+
+
+def _iter_decompressed_streams(f, compression):
+    """Yields (member name, decompressed binary stream) for the compressed log in the binary file f:
+    one stream with no name, or one per member of a zip archive. Each stream is closed once the
+    next one is requested."""
+    if compression != "zip":
+        with _open_decompressed(f, compression) as stream:
+            yield None, stream
+        return
+    with zipfile.ZipFile(f) as archive:
+        for member in archive.infolist():
+            extension = os.path.splitext(member.filename)[1].lower()
+            if member.is_dir() or (extension in ALREADY_COMPRESSED_EXTENSIONS and extension not in COMPRESSED_LOG_EXTENSIONS):
+                continue
+            with archive.open(member) as member_stream:
+                member_compression = _compression_of(member_stream.peek(6))
+                if member_compression == "zip":
+                    continue  # Nested archives aren't opened
+                if member_compression is None:
+                    yield member.filename, member_stream
+                else:
+                    with _open_decompressed(member_stream, member_compression) as stream:
+                        yield member.filename, stream
+
+
+class _CompressedLogLines:
+    """Iterates the lines of a compressed log as a text-mode read of the decompressed log would,
+    reporting the compressed bytes read as progress. The lines of a zip archive's members follow
+    each other. line_start gives the decompressed offset, line number and latest timestamped line
+    of the line last read, since the log can't be read again to locate a trace."""
+
+    def __init__(self, path, compression, progress, digest=None):
+        self.line_start = None
+        self.offset = 0
+        self.line_count = 0
+        self.split_lines = []
+        self._timestamp_line = None
+        self._lines = self._iter_raw_lines(path, compression, progress, digest)
+
+    def _iter_raw_lines(self, path, compression, progress, digest):
+        with open(path, 'rb') as f:
+            for member_name, stream in _iter_decompressed_streams(_ProgressReader(f, progress, digest), compression):
+                yield from stream
+            if digest is not None:
+                # Decompressors can stop before trailing bytes
+                _ProgressReader(f, progress, digest).read()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.split_lines:
+            return self.split_lines.pop()
+        raw_line = next(self._lines)
+        if LOG_TIMESTAMP_PATTERN.match(raw_line):
+            self._timestamp_line = raw_line
+        self.line_start = (self.offset, self.line_count + 1, self._timestamp_line)
+        self.offset += len(raw_line)
+        self.line_count += 1
+        line = raw_line.decode("utf-8", "ignore")
+        if "\r" not in line:
+            return line
+        parts = line.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        lines = [part + "\n" for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+        self.split_lines = lines[:0:-1]
+        return lines[0]
+
+    @staticmethod
+    def locate(line_start):
+        offset, line_number, timestamp_line = line_start
+        return offset, line_number, None if timestamp_line is None else parse_log_timestamp(timestamp_line)
+
+
+def _iter_line_blocks(stream):
+    """Yields runs of whole lines of about LOG_INDEX_BLOCK_SIZE bytes read from a binary stream."""
+    pending = b""
+    while True:
+        chunk = stream.read(LOG_INDEX_BLOCK_SIZE)
+        if not chunk:
+            if pending:
+                yield pending
+            return
+        data = pending + chunk
+        cut = data.rfind(b"\n") + 1
+        if cut:
+            yield data[:cut]
+        pending = data[cut:]
+
+
+# --- Trace Occurrences ---
+# Besides counting traces, analysis records where each one occurred: the byte offset and line
+# number of its first line and the timestamp of its log record. While a log is analyzed the
+# occurrences are kept in typed arrays per fingerprint, and afterwards written to a segment file
+# in the session's OCCURRENCES_SUBDIR named after the log and the offset the analysis started at,
+# so each log has one segment plus one per part appended to it later. A segment is a small JSON
+# directory giving each fingerprint's run of occurrences, then one column each of offsets, line
+# numbers and timestamps (20 bytes per occurrence), so looking up a trace reads only its own
+# occurrences. The offsets of compressed logs are offsets into the decompressed log.
+OCCURRENCES_SUBDIR = "occurrences"
+OCCURRENCE_SEGMENT_MAGIC = b"SCOPEOCC"
+OCCURRENCE_SEGMENT_VERSION = 1
+OCCURRENCE_COLUMNS = (("offset", "q"), ("line", "I"), ("timestamp", "d"))
+OCCURRENCE_LINE_COUNT_CHUNK = 16 * 1024 * 1024
+OCCURRENCE_TIMESTAMP_LOOKBACK_LINES = 20  # Lines searched upwards from a trace for its record's timestamp
+OCCURRENCE_LIST_MAX_ROWS = 10000
+OCCURRENCE_CONTEXT_LINES = 30  # Log lines shown from an occurrence on
+LOG_TIMESTAMP_PATTERN = re.compile(rb"\s*\[?(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d{1,9}))?(Z|[+-]\d{2}:?\d{2})?")
+
+
+def parse_log_timestamp(line):
+    """Returns the timestamp a log line (bytes) starts with in seconds since the epoch, or None.
+    Timestamps without a UTC offset are taken as UTC, so they display as written."""
+    match = LOG_TIMESTAMP_PATTERN.match(line)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, fraction, utc_offset = match.groups()
+    try:
+        timestamp = datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                                      tzinfo=datetime.timezone.utc).timestamp()
+    except ValueError:
+        return None
+    if fraction:
+        timestamp += int(fraction) / 10 ** len(fraction)
+    if utc_offset and utc_offset != b"Z":
+        offset_seconds = int(utc_offset[1:3]) * 3600 + int(utc_offset[-2:]) * 60
+        timestamp -= offset_seconds if utc_offset[:1] == b"+" else -offset_seconds
+    return timestamp
+
+
+def format_log_timestamp(timestamp):
+    if math.isnan(timestamp):
+        return ""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+def occurrence_segment_path(session_root_path, log_name, start=0):
+    return os.path.join(session_root_path, OCCURRENCES_SUBDIR, f"{urllib.parse.quote(log_name, safe='')}.{start}.occ")
+
+
+class _OccurrenceRecorder:
+    """Collects the occurrences of each fingerprint found in one log, in OCCURRENCE_COLUMNS arrays."""
+
+    def __init__(self):
+        self.occurrences = {}
+
+    def add(self, fingerprint, offset, line_number, timestamp):
+        columns = self.occurrences.get(fingerprint)
+        if columns is None:
+            columns = self.occurrences[fingerprint] = tuple(array.array(typecode) for _, typecode in OCCURRENCE_COLUMNS)
+        columns[0].append(offset)
+        columns[1].append(line_number)
+        columns[2].append(math.nan if timestamp is None else timestamp)
+
+    def write(self, path, start, end, line_count):
+        """Writes the occurrences as a segment for the part of a log from start to end, which ends
+        after line_count lines."""
+        fingerprints = {}
+        count = 0
+        for fingerprint, columns in self.occurrences.items():
+            fingerprints[fingerprint] = [count, len(columns[0])]
+            count += len(columns[0])
+        header = json.dumps({"byteorder": sys.byteorder, "columns": OCCURRENCE_COLUMNS, "count": count, "start": start, "end": end,
+                             "lines": line_count, "fingerprints": fingerprints}).encode('utf-8')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(OCCURRENCE_SEGMENT_MAGIC + struct.pack("<II", OCCURRENCE_SEGMENT_VERSION, len(header)) + header)
+            for column_index in range(len(OCCURRENCE_COLUMNS)):
+                for columns in self.occurrences.values():
+                    columns[column_index].tofile(f)
+        os.replace(temp_path, path)
+
+
+class OccurrenceSegment:
+    """Reads the occurrences of one segment file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic_and_sizes = f.read(len(OCCURRENCE_SEGMENT_MAGIC) + 8)
+            if not magic_and_sizes.startswith(OCCURRENCE_SEGMENT_MAGIC):
+                raise ValueError(f"'{os.path.basename(path)}' is not an occurrence segment")
+            version, header_length = struct.unpack("<II", magic_and_sizes[len(OCCURRENCE_SEGMENT_MAGIC):])
+            if version != OCCURRENCE_SEGMENT_VERSION:
+                raise ValueError(f"'{os.path.basename(path)}' has unsupported segment version {version}")
+            header = json.loads(f.read(header_length))
+        self.count = header["count"]
+        self.start, self.end, self.lines = header["start"], header["end"], header["lines"]
+        self.fingerprints = header["fingerprints"]
+        self.byteswap = header["byteorder"] != sys.byteorder
+        self.typecodes = [typecode for _, typecode in header["columns"]]
+        self.column_starts = []
+        column_start = len(magic_and_sizes) + header_length
+        for typecode in self.typecodes:
+            self.column_starts.append(column_start)
+            column_start += self.count * array.array(typecode).itemsize
+
+    def read(self, fingerprint):
+        """Returns the offset, line number and timestamp arrays of fingerprint's occurrences, or None."""
+        run = self.fingerprints.get(fingerprint)
+        if run is None:
+            return None
+        first, count = run
+        columns = []
+        with open(self.path, 'rb') as f:
+            for typecode, column_start in zip(self.typecodes, self.column_starts):
+                column = array.array(typecode)
+                f.seek(column_start + first * column.itemsize)
+                column.fromfile(f, count)
+                if self.byteswap:
+                    column.byteswap()
+                columns.append(column)
+        return columns
+
+
+def _occurrence_segments(occurrences_dir):
+    """Returns (log name, start offset, path) for the segments in occurrences_dir, in log name and offset order."""
+    try:
+        file_names = os.listdir(occurrences_dir)
+    except FileNotFoundError:
+        return []
+    segments = []
+    for file_name in file_names:
+        parts = file_name.rsplit(".", 2)
+        if len(parts) == 3 and parts[2] == "occ" and parts[1].isdigit():
+            segments.append((urllib.parse.unquote(parts[0]), int(parts[1]), os.path.join(occurrences_dir, file_name)))
+    return sorted(segments)
+
+
+def occurrence_lines_before(occurrences_dir, log_name, offset):
+    """Returns how many lines of log_name come before offset, if one of its segments ends there."""
+    for segment_log_name, _, path in _occurrence_segments(occurrences_dir):
+        if segment_log_name == log_name:
+            try:
+                segment = OccurrenceSegment(path)
+            except (OSError, ValueError, KeyError):
+                continue
+            if segment.end == offset:
+                return segment.lines
+    return None
+
+
+class SessionOccurrences:
+    """Looks up where a trace occurred in the logs of a session."""
+
+    def __init__(self, session_root_path):
+        self.segments = []
+        for log_name, start, path in _occurrence_segments(os.path.join(session_root_path, OCCURRENCES_SUBDIR)):
+            try:
+                self.segments.append((log_name, OccurrenceSegment(path)))
+            except (OSError, ValueError, KeyError):
+                continue  # Written by an interrupted analysis or a newer version
+        self.log_names = sorted({log_name for log_name, _ in self.segments})
+
+    def lookup(self, fingerprint):
+        """Returns the file id (index into log_names), offset, line number and timestamp arrays of
+        fingerprint's occurrences, ordered by log and by position in the log."""
+        file_ids = array.array('I')
+        columns = [array.array(typecode) for _, typecode in OCCURRENCE_COLUMNS]
+        file_ids_by_name = {log_name: file_id for file_id, log_name in enumerate(self.log_names)}
+        for log_name, segment in self.segments:
+            segment_columns = segment.read(fingerprint)
+            if segment_columns is None:
+                continue
+            file_ids.extend(array.array('I', [file_ids_by_name[log_name]]) * len(segment_columns[0]))
+            for column, segment_column in zip(columns, segment_columns):
+                column.extend(segment_column)
+        return (file_ids, *columns)
+
+
+def _extract_log_traces(lines, trace_groups, progress, recorder=None):
+    trace_starts = [] if recorder is not None else None
+    for trace_content in iter_stack_traces(lines, trace_starts):
+        fingerprint = trace_groups.add(trace_content)
+        if recorder is not None:
+            recorder.add(fingerprint, *lines.locate(trace_starts.pop()))
+        progress.pending_traces += 1
+
+
+def analyze_log_file(source_path, copy_path=None, start=0, occurrences_path=None, lines_before_start=None, digest=None):
+    """Extracts and classifies the stack traces of one log file, scanning a memory map of it, or its
+    decompressed content as a stream for compressed logs. If copy_path is given the file is first
+    copied there and the copy, still in the page cache, is what gets analyzed. A plain log can be
+    analyzed from byte offset start on; lines_before_start saves counting the lines before it.
+    If occurrences_path is given, the occurrences of the traces are written there as a segment.
+    A _ContentDigest given as digest is updated with the file's bytes as they are scanned.
+    Returns ({fingerprint: [representative trace, count, variant digests]}, classification per fingerprint)."""
+    trace_groups = _TraceGroups()
+    recorder = _OccurrenceRecorder() if occurrences_path else None
+    progress = _AnalysisProgress()
+    progress.flush()
+    if copy_path:
+        with _profile_stage("copy", os.path.getsize(source_path)):
+            copy_log_file(source_path, copy_path)
+        source_path = copy_path
+    compression = detect_log_compression(source_path)
+    with _profile_stage("extraction", os.path.getsize(source_path) - start):
+        if compression:
+            lines = _CompressedLogLines(source_path, compression, progress, digest)
+            _extract_log_traces(lines, trace_groups, progress, recorder)
+            end, line_count = lines.offset, lines.line_count
+        else:
+            with open(source_path, 'rb') as f:
+                end = os.fstat(f.fileno()).st_size
+                line_count = 0
+                if end:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        if hasattr(mmap, "MADV_SEQUENTIAL"):
+                            data.madvise(mmap.MADV_SEQUENTIAL)
+                        lines = _MappedLogLines(data, progress, start, lines_before_start, digest)
+                        _extract_log_traces(lines, trace_groups, progress, recorder)
+                        if digest is not None:
+                            lines.hash_to(end)
+                        if recorder is not None:
+                            line_count = lines.count_lines(end)
+        progress.flush()
+    if recorder is not None:
+        with _profile_stage("occurrences") as stage:
+            recorder.write(occurrences_path, start, end, line_count)
+            stage["bytes"] = os.path.getsize(occurrences_path)
+    with _profile_stage("classification"):
+        return trace_groups.groups, {fingerprint: classify_stack_trace(group[0]) for fingerprint, group in trace_groups.groups.items()}
+
+
+def _init_analysis_worker(definitions, normalization_rules, progress_queue=None, cancel_event=None):
+    global exception_definitions, trace_normalization_rules, _analysis_progress_queue, _analysis_cancel_event
+    exception_definitions = definitions
+    trace_normalization_rules = normalization_rules
+    _analysis_progress_queue = progress_queue
+    _analysis_cancel_event = cancel_event
+
+
+def analyze_log_files(jobs, workers=None, progress_queue=None, cancel_event=None, use_cache=True, profile=None):
+    """Runs analyze_log_file for each (source_path, copy_path[, occurrences_path]) job, one file per worker process.
+    Yields (job_index, result, error) as each job finishes. Progress is posted to progress_queue as
+    ("progress", chars, traces) tuples, and setting cancel_event makes running jobs raise AnalysisCancelled.
+    Unless use_cache is False, files already in the analysis cache are not analyzed again."""
+    if use_cache and ANALYSIS_CACHE_DIR:
+        definitions_key = analysis_definitions_key()
+        return _run_analysis_jobs(analyze_log_file_cached, [(job[0], job[1], definitions_key, *job[2:]) for job in jobs],
+                                  workers, progress_queue, cancel_event, profile)
+    return _run_analysis_jobs(analyze_log_file, [(job[0], job[1], 0, *job[2:]) for job in jobs], workers, progress_queue, cancel_event, profile)
+
+
+def _run_analysis_jobs(function, jobs, workers=None, progress_queue=None, cancel_event=None, profile=None):
+    """Calls function(*job) for each job in worker processes (in this process if there is only one
+    worker) and yields (job_index, result, error) as each job finishes. If a PipelineProfile, or a
+    list of one per job, is given as profile, the stages timed in each job are added to it."""
+    global _analysis_progress_queue, _analysis_cancel_event
+    if profile is not None:
+        for job_index, result, error in _run_analysis_jobs(_run_profiled_job, [(function, job) for job in jobs], workers, progress_queue, cancel_event):
+            if error is None:
+                result, stages = result
+                (profile[job_index] if isinstance(profile, list) else profile).merge(stages)
+            yield job_index, result, error
+        return
+    workers = min(workers or ANALYSIS_WORKERS, len(jobs))
+    if workers <= 1:
+        _analysis_progress_queue, _analysis_cancel_event = progress_queue, cancel_event
+        try:
+            for job_index, job in enumerate(jobs):
+                try:
+                    yield job_index, function(*job), None
+                except Exception as e:
+                    yield job_index, None, e
+        finally:
+            _analysis_progress_queue = _analysis_cancel_event = None
+        return
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker,
+                                                      initargs=(exception_definitions, trace_normalization_rules, progress_queue, cancel_event))
+    try:
+        futures = {executor.submit(function, *job): job_index for job_index, job in enumerate(jobs)}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+# --- Analysis Cache ---
+# The result of analyze_log_file is stored in ANALYSIS_CACHE_DIR under a quick key of the log (its
+# size and the digests of its first and last ANALYSIS_CACHE_KEY_SPAN bytes), ANALYSIS_EXTRACTOR_VERSION
+# and a hash of the definitions and normalization rules, which is everything else the result depends
+# on. The entry also records the SHA-256 of the whole log, taken while the log was analyzed, and is
+# only used if the log still has it, so each log is read once whether it is found in the cache or
+# not. Re-importing a session or opening the same logs again then only analyzes the files whose
+# content or definitions changed. Entries are used as found, and the least recently used ones are
+# removed once the cache holds more than ANALYSIS_CACHE_MAX_BYTES.
+ANALYSIS_EXTRACTOR_VERSION = 3  # Bump when a change to extraction or grouping alters the results
+ANALYSIS_CACHE_KEY_SPAN = 1024 * 1024
+
+
+def analysis_definitions_key():
+    rules = [(pattern.pattern, pattern.flags, replacement) for pattern, replacement in trace_normalization_rules]
+    return hashlib.sha256(json.dumps([exception_definitions, rules], sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class _ContentDigest:
+    """SHA-256 of a log taken while analysis reads it. It only covers the log if the log was read
+    from front to back, which complete() checks."""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.byte_count = 0
+        self.sequential = True
+
+    def update(self, data):
+        self.sha256.update(data)
+        self.byte_count += len(data)
+
+    def complete(self, size):
+        return self.sequential and self.byte_count == size
+
+
+def _file_sha256(path, progress):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(ANALYSIS_PROGRESS_INTERVAL), b""):
+            digest.update(chunk)
+            progress.flush()  # Only checks for cancellation; hashing isn't counted as progress
+    return digest.hexdigest()
+
+
+def _analysis_cache_quick_key(path, size):
+    """Hashes the size and the first and last ANALYSIS_CACHE_KEY_SPAN bytes of the log; for a log
+    of up to twice that size this covers all of it."""
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(size, 2 * ANALYSIS_CACHE_KEY_SPAN)))
+        if size > 2 * ANALYSIS_CACHE_KEY_SPAN:
+            f.seek(size - ANALYSIS_CACHE_KEY_SPAN)
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _evict_analysis_cache(keep_name):
+    """Removes the least recently used cache entries (a result and its occurrence segment) until the
+    cache holds at most ANALYSIS_CACHE_MAX_BYTES, but never the entry named keep_name."""
+    entries = {}
+    with os.scandir(ANALYSIS_CACHE_DIR) as scan:
+        for entry in scan:
+            with contextlib.suppress(OSError):
+                stat_result = entry.stat()
+                name = entry.name.split(".")[0]
+                size, used, paths = entries.get(name, (0, 0, []))
+                entries[name] = (size + stat_result.st_size, max(used, stat_result.st_mtime), paths + [entry.path])
+    total = sum(size for size, _, _ in entries.values())
+    for name, (size, _, paths) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= ANALYSIS_CACHE_MAX_BYTES:
+            break
+        if name == keep_name:
+            continue
+        for path in paths:
+            with contextlib.suppress(OSError):  # Another worker may be evicting it too
+                os.remove(path)
+        total -= size
+
+
+def analyze_log_file_cached(source_path, copy_path=None, definitions_key=None, occurrences_path=None):
+    """analyze_log_file, returning the cached result instead when the file's content was already
+    analyzed with the same definitions, and caching the result otherwise. The occurrence segment
+    is cached beside the result and copied to occurrences_path."""
+    progress = _AnalysisProgress()
+    if copy_path:
+        with _profile_stage("copy", os.path.getsize(source_path)):
+            copy_log_file(source_path, copy_path)
+        source_path = copy_path
+    size = os.path.getsize(source_path)
+    with _profile_stage("read", size) as stage:  # Loading the log's cached result, and hashing the log if there is one
+        entry_name = f"{_analysis_cache_quick_key(source_path, size)}_{ANALYSIS_EXTRACTOR_VERSION}_{definitions_key}"
+        cache_path = os.path.join(ANALYSIS_CACHE_DIR, entry_name + ".json")
+        cached_occurrences_path = os.path.join(ANALYSIS_CACHE_DIR, entry_name + ".occ")
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if size > 2 * ANALYSIS_CACHE_KEY_SPAN and cached["sha256"] != _file_sha256(source_path, progress):
+                raise ValueError("Only the quick key matches")
+            result = ({fingerprint: [trace_content, count, {bytes.fromhex(digest) for digest in variants}]
+                       for fingerprint, (trace_content, count, variants) in cached["groups"].items()},
+                      cached["classifications"])
+            if occurrences_path:
+                os.makedirs(os.path.dirname(occurrences_path), exist_ok=True)
+                copy_log_file(cached_occurrences_path, occurrences_path)
+            for path in (cache_path, cached_occurrences_path):
+                with contextlib.suppress(OSError):
+                    os.utime(path)  # Marks the entry as recently used
+        except (OSError, ValueError, KeyError, TypeError):
+            result = None
+            stage["bytes"] = 0
+    if result is not None:
+        progress.advance(os.path.getsize(source_path))
+        progress.pending_traces += sum(group[1] for group in result[0].values())
+        progress.flush()
+        if _analysis_progress_queue is not None:
+            _analysis_progress_queue.put(("status", f"Reused the cached analysis of '{os.path.basename(source_path)}'."))
+        return result
+
+    content_digest = _ContentDigest()
+    result = analyze_log_file(source_path, occurrences_path=occurrences_path, digest=content_digest)
+    with _profile_stage("cache_write") as stage:
+        try:
+            # Zip archives are read out of order, so only they are read a second time to hash them
+            content_sha256 = content_digest.sha256.hexdigest() if content_digest.complete(size) else _file_sha256(source_path, progress)
+            os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+            if occurrences_path:
+                copy_log_file(occurrences_path, cached_occurrences_path + ".tmp")
+                os.replace(cached_occurrences_path + ".tmp", cached_occurrences_path)
+            write_json_atomic(cache_path, {"sha256": content_sha256,
+                                           "groups": {fingerprint: [trace_content, count, sorted(digest.hex() for digest in variants)]
+                                                      for fingerprint, (trace_content, count, variants) in result[0].items()},
+                                           "classifications": result[1]})
+            stage["bytes"] = os.path.getsize(cache_path)
+            _evict_analysis_cache(entry_name)
+        except OSError:
+            pass  # The result is still good, it just won't be reused
+    return result
+
+
+def merge_analysis_results(file_results, file_names=None):
+    """Merges per-file results, in file order, into stack_traces_data. Merging in the order the
+    files were selected keeps the result identical to analyzing them one after another.
+    Entries are keyed by the representative trace of each fingerprint group. If file_names are
+    given, each entry also records its count per log file under "log_files"."""
+    merged_groups = {}
+    classifications = {}
+    log_files = {}
+    for file_index, (file_groups, file_classifications) in enumerate(file_results):
+        for fingerprint, (trace_content, count, variants) in file_groups.items():
+            group = merged_groups.get(fingerprint)
+            if group is None:
+                merged_groups[fingerprint] = [trace_content, count, set(variants)]
+                classifications[fingerprint] = file_classifications[fingerprint]
+                log_files[fingerprint] = {}
+            else:
+                group[1] += count
+                group[2].update(variants)
+            if file_names:
+                log_files[fingerprint][file_names[file_index]] = count
+    stack_traces_data = {}
+    for fingerprint, (trace_content, count, variants) in merged_groups.items():
+        stack_traces_data[trace_content] = {"count": count, **classifications[fingerprint], "selected_for_investigation": False,
+                                            "fingerprint": fingerprint, "variant_count": len(variants)}
+        if file_names:
+            stack_traces_data[trace_content]["log_files"] = log_files[fingerprint]
+    return stack_traces_data
+
+
+# --- Adding Logs to a Session ---
+# A session records how far each log in its logs folder was analyzed under "log_checkpoints".
+# When logs are added to the session, a file that is one of those logs with lines appended is
+# only analyzed from its checkpoint on, and the session's copy is brought up to date; any other
+# file is copied in and analyzed as a new log. The results are added to the existing counts.
+LOG_CHECKPOINT_TAIL_BYTES = 4096
+
+
+def _log_tail_digest(f, offset):
+    f.seek(max(0, offset - LOG_CHECKPOINT_TAIL_BYTES))
+    return hashlib.blake2b(f.read(offset - max(0, offset - LOG_CHECKPOINT_TAIL_BYTES)), digest_size=16).hexdigest()
+
+
+def log_checkpoint(path, offset=None):
+    """Returns the checkpoint of a log analyzed up to offset, by default its end: the offset and a
+    digest of the bytes before it."""
+    with open(path, 'rb') as f:
+        if offset is None:
+            offset = os.fstat(f.fileno()).st_size
+        compressed = _compression_of(f.read(6)) is not None
+        return {"offset": offset, "tail_digest": _log_tail_digest(f, offset), "compressed": compressed}
+
+
+def appended_log_start(checkpoint, path):
+    """Returns the checkpoint's offset if path is the checkpointed log, unchanged or with lines appended,
+    and None otherwise. A compressed log only matches if it is unchanged."""
+    offset = checkpoint["offset"]
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < offset or (checkpoint.get("compressed") and size != offset) or _log_tail_digest(f, offset) != checkpoint["tail_digest"]:
+            return None
+    return offset
+
+
+def session_log_checkpoints(logs_subdir, log_checkpoints):
+    """Returns a copy of a session's log_checkpoints with a checkpoint for every log in logs_subdir.
+    Sessions from before checkpoints were kept were analyzed to the end of their logs."""
+    log_checkpoints = dict(log_checkpoints or {})
+    for name in os.listdir(logs_subdir) if os.path.isdir(logs_subdir) else []:
+        if name not in log_checkpoints and os.path.isfile(os.path.join(logs_subdir, name)):
+            log_checkpoints[name] = log_checkpoint(os.path.join(logs_subdir, name))
+    return log_checkpoints
+
+
+def analyze_added_log(source_path, copy_path, start=None, definitions_key=None, occurrences_path=None):
+    """Analyzes a log being added to a session. With start None the log is new: it is copied to
+    copy_path and analyzed, through the analysis cache if definitions_key is given. Otherwise
+    copy_path is the session's copy of the log up to start, and only what source_path holds past
+    start is appended to it and analyzed."""
+    if start is None:
+        if definitions_key:
+            return analyze_log_file_cached(source_path, copy_path, definitions_key, occurrences_path)
+        return analyze_log_file(source_path, copy_path, occurrences_path=occurrences_path)
+    with _profile_stage("copy", os.path.getsize(source_path) - start), open(source_path, 'rb') as src, open(copy_path, 'r+b') as dst:
+        src.seek(start)
+        dst.seek(start)
+        dst.truncate()
+        shutil.copyfileobj(src, dst, EXPORT_CHUNK_SIZE)
+    lines_before_start = occurrence_lines_before(os.path.dirname(occurrences_path), os.path.basename(copy_path), start) if occurrences_path else None
+    return analyze_log_file(copy_path, start=start, occurrences_path=occurrences_path, lines_before_start=lines_before_start)
+
+
+def add_analysis_results(stack_traces_data, file_results, file_names):
+    """Adds per-file results for added logs, or the appended part of logs, to stack_traces_data in place.
+    Traces are matched to existing entries by fingerprint. The variant digests of existing entries
+    aren't kept, so a merged variant_count is a lower bound. Returns the keys of the entries that
+    were added or changed."""
+    keys_by_fingerprint = {trace_data.get("fingerprint") or fingerprint_stack_trace(trace_content): trace_content
+                           for trace_content, trace_data in stack_traces_data.items()}
+    changed_trace_contents = []
+    for trace_content, added_data in merge_analysis_results(file_results, file_names).items():
+        existing_content = keys_by_fingerprint.get(added_data["fingerprint"])
+        if existing_content is None:
+            stack_traces_data[trace_content] = added_data
+            changed_trace_contents.append(trace_content)
+            continue
+        trace_data = stack_traces_data[existing_content]
+        trace_data["count"] += added_data["count"]
+        trace_data["variant_count"] = max(trace_data.get("variant_count", 1), added_data["variant_count"])
+        log_files = trace_data.setdefault("log_files", {})
+        for file_name, count in added_data["log_files"].items():
+            log_files[file_name] = log_files.get(file_name, 0) + count
+        changed_trace_contents.append(existing_content)
+    return changed_trace_contents
+
+
+# --- Following Growing Logs ---
+# Follow mode polls logs that are still being written, like tail -F. Each poll only reads the
+# bytes appended since the previous one, appends them to the session's copy of the log and adds
+# the traces found in them to the session. A trace running up to the last line read may still
+# be growing, so it is left for the next poll until the log has stopped growing for
+# FOLLOW_SETTLE_POLLS polls.
+FOLLOW_POLL_INTERVAL_MS = 2000
+FOLLOW_SETTLE_POLLS = 2
+FOLLOW_MAX_READ_BYTES = 16 * 1024 * 1024
+FOLLOW_SAVE_INTERVAL_SECONDS = 30
+
+
+class _FollowedLines(_MappedLogLines):
+    """_MappedLogLines that records whether the extractor has read to the end of the data."""
+    exhausted = False
+
+    def __next__(self):
+        try:
+            return super().__next__()
+        except StopIteration:
+            self.exhausted = True
+            raise
+
+
+def _timestamp_context(data):
+    """Returns the lines at the end of data that are searched for the timestamp of a trace starting
+    right after them."""
+    position = len(data)
+    for _ in range(OCCURRENCE_TIMESTAMP_LOOKBACK_LINES):
+        if position == 0:
+            break
+        position = data.rfind(b"\n", 0, position - 1) + 1
+    return data[position:]
+
+
+def extract_appended_traces(data, trace_groups, final=False, settled=False, recorder=None, offset=0, lines_before=0, context=b""):
+    """Adds the stack traces in data, bytes appended to a followed log, to trace_groups and returns
+    how many bytes of data were analyzed. Unless final, an incomplete last line is left for the next
+    call, and so is a trace running to the end of data unless settled (the log stopped growing).
+    If an _OccurrenceRecorder is given, the occurrences of the traces added are recorded in it, data
+    being the part of the log from byte offset on, after lines_before lines. context, the
+    _timestamp_context of the log before offset, is searched for timestamps too."""
+    if not final:
+        data = data[:data.rfind(b"\n") + 1]
+    start = len(context)
+    lines = _FollowedLines(context + data if context else data, _AnalysisProgress(), start, lines_before)
+    trace_starts = []  # Offset of the line each trace starts on
+    deferred_traces = []
+
+    def add_trace(line_start, trace_content):
+        fingerprint = trace_groups.add(trace_content)
+        if recorder is not None:
+            line_offset, line_number, timestamp = lines.locate(line_start)
+            recorder.add(fingerprint, offset + line_offset - start, line_number, timestamp)
+
+    for trace_content in iter_stack_traces(lines, trace_starts):
+        if lines.exhausted and not (final or settled):
+            deferred_traces.append((trace_starts[-1], trace_content))
+        else:
+            add_trace(trace_starts[-1], trace_content)
+    if not deferred_traces:
+        return len(data)
+    position = deferred_traces[0][0] - start
+    if position == 0 and len(data) >= FOLLOW_MAX_READ_BYTES:
+        for line_start, trace_content in deferred_traces:  # Longer than a whole read; it can't be deferred
+            add_trace(line_start, trace_content)
+        return len(data)
+    return position
+
+
+class LogFollower:
+    """Follows one log like tail -F. The file stays open between polls, so lines written to it just
+    before it is rotated away are still read; the log at path is then followed from its start. A
+    log truncated in place is also followed from its start. Everything analyzed is appended to
+    copy_path, the session's copy of the log, unless path is that copy. If session_root_path is
+    given, the occurrences of the traces found are written to an occurrence segment of the copy,
+    which covers everything analyzed since the follower started and is rewritten as it grows."""
+
+    def __init__(self, path, copy_path, offset=0, session_root_path=None):
+        self.path = path
+        self.copy_path = copy_path
+        self.in_place = os.path.exists(copy_path) and os.path.samefile(path, copy_path)
+        self.offset = offset  # Bytes of the followed file analyzed so far
+        self.pending = b""  # Bytes read past offset that are not analyzed yet
+        self.session_root_path = session_root_path
+        self.copy_offset = offset  # Bytes of the copy analyzed so far; offset until the log is rotated
+        self.copy_lines = None  # Lines of the copy before copy_offset, counted when first needed
+        self.copy_context = b""  # _timestamp_context of the copy before copy_offset
+        self.recorder = None
+        self.segment_start = None
+        self.segment_end = None  # copy_offset when the segment was last written
+        self.idle_polls = 0
+        self.caught_up = False
+        self.file = None
+        self.identity = None
+        self.copy_file = None
+
+    def poll(self):
+        """Analyzes the next FOLLOW_MAX_READ_BYTES at most of what was appended to the log. Returns the
+        traces found in the analyze_log_file result format, or None if there were none."""
+        trace_groups = _TraceGroups()
+        if self.file is None and not self._open():
+            self.caught_up = True
+            return None
+        if os.fstat(self.file.fileno()).st_size < self.offset + len(self.pending):
+            self._analyze(self.pending, trace_groups, final=True)
+            self.offset, self.pending = 0, b""
+            if self.in_place and self.session_root_path is not None:  # The copy was truncated with the log
+                self._remove_segments()
+            if self.in_place:
+                self.copy_offset, self.copy_lines, self.copy_context = 0, 0, b""
+        self.file.seek(self.offset + len(self.pending))
+        appended = self.file.read(FOLLOW_MAX_READ_BYTES)
+        self.caught_up = len(appended) < FOLLOW_MAX_READ_BYTES
+        self.idle_polls = 0 if appended else self.idle_polls + 1
+        data = self.pending + appended
+        if self.caught_up and self._rotated():
+            self._analyze(data, trace_groups, final=True)
+            self.file.close()
+            self.file = None
+            self.offset, self.pending = 0, b""
+            self.caught_up = False  # Continue with the new log at path
+        else:
+            self._analyze(data, trace_groups, settled=self.idle_polls >= FOLLOW_SETTLE_POLLS)
+        if not trace_groups.groups:
+            return None
+        self._write_segment()
+        return trace_groups.groups, {fingerprint: classify_stack_trace(group[0]) for fingerprint, group in trace_groups.groups.items()}
+
+    def checkpoint(self):
+        """Returns the log_checkpoint of the session's copy of the log, up to what was analyzed."""
+        return log_checkpoint(self.copy_path, self.offset if self.in_place else None)
+
+    def close(self):
+        for f in (self.file, self.copy_file):
+            if f is not None:
+                f.close()
+        self.file = self.copy_file = None
+        self._write_segment()
+
+    def _write_segment(self):
+        # Rewrites the segment of what was analyzed since the follower started, if it grew
+        if self.recorder is not None and self.copy_offset != self.segment_end:
+            self.recorder.write(occurrence_segment_path(self.session_root_path, os.path.basename(self.copy_path), self.segment_start),
+                                self.segment_start, self.copy_offset, self.copy_lines)
+            self.segment_end = self.copy_offset
+
+    def _remove_segments(self):
+        # Removes the occurrence segments of the copy, which no longer describe it
+        for log_name, _, path in _occurrence_segments(os.path.join(self.session_root_path, OCCURRENCES_SUBDIR)):
+            if log_name == os.path.basename(self.copy_path):
+                os.remove(path)
+        self.recorder = None
+
+    def _read_copy_context(self):
+        start = max(0, self.copy_offset - OCCURRENCE_TIMESTAMP_LOOKBACK_LINES * 4096)
+        with open(self.copy_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(self.copy_offset - start)
+        if start:
+            data = data[data.find(b"\n") + 1:]  # Drop the partial first line
+        return _timestamp_context(data)
+
+    def _count_copy_lines(self):
+        lines_before = occurrence_lines_before(os.path.join(self.session_root_path, OCCURRENCES_SUBDIR),
+                                               os.path.basename(self.copy_path), self.copy_offset)
+        if lines_before is not None:
+            return lines_before
+        line_count = 0
+        with open(self.copy_path, 'rb') as f:
+            for position in range(0, self.copy_offset, OCCURRENCE_LINE_COUNT_CHUNK):
+                line_count += f.read(min(OCCURRENCE_LINE_COUNT_CHUNK, self.copy_offset - position)).count(b"\n")
+        return line_count
+
+    def _open(self):
+        try:
+            self.file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False  # Rotated away and not created again yet
+        file_stat = os.fstat(self.file.fileno())
+        self.identity = (file_stat.st_dev, file_stat.st_ino)
+        return True
+
+    def _rotated(self):
+        try:
+            file_stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (file_stat.st_dev, file_stat.st_ino) != self.identity
+
+    def _analyze(self, data, trace_groups, final=False, settled=False):
+        if self.session_root_path is not None and self.recorder is None:
+            if self.copy_lines is None:
+                self.copy_lines = self._count_copy_lines()
+                self.copy_context = self._read_copy_context()
+            self.recorder = _OccurrenceRecorder()
+            self.segment_start = self.segment_end = self.copy_offset
+        analyzed = extract_appended_traces(data, trace_groups, final, settled, self.recorder, self.copy_offset, self.copy_lines or 0,
+                                           self.copy_context)
+        if analyzed and not self.in_place:
+            if self.copy_file is None:
+                self.copy_file = open(self.copy_path, 'ab')
+            self.copy_file.write(data[:analyzed])
+            self.copy_file.flush()
+        self.offset += analyzed
+        self.copy_offset += analyzed
+        if self.copy_lines is not None:
+            self.copy_lines += data.count(b"\n", 0, analyzed)
+            self.copy_context = _timestamp_context(self.copy_context + data[:analyzed])
+        self.pending = data[analyzed:]
+
+
+# --- Session Log Index ---
+# Each session keeps a token index over its raw logs in SESSION_LOG_INDEX_FILENAME. Logs are cut
+# into blocks of whole lines, and the index maps every lowercased [a-z0-9_] token to the blocks
+# containing it. A search only scans the blocks that can contain the query. Query tokens that may
+# be cut off are looked up by prefix, or, if they may start mid-token, in an FTS5 trigram index
+# of the vocabulary when SQLite has one. Searches ignore case: ASCII letters are compared
+# lowercased, and a query with other letters is matched by a pattern that allows each of them
+# in its lower and upper case.
+LOG_INDEX_BLOCK_SIZE = 1024 * 1024
+LOG_INDEX_CHUNK_SIZE = 64 * 1024 * 1024  # Part of a log tokenized by one worker
+LOG_INDEX_BLOCKS_PER_CHUNK = LOG_INDEX_CHUNK_SIZE // LOG_INDEX_BLOCK_SIZE + 1  # Block numbers reserved per chunk
+LOG_SEARCH_MAX_HITS = 1000
+_LOG_TOKEN_CHARS = frozenset(b"abcdefghijklmnopqrstuvwxyz0123456789_")
+# Maps token characters to their lowercase form and everything else to a space, so that
+# block.translate(...).split() yields a block's tokens.
+_LOG_TOKEN_TABLE = bytes(c if c in _LOG_TOKEN_CHARS else c + 32 if 65 <= c <= 90 else 32 for c in range(256))
+LOG_TOKEN_TRIGRAM_MIN_LENGTH = 3  # Shorter tokens can't be looked up in the trigram index
+
+
+def _line_start_at_or_after(data, position):
+    if position <= 0:
+        return 0
+    newline = data.find(b"\n", position - 1)
+    return len(data) if newline == -1 else newline + 1
+
+
+def index_log_chunk(path, start, end, first_block_number=None):
+    """Tokenizes the lines of path that start in [start, end), one LOG_INDEX_BLOCK_SIZE block at a time.
+    Blocks are numbered from first_block_number, by default start // LOG_INDEX_CHUNK_SIZE * LOG_INDEX_BLOCKS_PER_CHUNK,
+    so chunks of one log can be indexed independently. Returns ([(block number, offset, length, newline count)],
+    {token: block numbers as array('I') bytes})."""
+    blocks = []
+    postings = {}
+    if first_block_number is None:
+        first_block_number = start // LOG_INDEX_CHUNK_SIZE * LOG_INDEX_BLOCKS_PER_CHUNK
+    progress = _AnalysisProgress()
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return blocks, postings
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = _line_start_at_or_after(data, start)
+            end = _line_start_at_or_after(data, end)
+            while position < end:
+                block_end = _line_start_at_or_after(data, min(position + LOG_INDEX_BLOCK_SIZE, end))
+                block = data[position:block_end]
+                block_number = first_block_number + len(blocks)
+                for token in set(block.translate(_LOG_TOKEN_TABLE).split()):
+                    block_numbers = postings.get(token)
+                    if block_numbers is None:
+                        block_numbers = postings[token] = array.array('I')
+                    block_numbers.append(block_number)
+                blocks.append((block_number, position, block_end - position, block.count(b"\n")))
+                progress.advance(len(block))
+                position = block_end
+    progress.flush()
+    return blocks, {token: block_numbers.tobytes() for token, block_numbers in postings.items()}
+
+
+def index_log_files(paths, workers=None, progress_queue=None, cancel_event=None, starts=None, first_block_numbers=None):
+    """Builds the index of each log in paths. Large logs are split into LOG_INDEX_CHUNK_SIZE chunks so
+    a single big log is still tokenized by every worker. Yields (path_index, chunk results in file
+    order, error) once all chunks of a log are done. With starts and first_block_numbers, a log is only
+    indexed from its start offset, numbering its blocks from the given number (see SessionLogIndex.append_point)."""
+    jobs = []
+    for path_index, path in enumerate(paths):
+        size = os.path.getsize(path)
+        first_start = starts[path_index] if starts else 0
+        base_block_number = first_block_numbers[path_index] if first_block_numbers else None
+        jobs += [(path, start, start + LOG_INDEX_CHUNK_SIZE, None if base_block_number is None else base_block_number + chunk_index * LOG_INDEX_BLOCKS_PER_CHUNK)
+                 for chunk_index, start in enumerate(range(first_start, max(size, first_start + 1), LOG_INDEX_CHUNK_SIZE))]
+    chunk_results = {}
+    remaining_chunks = Counter(job[0] for job in jobs)
+    failed_paths = set()
+    for job_index, result, error in _run_analysis_jobs(index_log_chunk, jobs, workers, progress_queue, cancel_event):
+        path = jobs[job_index][0]
+        remaining_chunks[path] -= 1
+        if path in failed_paths:
+            continue
+        if error is not None:
+            failed_paths.add(path)
+            for chunk_index in [index for index in chunk_results if jobs[index][0] == path]:
+                del chunk_results[chunk_index]
+            yield paths.index(path), None, error
+            continue
+        chunk_results[job_index] = result
+        if not remaining_chunks[path]:
+            yield paths.index(path), [chunk_results.pop(index) for index in sorted(index for index in chunk_results if jobs[index][0] == path)], None
+
+
+def _log_search_pattern(query):
+    """Returns a bytes pattern that finds query whatever the case of its letters, and whether the
+    token index can narrow down the blocks to search. It can't if a letter has an ASCII letter as
+    another case (as the Kelvin sign has k), since the index only holds ASCII tokens."""
+    parts = []
+    prunable = True
+    for character in query:
+        if character.isascii():
+            parts.append(re.escape(character.encode('utf-8')))
+            continue
+        variants = sorted({character, character.lower(), character.upper()})
+        prunable = prunable and not any(variant_character.isascii() for variant in variants for variant_character in variant)
+        parts.append(b"(?:" + b"|".join(re.escape(variant.encode('utf-8')) for variant in variants) + b")")
+    return re.compile(b"".join(parts), re.IGNORECASE), prunable
+
+
+def _log_search_candidates(connection, query, has_trigrams=True):
+    """Returns {file id: set of block numbers} that can contain query, or None if every block can.
+    Query tokens in the middle of the query must be whole tokens of the log; the last one may be
+    cut off, so it is matched as a prefix, and the first one as a suffix or, if it is also the
+    last, as a substring. Those are looked up in the token_trigrams table if has_trigrams, or are
+    otherwise compared with the whole vocabulary."""
+    translated_query = query.encode('utf-8').translate(_LOG_TOKEN_TABLE)
+    tokens = translated_query.split()
+    if not tokens:
+        return None
+    open_start = translated_query[:1] != b" "
+    open_end = translated_query[-1:] != b" "
+    candidates = None
+    for token_index, token in enumerate(tokens):
+        token = token.decode('ascii')
+        cut_start = open_start and token_index == 0
+        cut_end = open_end and token_index == len(tokens) - 1
+        if cut_start and has_trigrams and len(token) < LOG_TOKEN_TRIGRAM_MIN_LENGTH:
+            continue  # Too short to look up, and found in most blocks anyway
+        if cut_start and has_trigrams:
+            # LIKE is answered from the trigrams, but takes _ in the token for any character
+            token_test = "instr(token, ?2) > 0" if cut_end else "substr(token, -length(?2)) = ?2"
+            rows = connection.execute("SELECT file_id, blocks FROM postings WHERE token IN "
+                                      f"(SELECT token FROM token_trigrams WHERE token LIKE ?1 AND {token_test})",
+                                      ("%" + token + ("%" if cut_end else ""), token))
+        elif cut_start:
+            rows = connection.execute("SELECT file_id, blocks FROM postings WHERE instr(token, ?) > 0", (token,))
+        elif cut_end:
+            rows = connection.execute("SELECT file_id, blocks FROM postings WHERE token >= ? AND token < ?", (token, token + "\x7f"))
+        else:
+            rows = connection.execute("SELECT file_id, blocks FROM postings WHERE token = ?", (token,))
+        token_candidates = {}
+        for file_id, block_numbers in rows:
+            token_candidates.setdefault(file_id, set()).update(array.array('I', block_numbers))
+        if candidates is None:
+            candidates = token_candidates
+        else:
+            candidates = {file_id: candidates[file_id] & block_numbers for file_id, block_numbers in token_candidates.items()
+                          if file_id in candidates and candidates[file_id] & block_numbers}
+        if not candidates:
+            break
+    return candidates
+
+
+class SessionLogIndex:
+    """The token index of one session's logs, stored in SQLite next to them."""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS blocks (
+            file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+            block_number INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            first_line INTEGER NOT NULL,
+            PRIMARY KEY (file_id, block_number)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS postings (
+            token TEXT NOT NULL,
+            file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+            first_block_number INTEGER NOT NULL,
+            blocks BLOB NOT NULL,
+            PRIMARY KEY (token, file_id, first_block_number)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, session_root_path):
+        self.session_root_path = session_root_path
+        self.logs_dir = os.path.join(session_root_path, SESSION_LOGS_SUBDIR)
+        self.db_path = os.path.join(session_root_path, SESSION_LOG_INDEX_FILENAME)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.executescript(self.SCHEMA)
+        self.has_trigrams = self._create_token_trigrams(connection)
+        return connection
+
+    @staticmethod
+    def _create_token_trigrams(connection):
+        """Creates the vocabulary of every token indexed and its trigram index token_trigrams, filling
+        them from an index built before they existed. Tokens stay in the vocabulary when their log is
+        removed from the index, which only costs a lookup of their postings. Returns False if SQLite
+        has no FTS5 trigram tokenizer."""
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'token_trigrams'").fetchone():
+            return True
+        try:
+            connection.executescript("""
+                BEGIN;
+                CREATE TABLE vocabulary (id INTEGER PRIMARY KEY, token TEXT NOT NULL UNIQUE);
+                CREATE VIRTUAL TABLE token_trigrams USING fts5(token, content = 'vocabulary', content_rowid = 'id', tokenize = 'trigram', detail = 'none');
+                CREATE TRIGGER vocabulary_added AFTER INSERT ON vocabulary BEGIN
+                    INSERT INTO token_trigrams (rowid, token) VALUES (new.id, new.token);
+                END;
+                INSERT INTO vocabulary (token) SELECT DISTINCT token FROM postings;
+                COMMIT;
+            """)
+        except sqlite3.OperationalError:
+            connection.rollback()
+            return False
+        return True
+
+    def append_point(self, path, start):
+        """Returns the number of the next block of the log at path if the index holds exactly its first
+        start bytes, so its remainder can be indexed on its own and stored with add_file(append=True).
+        Returns None if the log has to be indexed from the beginning."""
+        if not os.path.exists(self.db_path):
+            return None
+        with contextlib.closing(self._connect()) as connection:
+            row = connection.execute("SELECT f.size, MAX(b.block_number) FROM files f LEFT JOIN blocks b ON b.file_id = f.id WHERE f.name = ?",
+                                     (os.path.basename(path),)).fetchone()
+        if row is None or row[0] != start:
+            return None
+        if start:
+            with open(path, 'rb') as f:
+                f.seek(start - 1)
+                if f.read(1) != b"\n":
+                    return None  # The last indexed line continues past start
+        return 0 if row[1] is None else row[1] + 1
+
+    def extend(self, path):
+        """Brings the index of the log at path up to date after lines were appended to it. Only the new
+        lines are indexed if the index still holds the start of the log; otherwise the log is indexed again."""
+        indexed_size = 0
+        if os.path.exists(self.db_path):
+            with contextlib.closing(self._connect()) as connection:
+                row = connection.execute("SELECT size FROM files WHERE name = ?", (os.path.basename(path),)).fetchone()
+            indexed_size = row[0] if row else 0
+        first_block_number = self.append_point(path, indexed_size) if indexed_size else None
+        start = indexed_size if first_block_number is not None else 0
+        self.add_file(path, [index_log_chunk(path, chunk_start, chunk_start + LOG_INDEX_CHUNK_SIZE,
+                                             None if first_block_number is None else first_block_number + chunk_index * LOG_INDEX_BLOCKS_PER_CHUNK)
+                             for chunk_index, chunk_start in enumerate(range(start, os.path.getsize(path), LOG_INDEX_CHUNK_SIZE))],
+                      append=first_block_number is not None)
+
+    def add_file(self, path, chunks, append=False):
+        """Stores the index_log_chunk results of the log at path, replacing any older index of a log with
+        that name, or, with append, adding them to it."""
+        stat_result = os.stat(path)
+        with contextlib.closing(self._connect()) as connection, connection:
+            file_row = connection.execute("SELECT id FROM files WHERE name = ?", (os.path.basename(path),)).fetchone() if append else None
+            if file_row is not None:
+                file_id = file_row[0]
+                connection.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?", (stat_result.st_size, stat_result.st_mtime_ns, file_id))
+                line_number = 1
+                last_block = connection.execute("SELECT offset, length, first_line FROM blocks WHERE file_id = ? ORDER BY block_number DESC LIMIT 1",
+                                                (file_id,)).fetchone()
+                if last_block is not None:
+                    offset, length, first_line = last_block
+                    with open(path, 'rb') as f:
+                        f.seek(offset)
+                        line_number = first_line + f.read(length).count(b"\n")
+            else:
+                connection.execute("DELETE FROM files WHERE name = ?", (os.path.basename(path),))
+                file_id = connection.execute("INSERT INTO files (name, size, mtime_ns) VALUES (?, ?, ?)",
+                                             (os.path.basename(path), stat_result.st_size, stat_result.st_mtime_ns)).lastrowid
+                line_number = 1
+            for blocks, postings in chunks:
+                if not blocks:
+                    continue
+                block_rows = []
+                for block_number, offset, length, newline_count in blocks:
+                    block_rows.append((file_id, block_number, offset, length, line_number))
+                    line_number += newline_count
+                connection.executemany("INSERT INTO blocks (file_id, block_number, offset, length, first_line) VALUES (?, ?, ?, ?, ?)", block_rows)
+                if self.has_trigrams:
+                    connection.executemany("INSERT OR IGNORE INTO vocabulary (token) VALUES (?)", ((token.decode('ascii'),) for token in postings))
+                connection.executemany("INSERT INTO postings (token, file_id, first_block_number, blocks) VALUES (?, ?, ?, ?)",
+                                       ((token.decode('ascii'), file_id, blocks[0][0], block_numbers) for token, block_numbers in postings.items()))
+
+    def search(self, query, regex=False, max_hits=LOG_SEARCH_MAX_HITS):
+        """Case-insensitive search of the session's logs for query (a regular expression if regex is set).
+        Returns [(log name, line number, line)]. Logs that are missing from the index or changed since
+        they were indexed are scanned in full. Regular expressions only ignore the case of ASCII letters."""
+        prunable = not regex
+        lower_blocks = not regex and query.isascii()
+        if lower_blocks:
+            # Searching lowercased blocks with bytes.find is much faster than an IGNORECASE regex.
+            lowered_query = query.encode('utf-8').lower()
+            find = lambda lowered_block, position: lowered_block.find(lowered_query, position)
+        else:
+            if regex:
+                pattern = re.compile(query.encode('utf-8'), re.IGNORECASE)
+            else:
+                pattern, prunable = _log_search_pattern(query)
+            find = lambda block, position: (lambda match: match.start() if match else -1)(pattern.search(block, position))
+        log_names = sorted(name for name in os.listdir(self.logs_dir) if os.path.isfile(os.path.join(self.logs_dir, name))) if os.path.isdir(self.logs_dir) else []
+        hits = []
+        with contextlib.closing(self._connect()) as connection:
+            indexed_files = {name: (file_id, size, mtime_ns) for file_id, name, size, mtime_ns in connection.execute("SELECT id, name, size, mtime_ns FROM files")}
+            candidates = _log_search_candidates(connection, query, self.has_trigrams) if prunable else None
+            for name in log_names:
+                path = os.path.join(self.logs_dir, name)
+                stat_result = os.stat(path)
+                if not stat_result.st_size:
+                    continue
+                compression = detect_log_compression(path)
+                if compression:
+                    self._search_compressed_log(path, compression, lower_blocks, find, name, hits, max_hits)
+                    if len(hits) >= max_hits:
+                        return hits
+                    continue
+                file_id, size, mtime_ns = indexed_files.get(name, (None, None, None))
+                if file_id is not None and (size, mtime_ns) == (stat_result.st_size, stat_result.st_mtime_ns):
+                    if candidates is None:
+                        blocks = connection.execute("SELECT offset, length, first_line FROM blocks WHERE file_id = ? ORDER BY block_number", (file_id,)).fetchall()
+                    elif file_id in candidates:
+                        blocks = [connection.execute("SELECT offset, length, first_line FROM blocks WHERE file_id = ? AND block_number = ?",
+                                                     (file_id, block_number)).fetchone() for block_number in sorted(candidates[file_id])]
+                    else:
+                        continue
+                else:
+                    blocks = [(0, stat_result.st_size, 1)]
+                with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    for offset, length, first_line in blocks:
+                        block = data[offset:offset + length]
+                        self._search_block(block, block.lower() if lower_blocks else block, find, first_line, name, hits, max_hits)
+                        if len(hits) >= max_hits:
+                            return hits
+        return hits
+
+    def _search_compressed_log(self, path, compression, lower_blocks, find, name, hits, max_hits):
+        """Compressed logs aren't indexed; they are decompressed and scanned in full. Hits in a zip
+        archive are reported as archive/member."""
+        with open(path, 'rb') as f:
+            for member_name, stream in _iter_decompressed_streams(f, compression):
+                hit_name = f"{name}/{member_name}" if member_name else name
+                line_number = 1
+                for block in _iter_line_blocks(stream):
+                    self._search_block(block, block.lower() if lower_blocks else block, find, line_number, hit_name, hits, max_hits)
+                    if len(hits) >= max_hits:
+                        return
+                    line_number += block.count(b"\n")
+
+    @staticmethod
+    def _search_block(block, searched_block, find, line_number, name, hits, max_hits):
+        """Adds the lines of block (a run of whole lines starting at line_number) on which
+        find(searched_block, position) returns a match start. searched_block is block itself or
+        its lowercased copy."""
+        line_start = 0
+        position = 0
+        while len(hits) < max_hits:
+            match_start = find(searched_block, position)
+            if match_start == -1:
+                break
+            match_line_start = block.rfind(b"\n", line_start, match_start) + 1 or line_start
+            line_number += block.count(b"\n", line_start, match_line_start)
+            line_end = block.find(b"\n", match_start)
+            line_end = len(block) if line_end == -1 else line_end
+            hits.append((name, line_number, block[match_line_start:line_end].decode('utf-8', errors='replace').rstrip("\r")))
+            line_start = match_line_start
+            position = line_end + 1
+            if position > len(block):
+                break
+
+
+# --- Session Storage ---
+# A session folder holds the analysis results in SESSION_DATA_FILENAME, written once when the
+# logs are analyzed, and the small mutable part (name, notes, selection) in SESSION_STATE_FILENAME,
+# which is rewritten as the user works. Both are replaced atomically.
+# With SCOPE_SESSION_STORE=sqlite the index, results and state are kept in SESSION_DB_FILE
+# instead, and the session folder only holds the logs. Sessions are identified by their folder.
+SESSION_STATE_KEYS = ("session_name", "files_path", "notes", "current_selected_stack_trace_content")
+_FILE_UMASK = os.umask(0)  # Read once at startup, since the umask can only be read by setting it
+os.umask(_FILE_UMASK)
+
+
+def write_json_atomic(path, data):
+    """Writes data to a temporary file next to path and renames it over path, so an interrupted
+    save never leaves a truncated file behind. The file keeps the permissions of the one it
+    replaces, or gets those of a newly created file."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_FILE_UMASK  # mkstemp creates files readable by their owner only
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def summarize_session(session_data, size, modified):
+    """Builds the summary shown for a session in the Continue Troubleshooting list."""
+    stack_traces_data = session_data.get("stack_traces_data", {})
+    top_trace = max(stack_traces_data.values(), key=lambda trace_data: (trace_data.get("weight", 0), trace_data.get("count", 0)), default=None)
+    return {"trace_count": len(stack_traces_data),
+            "top_exception": top_trace.get("exception_name") if top_trace else None,
+            "notes_preview": (session_data.get("notes") or "").split("\n")[0][:50],
+            "size": size,
+            "modified": modified}
+
+
+class JsonSessionStore:
+    def __init__(self):
+        self.summary_cache = {}
+
+    def load_index(self):
+        """Returns {session name: session folder}. Raises FileNotFoundError when there is no index yet."""
+        with open(SESSIONS_INDEX_FILE, 'r') as f:
+            return json.load(f)
+
+    def save_index(self, sessions):
+        write_json_atomic(SESSIONS_INDEX_FILE, sessions)
+
+    def load(self, session_root_path):
+        """Loads a session's analysis results with its saved state applied on top. Sessions saved
+        before the state was split out keep everything in SESSION_DATA_FILENAME."""
+        with open(os.path.join(session_root_path, SESSION_DATA_FILENAME), 'r', encoding='utf-8') as f:
+            session_data = json.load(f)
+        state_file_path = os.path.join(session_root_path, SESSION_STATE_FILENAME)
+        if os.path.exists(state_file_path):
+            with open(state_file_path, 'r', encoding='utf-8') as f:
+                session_data.update(json.load(f))
+        return session_data
+
+    def _summary_stamp(self, session_root_path):
+        # A cached summary stays valid while both session files keep their size and mtime
+        stamp = []
+        for filename in (SESSION_DATA_FILENAME, SESSION_STATE_FILENAME):
+            try:
+                file_stat = os.stat(os.path.join(session_root_path, filename))
+                stamp += [file_stat.st_size, file_stat.st_mtime_ns]
+            except FileNotFoundError:
+                stamp += [0, 0]
+        return stamp
+
+    def load_summary(self, session_root_path):
+        """Returns the session list summary of a session (see summarize_session), read from its files."""
+        return self._build_summary(session_root_path)[1]
+
+    def _build_summary(self, session_root_path):
+        stamp = self._summary_stamp(session_root_path)
+        modified = datetime.datetime.fromtimestamp(max(stamp[1], stamp[3]) / 1e9).isoformat(timespec='seconds')
+        return stamp, summarize_session(self.load(session_root_path), stamp[0] + stamp[2], modified)
+
+    def cached_summaries(self, session_root_paths):
+        """Returns ({session folder: summary} for the sessions whose cached summary is still current,
+        [session folders whose summary has to be rebuilt with refresh_summaries])."""
+        try:
+            with open(SESSION_SUMMARY_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cache = {}
+        self.summary_cache = {}
+        summaries = {}
+        stale_session_root_paths = []
+        for session_root_path in session_root_paths:
+            entry = cache.get(session_root_path)
+            if entry and entry["stamp"] == self._summary_stamp(session_root_path):
+                self.summary_cache[session_root_path] = entry
+                summaries[session_root_path] = entry["summary"]
+            else:
+                stale_session_root_paths.append(session_root_path)
+        return summaries, stale_session_root_paths
+
+    def refresh_summaries(self, session_root_paths):
+        """Rebuilds the summaries of session_root_paths, yielding (session folder, summary) as each one
+        is ready, or (session folder, None) if the session can't be read, then saves the cache.
+        Runs on a background thread."""
+        cache = self.summary_cache
+        for session_root_path in session_root_paths:
+            try:
+                stamp, summary = self._build_summary(session_root_path)
+            except Exception:
+                yield session_root_path, None
+                continue
+            cache[session_root_path] = {"stamp": stamp, "summary": summary}
+            yield session_root_path, summary
+        try:
+            write_json_atomic(SESSION_SUMMARY_CACHE_FILE, cache)
+        except OSError:
+            pass  # Only a cache; the summaries are rebuilt next time
+
+    def save_state(self, session_root_path, session_data):
+        write_json_atomic(os.path.join(session_root_path, SESSION_STATE_FILENAME),
+                          {key: session_data.get(key) for key in SESSION_STATE_KEYS})
+
+    def load_log_files(self, session_root_path, stack_traces_data):
+        pass  # Traces are loaded with their occurrence counts
+
+    def save(self, session_root_path, session_data):
+        """Writes both the analysis results and the state of a session."""
+        write_json_atomic(os.path.join(session_root_path, SESSION_DATA_FILENAME),
+                          {key: value for key, value in session_data.items() if key not in SESSION_STATE_KEYS})
+        self.save_state(session_root_path, session_data)
+
+    def rename(self, old_session_root_path, new_session_root_path):
+        pass  # The files moved with the folder
+
+    def delete(self, session_root_path):
+        pass  # The files are removed with the folder
+
+    def write_session_files(self, session_root_path):
+        """Makes sure the session folder holds its session files, e.g. before it is archived.
+        Returns the paths of files that were written for the occasion."""
+        return []
+
+
+class SqliteSessionStore:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            files_path TEXT NOT NULL UNIQUE,
+            selected_trace_id INTEGER,
+            metadata TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS traces (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+            content TEXT NOT NULL,
+            content_digest BLOB NOT NULL,
+            fingerprint TEXT,
+            count INTEGER NOT NULL,
+            variant_count INTEGER,
+            weight INTEGER NOT NULL,
+            exception_name TEXT,
+            exception_class_key TEXT,
+            log_package_key TEXT,
+            selected_for_investigation INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS traces_by_digest ON traces(session_id, content_digest);
+        CREATE TABLE IF NOT EXISTS occurrences (
+            trace_id INTEGER NOT NULL REFERENCES traces(id) ON DELETE CASCADE,
+            log_file TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (trace_id, log_file)
+        );
+        CREATE TABLE IF NOT EXISTS notes (
+            session_id INTEGER PRIMARY KEY REFERENCES sessions(id) ON DELETE CASCADE,
+            content TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+    """
+    TRACE_COLUMNS = ("fingerprint", "count", "variant_count", "weight", "exception_name", "exception_class_key",
+                     "log_package_key", "selected_for_investigation")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._schema_ready = False
+
+    def _connect(self):
+        # A connection per operation, so sessions can be saved from the analysis thread as well.
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("PRAGMA foreign_keys = ON")
+        if not self._schema_ready:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(self.SCHEMA)
+            self._schema_ready = True
+        return connection
+
+    def _session_id(self, connection, session_root_path):
+        row = connection.execute("SELECT id FROM sessions WHERE files_path = ?", (session_root_path,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No session stored for '{session_root_path}' in '{self.db_path}'")
+        return row[0]
+
+    def load_index(self):
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Session database '{self.db_path}' not found.")
+        with contextlib.closing(self._connect()) as connection:
+            return dict(connection.execute("SELECT name, files_path FROM sessions ORDER BY id"))
+
+    def save_index(self, sessions):
+        pass  # Sessions are added, renamed and deleted row by row as it happens
+
+    def load(self, session_root_path, trace_contents=False):
+        """Loads the session at session_root_path without reading its trace bodies or occurrence counts:
+        traces are keyed by their row id, and load_trace_contents and load_log_files read the rest when
+        it is needed. Traces stored without a fingerprint, or every trace if trace_contents is set, are
+        keyed by their content and come with their occurrence counts, as the JSON store loads them."""
+        with contextlib.closing(self._connect()) as connection:
+            session_id, name, selected_trace_id, metadata = connection.execute(
+                "SELECT id, name, selected_trace_id, metadata FROM sessions WHERE files_path = ?", (session_root_path,)).fetchone() or (None,) * 4
+            if session_id is None:
+                raise FileNotFoundError(f"No session stored for '{session_root_path}' in '{self.db_path}'")
+            stack_traces_data = {}
+            content_keys_by_id = {}
+            selected_trace_key = None
+            for trace_id, content, *values in connection.execute(
+                    f"SELECT id, CASE WHEN ? OR fingerprint IS NULL THEN content END, {', '.join(self.TRACE_COLUMNS)} "
+                    "FROM traces WHERE session_id = ? ORDER BY id", (bool(trace_contents), session_id)):
+                trace_data = dict(zip(self.TRACE_COLUMNS, values))
+                trace_data["selected_for_investigation"] = bool(trace_data["selected_for_investigation"])
+                for optional_key in ("fingerprint", "variant_count"):
+                    if trace_data[optional_key] is None:
+                        del trace_data[optional_key]
+                trace_key = trace_id if content is None else content
+                stack_traces_data[trace_key] = trace_data
+                if content is not None:
+                    content_keys_by_id[trace_id] = content
+                if trace_id == selected_trace_id:
+                    selected_trace_key = trace_key
+            self._read_log_files(connection, session_id, stack_traces_data, content_keys_by_id)
+            notes_row = connection.execute("SELECT content FROM notes WHERE session_id = ?", (session_id,)).fetchone()
+        return {**json.loads(metadata), "session_name": name, "notes": notes_row[0] if notes_row else "",
+                "files_path": session_root_path, "stack_traces_data": stack_traces_data,
+                "current_selected_stack_trace_content": selected_trace_key}
+
+    def _read_log_files(self, connection, session_id, stack_traces_data, trace_keys_by_id):
+        # Sets "log_files" on the traces whose row ids are in trace_keys_by_id
+        if not trace_keys_by_id:
+            return
+        for trace_id, log_file, count in connection.execute(
+                "SELECT o.trace_id, o.log_file, o.count FROM occurrences o JOIN traces t ON t.id = o.trace_id "
+                "WHERE t.session_id = ? ORDER BY o.rowid", (session_id,)):
+            if trace_id in trace_keys_by_id:
+                stack_traces_data[trace_keys_by_id[trace_id]].setdefault("log_files", {})[log_file] = count
+
+    def load_trace_contents(self, session_root_path, trace_ids):
+        """Returns the content of each of the traces with the given row ids, by id."""
+        trace_ids = list(trace_ids)
+        contents = {}
+        with contextlib.closing(self._connect()) as connection:
+            session_id = self._session_id(connection, session_root_path)
+            for batch_start in range(0, len(trace_ids), 500):
+                batch = trace_ids[batch_start:batch_start + 500]
+                contents.update(connection.execute(
+                    f"SELECT id, content FROM traces WHERE session_id = ? AND id IN ({', '.join('?' * len(batch))})", (session_id, *batch)))
+        return contents
+
+    def load_log_files(self, session_root_path, stack_traces_data):
+        """Reads the occurrence counts of the traces in stack_traces_data that were loaded without them,
+        so that counts can be added to them."""
+        with contextlib.closing(self._connect()) as connection:
+            missing_trace_ids = {trace_key for trace_key, trace_data in stack_traces_data.items()
+                                 if isinstance(trace_key, int) and "log_files" not in trace_data}
+            if missing_trace_ids:
+                self._read_log_files(connection, self._session_id(connection, session_root_path), stack_traces_data,
+                                     {trace_id: trace_id for trace_id in missing_trace_ids})
+        for trace_key in missing_trace_ids:
+            stack_traces_data[trace_key].setdefault("log_files", {})
+
+    SUMMARY_QUERY = """
+        SELECT s.files_path,
+               (SELECT COUNT(*) FROM traces t WHERE t.session_id = s.id),
+               (SELECT t.exception_name FROM traces t WHERE t.session_id = s.id ORDER BY t.weight DESC, t.count DESC LIMIT 1),
+               substr(COALESCE(n.content, ''), 1, 50),
+               (SELECT COALESCE(SUM(length(t.content)), 0) FROM traces t WHERE t.session_id = s.id) + COALESCE(length(n.content), 0),
+               n.updated_at
+        FROM sessions s LEFT JOIN notes n ON n.session_id = s.id
+    """
+
+    def _query_summaries(self, where_clause="", parameters=()):
+        with contextlib.closing(self._connect()) as connection:
+            rows = connection.execute(self.SUMMARY_QUERY + where_clause, parameters).fetchall()
+        return {session_root_path: {"trace_count": trace_count, "top_exception": top_exception,
+                                    "notes_preview": notes_start.split("\n")[0], "size": size, "modified": modified}
+                for session_root_path, trace_count, top_exception, notes_start, size, modified in rows}
+
+    def load_summary(self, session_root_path):
+        summaries = self._query_summaries("WHERE s.files_path = ?", (session_root_path,))
+        if session_root_path not in summaries:
+            raise FileNotFoundError(f"No session stored for '{session_root_path}' in '{self.db_path}'")
+        return summaries[session_root_path]
+
+    def cached_summaries(self, session_root_paths):
+        """The database answers every summary with one query, so none has to be refreshed."""
+        all_summaries = self._query_summaries() if os.path.exists(self.db_path) else {}
+        summaries = {path: all_summaries[path] for path in session_root_paths if path in all_summaries}
+        return summaries, [path for path in session_root_paths if path not in all_summaries]
+
+    def refresh_summaries(self, session_root_paths):
+        for session_root_path in session_root_paths:
+            try:
+                yield session_root_path, self.load_summary(session_root_path)
+            except Exception:
+                yield session_root_path, None
+
+    def _write_state(self, connection, session_id, session_data):
+        selected_trace_key = session_data.get("current_selected_stack_trace_content")
+        row = None
+        if isinstance(selected_trace_key, int):
+            row = connection.execute("SELECT id FROM traces WHERE session_id = ? AND id = ?", (session_id, selected_trace_key)).fetchone()
+        elif selected_trace_key:
+            row = connection.execute("SELECT id FROM traces WHERE session_id = ? AND content_digest = ? AND content = ?",
+                                     (session_id, _trace_digest(selected_trace_key), selected_trace_key)).fetchone()
+        selected_trace_id = row[0] if row else None
+        connection.execute("UPDATE sessions SET name = ?, selected_trace_id = ? WHERE id = ?",
+                           (session_data["session_name"], selected_trace_id, session_id))
+        connection.execute("INSERT INTO notes (session_id, content, updated_at) VALUES (?, ?, ?) "
+                           "ON CONFLICT(session_id) DO UPDATE SET content = excluded.content, updated_at = excluded.updated_at",
+                           (session_id, session_data.get("notes", ""), datetime.datetime.now().isoformat(timespec='seconds')))
+
+    def save_state(self, session_root_path, session_data):
+        with contextlib.closing(self._connect()) as connection, connection:
+            self._write_state(connection, self._session_id(connection, session_root_path), session_data)
+
+    def save(self, session_root_path, session_data):
+        """Stores session_data for session_root_path in a single transaction, writing only the trace and
+        occurrence rows that changed. Traces keyed by row id, as load returns them, update their rows;
+        traces keyed by content update the row with that content or are added. Rows of traces no longer
+        in session_data are deleted."""
+        metadata = {key: value for key, value in session_data.items() if key not in SESSION_STATE_KEYS and key != "stack_traces_data"}
+        stack_traces_data = session_data.get("stack_traces_data", {})
+        with contextlib.closing(self._connect()) as connection, connection:
+            row = connection.execute("SELECT id FROM sessions WHERE files_path = ?", (session_root_path,)).fetchone()
+            if row is None:
+                session_id = connection.execute("INSERT INTO sessions (name, files_path, metadata) VALUES (?, ?, ?)",
+                                                (session_data["session_name"], session_root_path, json.dumps(metadata))).lastrowid
+            else:
+                session_id = row[0]
+                connection.execute("UPDATE sessions SET name = ?, metadata = ? WHERE id = ?",
+                                   (session_data["session_name"], json.dumps(metadata), session_id))
+            stored_values = {}
+            trace_ids_by_digest = {}
+            for trace_id, content_digest, *values in connection.execute(
+                    f"SELECT id, content_digest, {', '.join(self.TRACE_COLUMNS)} FROM traces WHERE session_id = ?", (session_id,)):
+                stored_values[trace_id] = tuple(values)
+                trace_ids_by_digest.setdefault(content_digest, []).append(trace_id)
+            # Traces keyed by content update the stored row with the same content, so the contents of the
+            # rows sharing their digests are read up front, 500 digests per query
+            content_digests = {trace_key: _trace_digest(trace_key) for trace_key in stack_traces_data if not isinstance(trace_key, int)}
+            stored_digests = list({content_digest for content_digest in content_digests.values() if content_digest in trace_ids_by_digest})
+            stored_contents = {}
+            for batch_start in range(0, len(stored_digests), 500):
+                batch = stored_digests[batch_start:batch_start + 500]
+                stored_contents.update(connection.execute(
+                    f"SELECT id, content FROM traces WHERE session_id = ? AND content_digest IN ({', '.join('?' * len(batch))})", (session_id, *batch)))
+            stored_log_files = None
+            kept_trace_ids = {trace_key for trace_key in stack_traces_data if isinstance(trace_key, int)}
+            for trace_key, trace_data in stack_traces_data.items():
+                values = (*(trace_data.get(column) for column in self.TRACE_COLUMNS[:-1]), int(bool(trace_data.get("selected_for_investigation"))))
+                log_files = trace_data.get("log_files")
+                if isinstance(trace_key, int):
+                    if trace_key not in stored_values:
+                        raise KeyError(f"Trace {trace_key} is not stored for '{session_root_path}' in '{self.db_path}'")
+                    trace_id = trace_key
+                else:
+                    content_digest = content_digests[trace_key]
+                    trace_id = next((candidate_id for candidate_id in trace_ids_by_digest.get(content_digest, ())
+                                     if candidate_id not in kept_trace_ids and stored_contents[candidate_id] == trace_key), None)
+                    if trace_id is None:
+                        trace_id = connection.execute(
+                            f"INSERT INTO traces (session_id, content, content_digest, {', '.join(self.TRACE_COLUMNS)}) "
+                            f"VALUES (?, ?, ?, {', '.join('?' * len(self.TRACE_COLUMNS))})",
+                            (session_id, trace_key, content_digest, *values)).lastrowid
+                        connection.executemany("INSERT INTO occurrences (trace_id, log_file, count) VALUES (?, ?, ?)",
+                                               [(trace_id, log_file, count) for log_file, count in (log_files or {}).items()])
+                        kept_trace_ids.add(trace_id)
+                        continue
+                    kept_trace_ids.add(trace_id)
+                if stored_values[trace_id] != values:
+                    connection.execute(f"UPDATE traces SET {', '.join(f'{column} = ?' for column in self.TRACE_COLUMNS)} WHERE id = ?",
+                                       (*values, trace_id))
+                if log_files is None:
+                    continue  # Loaded without its occurrence counts, so they have not changed
+                if stored_log_files is None:
+                    stored_log_files = {}
+                    for stored_trace_id, log_file, count in connection.execute(
+                            "SELECT o.trace_id, o.log_file, o.count FROM occurrences o JOIN traces t ON t.id = o.trace_id "
+                            "WHERE t.session_id = ?", (session_id,)):
+                        stored_log_files.setdefault(stored_trace_id, {})[log_file] = count
+                trace_stored_log_files = stored_log_files.get(trace_id, {})
+                connection.executemany("INSERT INTO occurrences (trace_id, log_file, count) VALUES (?, ?, ?) "
+                                       "ON CONFLICT(trace_id, log_file) DO UPDATE SET count = excluded.count",
+                                       [(trace_id, log_file, count) for log_file, count in log_files.items()
+                                        if trace_stored_log_files.get(log_file) != count])
+                connection.executemany("DELETE FROM occurrences WHERE trace_id = ? AND log_file = ?",
+                                       [(trace_id, log_file) for log_file in trace_stored_log_files if log_file not in log_files])
+            connection.executemany("DELETE FROM traces WHERE id = ?",
+                                   [(trace_id,) for trace_id in stored_values if trace_id not in kept_trace_ids])
+            self._write_state(connection, session_id, session_data)
+
+    def rename(self, old_session_root_path, new_session_root_path):
+        with contextlib.closing(self._connect()) as connection, connection:
+            connection.execute("UPDATE sessions SET files_path = ? WHERE files_path = ?", (new_session_root_path, old_session_root_path))
+
+    def delete(self, session_root_path):
+        with contextlib.closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM sessions WHERE files_path = ?", (session_root_path,))
+
+    def write_session_files(self, session_root_path):
+        session_data = self.load(session_root_path, trace_contents=True)
+        JsonSessionStore().save(session_root_path, session_data)
+        return [os.path.join(session_root_path, SESSION_DATA_FILENAME), os.path.join(session_root_path, SESSION_STATE_FILENAME)]
+
+
+def migrate_json_sessions_to_sqlite(db_path=SESSION_DB_FILE, base_dir=SESSION_BASE_DIR):
+    """Copies every JSON session in base_dir (and any listed in the JSON index) into the SQLite
+    store at db_path. Sessions already in the database are left alone. Returns the names migrated."""
+    json_store = JsonSessionStore()
+    sqlite_store = SqliteSessionStore(db_path)
+    try:
+        indexed_sessions = json_store.load_index()
+    except FileNotFoundError:
+        indexed_sessions = {}
+    try:
+        stored_sessions = sqlite_store.load_index()
+    except FileNotFoundError:
+        stored_sessions = {}
+    stored_paths = {os.path.normpath(path) for path in stored_sessions.values()}
+    used_names = set(stored_sessions)
+    names_by_path = {os.path.normpath(path): name for name, path in indexed_sessions.items()}
+    session_root_paths = list(indexed_sessions.values())
+    if os.path.isdir(base_dir):
+        session_root_paths += [os.path.join(base_dir, entry) for entry in sorted(os.listdir(base_dir))
+                               if os.path.isfile(os.path.join(base_dir, entry, SESSION_DATA_FILENAME))]
+
+    migrated = []
+    for session_root_path in session_root_paths:
+        key = os.path.normpath(session_root_path)
+        if key in stored_paths or not os.path.isfile(os.path.join(session_root_path, SESSION_DATA_FILENAME)):
+            continue
+        session_data = json_store.load(session_root_path)
+        base_name = names_by_path.get(key) or session_data.get("session_name") or os.path.basename(key)
+        session_name = base_name
+        i = 1
+        while session_name in used_names:
+            session_name = f"{base_name}_{i}"
+            i += 1
+        session_data["session_name"] = session_name
+        session_data["files_path"] = session_root_path
+        sqlite_store.save(session_root_path, session_data)
+        stored_paths.add(key)
+        used_names.add(session_name)
+        migrated.append(session_name)
+    return migrated
+
+
+session_store = SqliteSessionStore(SESSION_DB_FILE) if SESSION_STORE == "sqlite" else JsonSessionStore()
+
+
+# --- Session Export ---
+# A session is exported as a zip, deflated or stored, or as a zstd-compressed tar if the optional
+# zstandard package is installed. Zip members are deflated in parallel, each into a temporary file,
+# and written in order by one thread as they become ready. Files that are already compressed, or
+# that don't get smaller, are stored as they are. The log index is left out; import rebuilds it.
+EXPORT_FORMATS = {"zip": "Zip (deflate)", "zip_store": "Zip (store only, fastest)", "tar.zst": "tar.zst (zstd)"}
+EXPORT_CHUNK_SIZE = 1024 * 1024
+ALREADY_COMPRESSED_EXTENSIONS = frozenset((".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".7z", ".rar", ".jar", ".war",
+                                           ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp4", ".mov", ".avi", ".mkv", ".mp3",
+                                           ".pdf", ".docx", ".xlsx", ".pptx"))
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+class _ZipArchiveWriter:
+    """Writes a zip archive from member data compressed elsewhere, which zipfile can't do: it only
+    writes members it compresses itself, one at a time. Uses zip64 records where sizes, offsets or
+    the number of members need them."""
+
+    def __init__(self, f):
+        self.f = f
+        self.entries = []
+
+    def add(self, arcname, data_file, method, size, compressed_size, mtime, mode, crc=None, progress=None):
+        """Copies compressed_size bytes of member data from data_file. Without a crc, the data is
+        taken to be stored and the CRC is computed while copying."""
+        name = arcname.encode('utf-8')
+        zip64 = size >= _ZIP64_LIMIT or compressed_size >= _ZIP64_LIMIT
+        offset = self.f.tell()
+        local_time = time.localtime(max(mtime, 315532800))  # Zip dates start in 1980
+        dos_time = (local_time.tm_hour << 11) | (local_time.tm_min << 5) | (local_time.tm_sec // 2)
+        dos_date = ((local_time.tm_year - 1980) << 9) | (local_time.tm_mon << 5) | local_time.tm_mday
+        entry = {"name": name, "method": method, "size": size, "compressed_size": compressed_size, "offset": offset,
+                 "dos_time": dos_time, "dos_date": dos_date, "mode": mode, "crc": crc or 0, "zip64": zip64}
+        self._write_local_header(entry)
+        if data_file is not None:
+            remaining = compressed_size
+            while remaining:
+                chunk = data_file.read(min(EXPORT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"'{arcname}' changed size while it was being archived")
+                if crc is None:
+                    entry["crc"] = zlib.crc32(chunk, entry["crc"])
+                    if progress:
+                        progress.advance(len(chunk))
+                self.f.write(chunk)
+                remaining -= len(chunk)
+        if crc is None:
+            end = self.f.tell()
+            self.f.seek(offset)
+            self._write_local_header(entry)
+            self.f.seek(end)
+        self.entries.append(entry)
+
+    def _write_local_header(self, entry):
+        extra = struct.pack("<HHQQ", 1, 16, entry["size"], entry["compressed_size"]) if entry["zip64"] else b""
+        sizes = (_ZIP64_LIMIT, _ZIP64_LIMIT) if entry["zip64"] else (entry["compressed_size"], entry["size"])
+        self.f.write(struct.pack("<IHHHHHIIIHH", 0x04034b50, 45 if entry["zip64"] else 20, 0x800, entry["method"],
+                                 entry["dos_time"], entry["dos_date"], entry["crc"], *sizes, len(entry["name"]), len(extra)))
+        self.f.write(entry["name"] + extra)
+
+    def close(self):
+        """Writes the central directory."""
+        directory_offset = self.f.tell()
+        for entry in self.entries:
+            zip64_values = [value for value in (entry["size"], entry["compressed_size"], entry["offset"]) if value >= _ZIP64_LIMIT]
+            extra = struct.pack(f"<HH{len(zip64_values)}Q", 1, 8 * len(zip64_values), *zip64_values) if zip64_values else b""
+            self.f.write(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, (3 << 8) | 45, 45 if zip64_values else 20, 0x800,
+                                     entry["method"], entry["dos_time"], entry["dos_date"], entry["crc"],
+                                     min(entry["compressed_size"], _ZIP64_LIMIT), min(entry["size"], _ZIP64_LIMIT),
+                                     len(entry["name"]), len(extra), 0, 0, 0, (entry["mode"] & 0xFFFF) << 16 | (0x10 if entry["name"].endswith(b"/") else 0),
+                                     min(entry["offset"], _ZIP64_LIMIT)))
+            self.f.write(entry["name"] + extra)
+        directory_size = self.f.tell() - directory_offset
+        entry_count = len(self.entries)
+        if entry_count >= 0xFFFF or directory_offset >= _ZIP64_LIMIT or directory_size >= _ZIP64_LIMIT:
+            zip64_end_offset = self.f.tell()
+            self.f.write(struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0, entry_count, entry_count, directory_size, directory_offset))
+            self.f.write(struct.pack("<IIQI", 0x07064b50, 0, zip64_end_offset, 1))
+        self.f.write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, min(entry_count, 0xFFFF), min(entry_count, 0xFFFF),
+                                 min(directory_size, _ZIP64_LIMIT), min(directory_offset, _ZIP64_LIMIT), 0))
+
+
+def _list_export_members(session_root_path):
+    """Returns (path, archive name, stat result) for every folder and file of the session, except the log index."""
+    members = []
+    for dir_path, dir_names, file_names in os.walk(session_root_path):
+        dir_names.sort()
+        relative_dir = os.path.relpath(dir_path, session_root_path)
+        for name in dir_names + sorted(file_names):
+            if name.startswith(SESSION_LOG_INDEX_FILENAME) and relative_dir == ".":
+                continue
+            path = os.path.join(dir_path, name)
+            arcname = name if relative_dir == "." else os.path.join(relative_dir, name).replace(os.sep, "/")
+            members.append((path, arcname, os.stat(path)))
+    return members
+
+
+def _deflate_to_temp_file(path, level, temp_dir):
+    """Deflates a file into an anonymous temporary file. Returns (temporary file, CRC-32)."""
+    progress = _AnalysisProgress()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = 0
+    spool = tempfile.TemporaryFile(dir=temp_dir)
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(EXPORT_CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                spool.write(compressor.compress(chunk))
+                progress.advance(len(chunk))
+        spool.write(compressor.flush())
+        progress.flush()
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool, crc
+
+
+def _write_zip_export(f, members, deflate_level, workers, temp_dir):
+    writer = _ZipArchiveWriter(f)
+    progress = _AnalysisProgress()
+    pending = deque()
+    remaining_members = iter(members)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            member = next(remaining_members, None)
+            if member is None:
+                return
+            path, arcname, stat_result = member
+            deflate = (deflate_level is not None and os.path.isfile(path) and stat_result.st_size
+                       and os.path.splitext(arcname)[1].lower() not in ALREADY_COMPRESSED_EXTENSIONS)
+            pending.append((member, executor.submit(_deflate_to_temp_file, path, deflate_level, temp_dir) if deflate else None))
+
+        # Keep a few members compressing ahead of the writer, but not the whole session in temporary files
+        for _ in range(workers * 2):
+            submit_next()
+        try:
+            while pending:
+                (path, arcname, stat_result), future = pending.popleft()
+                submit_next()
+                if stat.S_ISDIR(stat_result.st_mode):
+                    writer.add(arcname + "/", None, zipfile.ZIP_STORED, 0, 0, stat_result.st_mtime, stat_result.st_mode, crc=0)
+                    continue
+                size = stat_result.st_size
+                if future is not None:
+                    spool, crc = future.result()
+                    with spool:
+                        compressed_size = os.fstat(spool.fileno()).st_size
+                        if compressed_size < size:
+                            writer.add(arcname, spool, zipfile.ZIP_DEFLATED, size, compressed_size, stat_result.st_mtime, stat_result.st_mode, crc=crc)
+                            continue
+                with open(path, 'rb') as source:
+                    # A file that didn't compress was already counted while it was being deflated
+                    writer.add(arcname, source, zipfile.ZIP_STORED, size, size, stat_result.st_mtime, stat_result.st_mode,
+                               progress=progress if future is None else None)
+            writer.close()
+            progress.flush()
+        finally:
+            for member, future in pending:
+                if future is not None and not future.cancel() and future.done() and future.exception() is None:
+                    future.result()[0].close()
+
+
+def _write_tar_zst_export(f, members, workers):
+    progress = _AnalysisProgress()
+    compressor = zstandard.ZstdCompressor(level=EXPORT_ZSTD_LEVEL, threads=workers)
+    with compressor.stream_writer(f) as zstd_stream, tarfile.open(fileobj=zstd_stream, mode="w|") as tar:
+        for path, arcname, stat_result in members:
+            tar_info = tar.gettarinfo(path, arcname)
+            if tar_info.isreg():
+                with open(path, 'rb') as source:
+                    tar.addfile(tar_info, _ProgressReader(source, progress))
+            else:
+                tar.addfile(tar_info)
+    progress.flush()
+
+
+def export_session_archive(session_root_path, archive_path, archive_format="zip", deflate_level=EXPORT_DEFLATE_LEVEL,
+                           workers=None, progress_queue=None, cancel_event=None):
+    """Archives the session folder into archive_path in one of EXPORT_FORMATS. The archive is written
+    next to archive_path and renamed into place when complete. Progress is posted to progress_queue as
+    ("total", bytes) and ("progress", bytes, 0), and setting cancel_event raises AnalysisCancelled."""
+    global _analysis_progress_queue, _analysis_cancel_event
+    if archive_format == "tar.zst" and zstandard is None:
+        raise RuntimeError("Exporting as tar.zst needs the 'zstandard' package (pip install zstandard)")
+    members = _list_export_members(session_root_path)
+    if progress_queue is not None:
+        progress_queue.put(("total", sum(stat_result.st_size for path, arcname, stat_result in members
+                                         if stat.S_ISREG(stat_result.st_mode))))
+    workers = workers or ANALYSIS_WORKERS
+    partial_path = archive_path + ".part"
+    _analysis_progress_queue, _analysis_cancel_event = progress_queue, cancel_event
+    try:
+        with open(partial_path, 'wb') as f:
+            if archive_format == "tar.zst":
+                _write_tar_zst_export(f, members, workers)
+            else:
+                _write_zip_export(f, members, deflate_level if archive_format == "zip" else None, workers,
+                                  os.path.dirname(os.path.abspath(archive_path)))
+        os.replace(partial_path, archive_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    finally:
+        _analysis_progress_queue = _analysis_cancel_event = None
+
+
+def unpack_session_archive(archive_path, destination_dir):
+    """Unpacks any archive export_session_archive can write, telling the formats apart by their content."""
+    with open(archive_path, 'rb') as f:
+        magic = f.read(4)
+    if magic != ZSTD_MAGIC:
+        shutil.unpack_archive(archive_path, destination_dir, 'zip')
+        return
+    if zstandard is None:
+        raise RuntimeError("Importing a .tar.zst archive needs the 'zstandard' package (pip install zstandard)")
+    with open(archive_path, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as zstd_stream, \
+            tarfile.open(fileobj=zstd_stream, mode="r|") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(destination_dir, filter="data")
+            return
+        for member in tar:
+            if os.path.isabs(member.name) or ".." in member.name.split("/") or not (member.isfile() or member.isdir()):
+                raise RuntimeError(f"Refusing to unpack '{member.name}' from the archive")
+            tar.extract(member, destination_dir)
+
+
+# --- Headless Batch Analysis ---
+# `python "Scope Concept Code.py" analyze BUNDLE...` analyzes log bundles without the GUI (and
+# without importing tkinter), one bundle per worker process, and saves each as a session that
+# can be opened in the GUI later.
+def find_bundle_logs(bundle_path):
+    """Returns the log files of a bundle: the bundle itself if it is a file, or every file with one of
+    LOG_FILE_EXTENSIONS anywhere under it if it is a folder, in path order."""
+    if os.path.isfile(bundle_path):
+        return [bundle_path]
+    log_paths = []
+    for directory, subdirectories, filenames in os.walk(bundle_path):
+        subdirectories.sort()
+        log_paths += [os.path.join(directory, filename) for filename in sorted(filenames) if filename.lower().endswith(LOG_FILE_EXTENSIONS)]
+    return log_paths
+
+
+def analyze_log_bundle(bundle_path, logs_subdir=None, definitions_key=None, session_root_path=None):
+    """Analyzes the logs of a bundle one after another, copying them into logs_subdir if it is given,
+    and through the analysis cache if definitions_key is. If session_root_path is given, the trace
+    occurrences are recorded in it. Returns (stack_traces_data, names of the logs analyzed,
+    [(log path, error)] for the logs that could not be)."""
+    log_paths = find_bundle_logs(bundle_path)
+    if not log_paths:
+        raise RuntimeError("No log files found")
+    file_results = []
+    file_names = []
+    failures = []
+    for log_path in log_paths:
+        copy_path = None
+        if logs_subdir:
+            copy_path = os.path.join(logs_subdir, os.path.basename(log_path))
+            base_path, extension = os.path.splitext(copy_path)
+            duplicate_index = 1
+            while os.path.basename(copy_path) in file_names:
+                copy_path = f"{base_path}_{duplicate_index}{extension}"
+                duplicate_index += 1
+            file_name = os.path.basename(copy_path)
+        else:
+            file_name = os.path.basename(log_path) if log_path == bundle_path else os.path.relpath(log_path, bundle_path)
+        occurrences_path = occurrence_segment_path(session_root_path, file_name) if session_root_path else None
+        try:
+            if definitions_key:
+                file_results.append(analyze_log_file_cached(log_path, copy_path, definitions_key, occurrences_path))
+            else:
+                file_results.append(analyze_log_file(log_path, copy_path, occurrences_path=occurrences_path))
+        except Exception as e:
+            failures.append((log_path, str(e)))
+            if copy_path and os.path.exists(copy_path):
+                os.remove(copy_path)
+            continue
+        file_names.append(file_name)
+    if not file_results:
+        raise RuntimeError("None of the bundle's log files could be analyzed")
+    with _profile_stage("aggregation"):
+        return merge_analysis_results(file_results, file_names), file_names, failures
+
+
+def run_analyze_command(argv):
+    """Runs the analyze command with the arguments after "analyze". Returns the exit status: 0 if every
+    bundle was analyzed, 1 if some could not be, 2 if nothing could be done."""
+    parser = argparse.ArgumentParser(prog="scope analyze",
+                                     description="Analyzes log bundles without the GUI and saves each one as a Scope session. "
+                                                 "A bundle is a folder of logs or a single, possibly compressed, log file.")
+    parser.add_argument("bundles", nargs="+", metavar="BUNDLE")
+    parser.add_argument("--output-dir", default=SESSION_BASE_DIR, help="folder the session folders are created in (default: %(default)s)")
+    parser.add_argument("--copy-logs", action="store_true", help="copy the logs into each session, as the GUI does, so they can be searched there")
+    parser.add_argument("--no-register", action="store_true", help="don't add the sessions to the GUI's session list")
+    parser.add_argument("--jsonl", metavar="FILE", help="also write one JSON object per trace of each bundle to FILE ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=ANALYSIS_WORKERS, help="bundles analyzed in parallel (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the analysis cache")
+    parser.add_argument("--timings", action="store_true", help="print the time, bytes and peak memory of each analysis stage per bundle")
+    args = parser.parse_args(argv)
+
+    try:
+        load_exception_definitions()
+        load_trace_normalization_rules()
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    try:
+        sessions = {} if args.no_register else session_store.load_index()
+    except FileNotFoundError:
+        sessions = {}
+
+    jobs = []
+    session_root_paths = []
+    profiles = []
+    definitions_key = analysis_definitions_key() if ANALYSIS_CACHE_DIR and not args.no_cache else None
+    for bundle_path in args.bundles:
+        base_name = os.path.basename(os.path.normpath(bundle_path))
+        if os.path.isfile(bundle_path):
+            base_name = base_name.split(".")[0] or base_name
+        session_name = base_name
+        duplicate_index = 1
+        while session_name in sessions or os.path.exists(os.path.join(args.output_dir, session_name)) or \
+                any(os.path.basename(path) == session_name for path in session_root_paths):
+            session_name = f"{base_name}_{duplicate_index}"
+            duplicate_index += 1
+        session_root_path = os.path.join(args.output_dir, session_name)
+        session_root_paths.append(session_root_path)
+        jobs.append((bundle_path, os.path.join(session_root_path, SESSION_LOGS_SUBDIR) if args.copy_logs else None, definitions_key, session_root_path))
+        profiles.append(PipelineProfile("analyze_command"))
+        if args.copy_logs:
+            os.makedirs(jobs[-1][1])
+
+    jsonl_file = None
+    if args.jsonl:
+        jsonl_file = sys.stdout if args.jsonl == "-" else open(args.jsonl, 'w', encoding='utf-8')
+    failed_count = 0
+    try:
+        for finished_count, (job_index, result, error) in enumerate(_run_analysis_jobs(analyze_log_bundle, jobs, args.workers, profile=profiles), 1):
+            bundle_path = jobs[job_index][0]
+            session_root_path = session_root_paths[job_index]
+            session_name = os.path.basename(session_root_path)
+            if error is not None:
+                failed_count += 1
+                print(f"[{finished_count}/{len(jobs)}] {bundle_path}: FAILED: {error}", file=sys.stderr)
+                shutil.rmtree(session_root_path, ignore_errors=True)
+                continue
+            stack_traces_data, file_names, failures = result
+            for log_path, log_error in failures:
+                print(f"WARNING: Could not analyze '{log_path}': {log_error}. Skipping.", file=sys.stderr)
+            session_data = {
+                "session_name": session_name,
+                "notes": "",
+                "files_path": session_root_path,
+                "stack_traces_data": stack_traces_data,
+                "current_selected_stack_trace_content": None
+            }
+            if args.copy_logs:
+                session_data["log_checkpoints"] = {file_name: log_checkpoint(os.path.join(jobs[job_index][1], file_name)) for file_name in file_names}
+            os.makedirs(session_root_path, exist_ok=True)
+            with profiles[job_index].stage("json_dump") as stage:
+                session_store.save(session_root_path, session_data)
+                if os.path.exists(os.path.join(session_root_path, SESSION_DATA_FILENAME)):
+                    stage["bytes"] = os.path.getsize(os.path.join(session_root_path, SESSION_DATA_FILENAME))
+            profiles[job_index].save(session_root_path)
+            sessions[session_name] = session_root_path
+
+            top_trace = max(stack_traces_data.values(), key=lambda data: (data["weight"], data["count"]), default=None)
+            print(f"[{finished_count}/{len(jobs)}] {bundle_path}: {len(file_names)} log(s), {len(stack_traces_data)} trace(s)"
+                  + (f", top: {top_trace['exception_name']} (weight {top_trace['weight']}, x{top_trace['count']})" if top_trace else "")
+                  + f" -> {session_root_path}", file=sys.stderr)
+            if args.timings:
+                print("\n".join(profiles[job_index].summary_lines()), file=sys.stderr)
+            if jsonl_file:
+                for trace_content, data in stack_traces_data.items():
+                    jsonl_file.write(json.dumps({"bundle": bundle_path, "session_name": session_name, "stack_trace": trace_content, **data}) + "\n")
+    finally:
+        if jsonl_file and jsonl_file is not sys.stdout:
+            jsonl_file.close()
+        if not args.no_register:
+            session_store.save_index(sessions)
+    return 1 if failed_count else 0
+
+
+class TraceSearchIndex:
+    """Case-insensitive substring search over the traces of a session. The lowercased traces are
+    joined into one string once, so a search is a few str.find calls over it instead of lowercasing
+    every trace again."""
+    SEPARATOR = "\0"
+
+    def __init__(self, trace_contents):
+        lowered_traces = [trace_content.lower() for trace_content in trace_contents]
+        self.starts = []
+        position = 0
+        for lowered_trace in lowered_traces:
+            self.starts.append(position)
+            position += len(lowered_trace) + len(self.SEPARATOR)
+        self.corpus = self.SEPARATOR.join(lowered_traces)
+        self.corpus_length = len(self.corpus)
+        self.added_parts = []  # Joined to corpus on the next search
+        self.last_term = ""
+        self.last_matches = set()
+
+    def add(self, trace_contents):
+        """Appends traces, which get the next trace indexes. They are only joined to the corpus when
+        it is next searched, so following a log doesn't copy the corpus on every update."""
+        for trace_content in trace_contents:
+            if self.starts:
+                self.added_parts.append(self.SEPARATOR)
+                self.corpus_length += len(self.SEPARATOR)
+            lowered_trace = trace_content.lower()
+            self.starts.append(self.corpus_length)
+            self.added_parts.append(lowered_trace)
+            self.corpus_length += len(lowered_trace)
+        self.last_term = ""
+        self.last_matches = set()
+
+    def _trace_end(self, trace_index):
+        return self.starts[trace_index + 1] - len(self.SEPARATOR) if trace_index + 1 < len(self.starts) else len(self.corpus)
+
+    def search(self, term):
+        """Returns the set of indexes of the traces containing term."""
+        if self.added_parts:
+            self.corpus += "".join(self.added_parts)
+            self.added_parts = []
+        term = term.lower()
+        if not term or self.SEPARATOR in term:
+            matches = set()
+        elif self.last_term and self.last_term in term:
+            # Typing narrows the search: only traces that matched before can still match.
+            matches = {trace_index for trace_index in self.last_matches
+                       if self.corpus.find(term, self.starts[trace_index], self._trace_end(trace_index)) != -1}
+        else:
+            matches = set()
+            position = self.corpus.find(term)
+            while position != -1:
+                trace_index = bisect.bisect_right(self.starts, position) - 1
+                matches.add(trace_index)
+                if trace_index + 1 >= len(self.starts):
+                    break
+                position = self.corpus.find(term, self.starts[trace_index + 1])
+        self.last_term, self.last_matches = term, matches
+        return matches
+
+
 troubleshooting_sessions = {}
+exception_definitions = {}
 current_session_name = None
 current_selected_stack_trace_content = None
 
 
+def import_gui_toolkit():
+    """Imports tkinter for ScopeApp. Tk is only imported to run the GUI, so the analyze command
+    and the analysis worker processes also work on machines without it or a display."""
+    global tk, filedialog, font, messagebox, scrolledtext, ttk
+    import tkinter as tk
+    from tkinter import filedialog, font, messagebox, scrolledtext, ttk
+
+
 class ScopeApp:
     def __init__(self, master):
         self.master = master
@@ -34,14 +3043,26 @@ class ScopeApp:
         self.notes_default_font_size = 11
 
         self.define_button = None 
+        self.occurrences_button = None
         self.status_textbox = None 
         self.current_session_data = None
         self.relevant_files_label = None
         self.search_entry = None
         self.search_term_var = tk.StringVar()
+        self.analysis_thread = None
+        self.analysis_locked_buttons = []
+        self.dashboard_profile = None  # PipelineProfile of the analysis whose dashboard is shown next
+        self.notes_autosave_id = None
+        self.notes_format_after_id = None
+        self.notes_format_full = False
+        self.notes_format_marker_count = 0
+        self.search_after_id = None
+        self.follow_thread = None
+        self.follow_after_id = None
 
         try:
-            self.load_exception_definitions()
+            load_exception_definitions()
+            load_trace_normalization_rules()
             self.load_escalation_template()
         except (FileNotFoundError, RuntimeError) as e:
             messagebox.showerror("Initialization Error", f"Scope cannot start: {e}\nPlease ensure '{EXCEPTION_DEFINITIONS_FILE}' and '{ESCALATION_TEMPLATE_FILE}' exist and are valid.")
@@ -53,39 +3074,29 @@ class ScopeApp:
 
         self.create_main_menu()
 
+    def on_window_close(self):
+        self.stop_following_logs()
+        self.flush_notes_autosave()
+        self.save_sessions()
+
     def load_sessions(self):
         global troubleshooting_sessions
-        if os.path.exists(SESSIONS_INDEX_FILE):
-            try:
-                with open(SESSIONS_INDEX_FILE, 'r') as f:
-                    troubleshooting_sessions = json.load(f)
-            except json.JSONDecodeError as e:
-                messagebox.showerror("Error", f"Could not load session index from {SESSIONS_INDEX_FILE}: {e}\nStarting with no previous sessions.")
-                troubleshooting_sessions = {}
-        else:
+        try:
+            troubleshooting_sessions = session_store.load_index()
+        except FileNotFoundError:
             messagebox.showinfo("Info", "No previous sessions index found. Starting fresh.")
             troubleshooting_sessions = {}
+        except (json.JSONDecodeError, sqlite3.Error) as e:
+            messagebox.showerror("Error", f"Could not load session index: {e}\nStarting with no previous sessions.")
+            troubleshooting_sessions = {}
 
     def save_sessions(self):
         global troubleshooting_sessions
         try:
-            with open(SESSIONS_INDEX_FILE, 'w') as f:
-                json.dump(troubleshooting_sessions, f, indent=4)
+            session_store.save_index(troubleshooting_sessions)
         except Exception as e:
             messagebox.showerror("Error", f"Could not save session index to {SESSIONS_INDEX_FILE}: {e}")
 
-    def load_exception_definitions(self):
-        global exception_definitions
-        if not os.path.exists(EXCEPTION_DEFINITIONS_FILE):
-            raise FileNotFoundError(f"Exception definitions file '{EXCEPTION_DEFINITIONS_FILE}' not found.")
-        try:
-            with open(EXCEPTION_DEFINITIONS_FILE, 'r', encoding='utf-8') as f:
-                exception_definitions = json.load(f)
-        except json.JSONDecodeError as e:
-            raise RuntimeError(f"Failed to parse JSON in '{EXCEPTION_DEFINITIONS_FILE}': {e}")
-        except Exception as e:
-            raise RuntimeError(f"Failed to load exception definitions from '{EXCEPTION_DEFINITIONS_FILE}': {e}")
-
     def load_escalation_template(self):
         global escalation_template_content
         if not os.path.exists(ESCALATION_TEMPLATE_FILE):
@@ -103,6 +3114,16 @@ class ScopeApp:
             raise RuntimeError(f"Failed to load escalation template from '{ESCALATION_TEMPLATE_FILE}': {e}")
 
     def create_main_menu(self):
+        self.stop_following_logs()
+        self.flush_notes_autosave()
+        if self.notes_format_after_id:
+            self.master.after_cancel(self.notes_format_after_id)
+            self.notes_format_after_id = None
+        self.notes_format_full = False
+        self.notes_format_marker_count = 0
+        if self.search_after_id:
+            self.master.after_cancel(self.search_after_id)
+            self.search_after_id = None
         for widget in self.master.winfo_children():
             widget.destroy()
 
@@ -144,14 +3165,16 @@ class ScopeApp:
         self.status_textbox = scrolledtext.ScrolledText(self.start_frame, height=5, wrap="word", font=("Courier New", 10), 
                                                         bg="#2F3136", fg="white", relief="sunken", bd=1, state="disabled")
         self.status_textbox.pack(pady=(0, 10), fill="x", padx=20)
+        self._create_analysis_progress_widgets(self.start_frame)
 
         self.back_button = tk.Button(self.start_frame, text="Back to Main Menu", command=self.create_main_menu, font=("Ubuntu", 12), activeforeground="black")
         self.back_button.pack(pady=10)
+        self.analysis_locked_buttons = [self.browse_button, self.analyze_button, self.back_button]
 
     def browse_log_files(self):
         file_paths = filedialog.askopenfilenames(
             title="Select Log Files",
-            filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("Compressed logs", "*.gz *.bz2 *.xz *.zst *.zip"), ("All files", "*.*")]
         )
         if file_paths:
             self.selected_log_files = file_paths
@@ -174,196 +3197,275 @@ class ScopeApp:
             self.status_textbox.config(state="disabled")
             self.master.update_idletasks()
 
+    def _create_analysis_progress_widgets(self, parent, bg=None):
+        progress_frame = tk.Frame(parent, bg=bg) if bg else tk.Frame(parent)
+        progress_frame.pack(fill="x", padx=20)
+        self.analysis_progress_var = tk.StringVar(value="")
+        label_options = {"bg": bg, "fg": "white"} if bg else {}
+        tk.Label(progress_frame, textvariable=self.analysis_progress_var, font=("Courier New", 10), anchor="w", **label_options).pack(side="left", fill="x", expand=True)
+        self.cancel_analysis_button = tk.Button(progress_frame, text="Cancel", command=self.cancel_analysis, font=("Ubuntu", 11), bg="#F44336", fg="black", activebackground="#D32F2F", activeforeground="black", state=tk.DISABLED)
+        self.cancel_analysis_button.pack(side="right")
+
+    def _start_analysis_task(self, task, args, on_success):
+        """Runs task(*args) on a background thread. The task reports through self.analysis_events,
+        which is polled from the Tk event loop, and must stop once self.analysis_cancel_event is set."""
+        self.analysis_events = multiprocessing.Queue()
+        self.analysis_cancel_event = multiprocessing.Event()
+        self.analysis_on_success = on_success
+        self.analysis_outcome = None
+        self.analysis_total_bytes = 0
+        self.analysis_bytes_done = 0
+        self.analysis_traces_found = 0
+        self.analysis_started_at = time.monotonic()
+        self.analysis_profile = PipelineProfile(task.__name__.lstrip("_"))
+        self.analysis_profile.session_root_path = None  # Set by tasks whose stage timings are saved with a session
+        for button in self.analysis_locked_buttons:
+            button.config(state=tk.DISABLED)
+        self.cancel_analysis_button.config(state=tk.NORMAL)
+        self.analysis_thread = threading.Thread(target=self._run_analysis_task, args=(task, args), daemon=True)
+        self.analysis_thread.start()
+        self.master.after(ANALYSIS_POLL_INTERVAL_MS, self._poll_analysis_events)
+
+    def _run_analysis_task(self, task, args):
+        try:
+            self.analysis_outcome = ("finished", task(*args))
+        except AnalysisCancelled:
+            self.analysis_outcome = ("cancelled", None)
+        except Exception as e:
+            self.analysis_outcome = ("failed", e)
+        self.analysis_events.put(("done",))
+
+    def _post_analysis_status(self, message):
+        self.analysis_events.put(("status", message))
+
+    def _poll_analysis_events(self):
+        finished = False
+        try:
+            while True:
+                event = self.analysis_events.get_nowait()
+                if event[0] == "progress":
+                    self.analysis_bytes_done += event[1]
+                    self.analysis_traces_found += event[2]
+                elif event[0] == "total":
+                    self.analysis_total_bytes = event[1]
+                elif event[0] == "status":
+                    self._update_status(event[1])
+                elif event[0] == "done":
+                    finished = True
+                    break
+        except queue.Empty:
+            pass
+
+        self._show_analysis_progress()
+        if finished:
+            self._finish_analysis_task()
+        else:
+            self.master.after(ANALYSIS_POLL_INTERVAL_MS, self._poll_analysis_events)
+
+    def _show_analysis_progress(self):
+        done_mb = self.analysis_bytes_done / (1024 * 1024)
+        total_mb = self.analysis_total_bytes / (1024 * 1024)
+        progress_text = f"{done_mb:,.1f} / {total_mb:,.1f} MB processed"
+        if self.analysis_traces_found:
+            progress_text += f", {self.analysis_traces_found:,} traces found"
+        elapsed = time.monotonic() - self.analysis_started_at
+        if 0 < self.analysis_bytes_done < self.analysis_total_bytes and elapsed > 1:
+            remaining_seconds = int((self.analysis_total_bytes - self.analysis_bytes_done) * elapsed / self.analysis_bytes_done)
+            progress_text += f", ETA {remaining_seconds // 60}:{remaining_seconds % 60:02d}"
+        self.analysis_progress_var.set(progress_text)
+
+    def _finish_analysis_task(self):
+        self.analysis_thread = None
+        self.cancel_analysis_button.config(state=tk.DISABLED)
+        for button in self.analysis_locked_buttons:
+            button.config(state=tk.NORMAL)
+
+        outcome, value = self.analysis_outcome
+        if outcome == "finished" and self.analysis_profile.session_root_path:
+            for line in self.analysis_profile.summary_lines():
+                self._update_status(line)
+            try:
+                self.analysis_profile.save(self.analysis_profile.session_root_path)
+                self.dashboard_profile = self.analysis_profile
+            except Exception as e:
+                self._update_status(f"WARNING: Could not save the stage timings: {e}")
+        self.analysis_profile.discard_profiles()
+        if outcome == "finished":
+            self.analysis_on_success(value)
+        elif outcome == "cancelled":
+            self._update_status("Analysis cancelled.", append=True)
+        else:
+            self._update_status(f"CRITICAL ERROR: {value}. Analysis aborted.", append=True)
+            messagebox.showerror("Analysis Error", f"An error occurred during analysis: {value}")
+
+    def cancel_analysis(self):
+        if self.analysis_thread:
+            self.analysis_cancel_event.set()
+            self.cancel_analysis_button.config(state=tk.DISABLED)
+            self._update_status("Cancelling analysis...", append=True)
+
     def start_new_troubleshooting_session(self):
         if not hasattr(self, 'selected_log_files') or not self.selected_log_files:
             messagebox.showerror("Error", "Please select one or more log files to analyze.")
             return
+        if self.analysis_thread:
+            return
 
         self._update_status("Starting new session...", append=False)
 
-        try:
-            global current_session_name
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            default_session_name = f"Session_{timestamp}"
-            i = 1
-            temp_name = default_session_name
-            while temp_name in troubleshooting_sessions:
-                temp_name = f"{default_session_name}_{i}"
-                i += 1
-            current_session_name = temp_name
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        default_session_name = f"Session_{timestamp}"
+        i = 1
+        temp_name = default_session_name
+        while temp_name in troubleshooting_sessions:
+            temp_name = f"{default_session_name}_{i}"
+            i += 1
 
-            session_root_dir = os.path.join(SESSION_BASE_DIR, current_session_name)
+        session_root_dir = os.path.join(SESSION_BASE_DIR, temp_name)
+        self._start_analysis_task(self._analyze_new_session, (temp_name, session_root_dir, list(self.selected_log_files)),
+                                  self._on_new_session_analyzed)
+
+    def _analyze_new_session(self, session_name, session_root_dir, selected_log_files):
+        """Background part of start_new_troubleshooting_session. Must not touch Tk widgets."""
+        try:
             logs_subdir = os.path.join(session_root_dir, SESSION_LOGS_SUBDIR)
             os.makedirs(logs_subdir, exist_ok=True)
 
-            total_files_to_process = len(self.selected_log_files)
-            self._update_status(f"Reading {total_files_to_process} file(s) for analysis...")
-            
-            log_contents_dict = {}
-            for i, original_path in enumerate(self.selected_log_files):
-                filename = os.path.basename(original_path)
-                self._update_status(f"Reading '{filename}' ({i+1}/{total_files_to_process})...")
-                try:
-                    with open(original_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        log_contents_dict[filename] = f.read()
-                except Exception as e:
-                    self._update_status(f"WARNING: Could not read '{filename}': {e}. Skipping.", append=True)
-                    log_contents_dict[filename] = ""
-            
-            if not log_contents_dict or all(not content for content in log_contents_dict.values()):
-                self._update_status("ERROR: No readable content found among your selection. Aborting.", append=True)
-                messagebox.showerror("Error", "No readable log files found among your selection. Aborting analysis.")
-                shutil.rmtree(session_root_dir)
-                return
-
-            self._update_status(f"Copying {len(log_contents_dict)} file(s) to '{os.path.basename(logs_subdir)}' in session directory...")
-            copied_files_for_analysis_paths = []
-            copied_count = 0
-            for i, (filename, content) in enumerate(log_contents_dict.items()):
-                if content:
-                    dest_path = os.path.join(logs_subdir, filename)
-                    self._update_status(f"Saving '{filename}' ({i+1}/{len(log_contents_dict)})...")
-                    try:
-                        with open(dest_path, 'w', encoding='utf-8') as f:
-                            f.write(content)
-                        copied_files_for_analysis_paths.append(dest_path)
-                        copied_count += 1
-                    except Exception as e:
-                        self._update_status(f"WARNING: Failed to save '{filename}' to session directory: {e}. This file may not be in session folder.", append=True)
-
-            if copied_count == 0:
-                self._update_status("ERROR: No log files could be saved to the session directory. Aborting.", append=True)
-                messagebox.showerror("Error", "No log files could be saved to the session directory. Aborting analysis.")
-                shutil.rmtree(session_root_dir)
-                return
-
-            self._update_status(f"Aggregating content from {copied_count} copied file(s) for analysis...")
-            full_log_content = ""
-            for copied_file_path in copied_files_for_analysis_paths:
-                try:
-                    with open(copied_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        full_log_content += f.read() + "\n"
-                except Exception as e:
-                    self._update_status(f"WARNING: Could not read copied file '{os.path.basename(copied_file_path)}' for aggregation: {e}.", append=True)
+            total_files_to_process = len(selected_log_files)
+            total_bytes = sum(os.path.getsize(path) for path in selected_log_files if os.path.isfile(path))
+            self.analysis_events.put(("total", total_bytes))
+            self._post_analysis_status(f"Copying and analyzing {total_files_to_process} file(s) for stack traces. This may take a moment...")
+
+            jobs = []
+            for original_path in selected_log_files:
+                copy_path = os.path.join(logs_subdir, os.path.basename(original_path))
+                base_path, extension = os.path.splitext(copy_path)
+                duplicate_index = 1
+                while any(copy_path == job[1] for job in jobs):
+                    copy_path = f"{base_path}_{duplicate_index}{extension}"
+                    duplicate_index += 1
+                jobs.append((original_path, copy_path, occurrence_segment_path(session_root_dir, os.path.basename(copy_path))))
+
+            file_results = [None] * len(jobs)
+            finished_count = 0
+            for job_index, result, error in analyze_log_files(jobs, progress_queue=self.analysis_events, cancel_event=self.analysis_cancel_event,
+                                                              profile=self.analysis_profile):
+                if isinstance(error, AnalysisCancelled) or self.analysis_cancel_event.is_set():
+                    raise AnalysisCancelled()
+                finished_count += 1
+                filename = os.path.basename(jobs[job_index][0])
+                if error is None:
+                    file_results[job_index] = result
+                    self._post_analysis_status(f"Analyzed '{filename}' ({finished_count}/{total_files_to_process}).")
+                else:
+                    self._post_analysis_status(f"WARNING: Could not copy or analyze '{filename}': {error}. Skipping.")
+                    if os.path.exists(jobs[job_index][1]):
+                        os.remove(jobs[job_index][1])
+            copied_paths = [job[1] for job, result in zip(jobs, file_results) if result is not None]
+            file_names = [os.path.basename(path) for path in copied_paths]
+            file_results = [result for result in file_results if result is not None]
 
-            if not full_log_content.strip():
-                self._update_status("ERROR: No aggregated content found for analysis. Aborting.", append=True)
-                messagebox.showerror("Error", "No aggregated content found for analysis. Aborting analysis.")
-                return
+            if not file_results:
+                raise RuntimeError("No log files could be saved to the session directory")
 
-            self._update_status("Analyzing log file(s) for stack traces. This may take a moment...")
-            self.master.update_idletasks()
+            self._build_log_index(session_root_dir, copied_paths, total_bytes)
 
-            unique_stack_traces_raw = self.extract_stack_traces(full_log_content)
-            counted_traces = Counter(unique_stack_traces_raw)
-            processed_traces = self.process_stack_traces_for_dashboard(counted_traces)
+            with self.analysis_profile.stage("aggregation"):
+                processed_traces = merge_analysis_results(file_results, file_names)
 
-            self.current_session_data = {
-                "session_name": current_session_name,
+            session_data = {
+                "session_name": session_name,
                 "notes": "",
                 "files_path": session_root_dir,
                 "stack_traces_data": processed_traces,
-                "current_selected_stack_trace_content": None
+                "current_selected_stack_trace_content": None,
+                "log_checkpoints": {os.path.basename(path): log_checkpoint(path) for path in copied_paths}
             }
-            session_data_file_path = os.path.join(session_root_dir, SESSION_DATA_FILENAME)
-            with open(session_data_file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.current_session_data, f, indent=4)
-
-            troubleshooting_sessions[current_session_name] = session_root_dir
-            self.save_sessions()
+            self._save_analyzed_session(session_root_dir, session_data)
+            return session_data
 
-            self._update_status("Analysis complete. Loading dashboard...", append=True)
-            self.master.after(500, lambda s=self: s.show_troubleshooting_dashboard(current_session_name))
-            
-        except Exception as e:
-            self._update_status(f"CRITICAL ERROR: {e}. Analysis aborted.", append=True)
-            messagebox.showerror("Analysis Error", f"An unexpected error occurred during analysis: {e}")
-            if 'session_root_dir' in locals() and os.path.exists(session_root_dir):
+        except BaseException:
+            if os.path.exists(session_root_dir):
                 try:
                     shutil.rmtree(session_root_dir)
-                    self._update_status(f"Cleaned up partially created session directory '{os.path.basename(session_root_dir)}'.", append=True)
+                    self._post_analysis_status(f"Cleaned up partially created session directory '{os.path.basename(session_root_dir)}'.")
                 except Exception as cleanup_e:
-                    self._update_status(f"WARNING: Failed to clean up session directory: {cleanup_e}.", append=True)
-
-
-    def extract_stack_traces(self, log_content):
-        stack_trace_pattern = re.compile(
-            r"(?:Traceback \(most recent call last\):[\s\S]*?(?=\n(?:[A-Z]+:\s+\S+|\d{4}-\d{2}-\d{2})|\Z)"
-            r"|\b(?:[a-zA-Z_][a-zA-Z0-9_]*\.)*[a-zA-Z_][a-zA-Z0-9_]*(?:Error|Exception|Warning|Throwable|RuntimeException)(?=[:\s\n]|$)(?:.*?\n)*?(?=\n(?!(?:\s*at\s+|Caused by:|^\s*\.\.\.\s+\d+\s+more\s*$))(?=\S+)|^\s*(?:[A-Z]+:\s+\S+|\d{4}-\d{2}-\d{2})|^\s*\)\s*\}\s*$|^\s*\)\s*\)\s*$|\Z))",
-            re.MULTILINE | re.DOTALL
-        )
-        return stack_trace_pattern.findall(log_content)
-
-    def process_stack_traces_for_dashboard(self, counted_traces):
-        processed_data = {}
-        full_exception_name_regex = re.compile(
-            r'\b(?:[a-zA-Z_][a-zA-Z0-9_]*\.)*[a-zA-Z_][a-zA-Z0-9_]*(?:Error|Exception|Warning|Throwable|RuntimeException)\b(?=:\s|$)'
-        )
-        simple_exception_name_regex = re.compile(
-            r'([a-zA-Z_][a-zA-Z0-9_]*(?:Error|Exception|Warning|Throwable|RuntimeException))\b$'
-        )
-
-        for trace_content, count in counted_traces.items():
-            assigned_weight = 1
-            displayed_exception_name = "Unknown Error"
-            
-            best_exception_class_key = None
-            best_log_package_key = None
-            
-            highest_exc_weight = 0
-            
-            longest_pkg_match_len = 0
+                    self._post_analysis_status(f"WARNING: Failed to clean up session directory: {cleanup_e}.")
+            raise
+
+    def _build_log_index(self, session_root_path, log_paths, analyzed_bytes, appended_from=None):
+        """Background part of analysis: indexes the session's logs for log search, storing each log's
+        index as soon as it is done. A log that cannot be indexed is scanned in full when searched.
+        appended_from maps logs that only had lines appended to the size they were indexed at, so only
+        the new lines are indexed when the existing index still matches."""
+        log_paths = [path for path in log_paths if not detect_log_compression(path)]  # Searched by decompressing instead
+        log_index = SessionLogIndex(session_root_path)
+        first_block_numbers = [None] * len(log_paths)
+        starts = [0] * len(log_paths)
+        for path_index, path in enumerate(log_paths):
+            if appended_from and path in appended_from:
+                first_block_numbers[path_index] = log_index.append_point(path, appended_from[path])
+                if first_block_numbers[path_index] is not None:
+                    starts[path_index] = appended_from[path]
+        index_bytes = sum(os.path.getsize(path) - start for path, start in zip(log_paths, starts))
+        self.analysis_events.put(("total", analyzed_bytes + index_bytes))
+        self._post_analysis_status(f"Indexing {len(log_paths)} log file(s) for log search...")
+        with self.analysis_profile.stage("index", index_bytes):
+            for path_index, chunks, error in index_log_files(log_paths, progress_queue=self.analysis_events, cancel_event=self.analysis_cancel_event,
+                                                             starts=starts, first_block_numbers=first_block_numbers):
+                if isinstance(error, AnalysisCancelled) or self.analysis_cancel_event.is_set():
+                    raise AnalysisCancelled()
+                try:
+                    if error is not None:
+                        raise error
+                    log_index.add_file(log_paths[path_index], chunks, append=first_block_numbers[path_index] is not None)
+                except Exception as e:
+                    self._post_analysis_status(f"WARNING: Could not index '{os.path.basename(log_paths[path_index])}' for log search: {e}")
+
+    def _save_analyzed_session(self, session_root_path, session_data):
+        """Background part of analysis: saves the analyzed session, timed as the json_dump stage. The
+        stage timings are saved with the session once the analysis has finished."""
+        with self.analysis_profile.stage("json_dump") as stage:
+            session_store.save(session_root_path, session_data)
+            session_data_path = os.path.join(session_root_path, SESSION_DATA_FILENAME)
+            if os.path.exists(session_data_path):
+                stage["bytes"] = os.path.getsize(session_data_path)
+        self.analysis_profile.session_root_path = session_root_path
+
+    def _on_new_session_analyzed(self, session_data):
+        global current_session_name
+        current_session_name = session_data["session_name"]
+        self.current_session_data = session_data
+        troubleshooting_sessions[current_session_name] = session_data["files_path"]
+        self.save_sessions()
 
-            extracted_full_name_from_log = None
-            extracted_simple_name_from_log = None
-            
-            lines = trace_content.split('\n')
-            for line in lines:
-                full_match = full_exception_name_regex.search(line)
-                if full_match:
-                    extracted_full_name_from_log = full_match.group(0)
-                    simple_match = simple_exception_name_regex.search(extracted_full_name_from_log)
-                    if simple_match:
-                        extracted_simple_name_from_log = simple_match.group(1)
-                    break
+        self._update_status("Analysis complete. Loading dashboard...", append=True)
+        self.master.after(500, lambda s=self, name=current_session_name: s.show_troubleshooting_dashboard(name))
 
-            if extracted_full_name_from_log:
-                displayed_exception_name = extracted_full_name_from_log
-
-                if extracted_simple_name_from_log and extracted_simple_name_from_log in exception_definitions:
-                    def_data = exception_definitions[extracted_simple_name_from_log]
-                    if "weighting" in def_data: 
-                        best_exception_class_key = extracted_simple_name_from_log
-                        highest_exc_weight = def_data["weighting"]
-
-                for defined_key, def_data in exception_definitions.items():
-                    if "." in defined_key and "weighting" not in def_data:
-                        if defined_key in extracted_full_name_from_log:
-                            if len(defined_key) > longest_pkg_match_len:
-                                best_log_package_key = defined_key
-                                longest_pkg_match_len = len(defined_key)
-            
-            assigned_weight = max(highest_exc_weight, 1)
-
-            processed_data[trace_content] = {
-                "count": count,
-                "weight": assigned_weight,
-                "exception_name": displayed_exception_name,
-                "exception_class_key": best_exception_class_key,
-                "log_package_key": best_log_package_key,
-                "selected_for_investigation": False
-            }
-        return processed_data
 
     def show_troubleshooting_dashboard(self, session_name):
+        """Shows the dashboard of session_name. Right after an analysis, building it is timed as that
+        analysis's dashboard stage."""
+        profile, self.dashboard_profile = self.dashboard_profile, None
+        if profile is None or profile.session_root_path != troubleshooting_sessions.get(session_name):
+            self._build_troubleshooting_dashboard(session_name)
+            return
+        with profile.stage("dashboard"):
+            self._build_troubleshooting_dashboard(session_name)
+            self.master.update_idletasks()
+        try:
+            profile.save(profile.session_root_path)
+        except Exception:
+            pass  # The other stages' timings were saved when the analysis finished
+
+    def _build_troubleshooting_dashboard(self, session_name):
         global current_session_name
+        self.stop_following_logs()
         current_session_name = session_name
 
         session_root_path = troubleshooting_sessions[current_session_name]
-        session_data_file = os.path.join(session_root_path, SESSION_DATA_FILENAME)
         try:
-            with open(session_data_file, 'r', encoding='utf-8') as f:
-                self.current_session_data = json.load(f)
+            self.current_session_data = session_store.load(session_root_path)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load session data for '{session_name}': {e}")
             self.create_main_menu()
@@ -403,7 +3505,7 @@ class ScopeApp:
                                     insertbackground="blue", selectbackground="#A0C8F0", selectforeground="black",
                                     highlightbackground="grey", highlightcolor="grey", highlightthickness=1)
         self.search_entry.pack(side="left", padx=5)
-        self.search_entry.bind("<KeyRelease>", lambda e, s=self: s._perform_search(e))
+        self.search_entry.bind("<KeyRelease>", lambda e, s=self: s._schedule_search(e))
 
 
         self.master_pane = tk.PanedWindow(self.dashboard_frame, orient=tk.VERTICAL, sashrelief=tk.RAISED, sashwidth=8, bd=2, bg="#2F3136")
@@ -424,37 +3526,43 @@ class ScopeApp:
                                        font=("Ubuntu", 10, "bold"), bg="#607D8B", fg="black", activebackground="#455A64", activeforeground="black",
                                        state=tk.DISABLED)
         self.define_button.pack(side="right")
-
-        self.trace_canvas = tk.Canvas(traces_pane, bg="#FFFFFF")
-        self.trace_scrollbar = tk.Scrollbar(traces_pane, orient="vertical", command=self.trace_canvas.yview)
-        self.scrollable_trace_frame = tk.Frame(self.trace_canvas, bg="#FFFFFF")
-
-        self.scrollable_trace_frame.bind(
-            "<Configure>",
-            lambda e: self.trace_canvas.configure(
-                scrollregion=self.trace_canvas.bbox("all")
-            )
-        )
-
-        self.trace_canvas.create_window((0, 0), window=self.scrollable_trace_frame, anchor="nw")
-        self.trace_canvas.configure(yscrollcommand=self.trace_scrollbar.set)
-
-        self.trace_canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        self.occurrences_button = tk.Button(traces_header_frame, text="Occurrences", command=lambda s=self: s.open_occurrences_popup(),
+                                            font=("Ubuntu", 10, "bold"), bg="#607D8B", fg="black", activebackground="#455A64", activeforeground="black",
+                                            state=tk.DISABLED)
+        self.occurrences_button.pack(side="right", padx=(0, 5))
+
+        # A Treeview only draws the rows in view, so the list opens and scrolls at the same
+        # speed however many traces a session has. Row colors are set through tags.
+        trace_list_style = ttk.Style(self.master)
+        trace_list_style.configure("TraceList.Treeview", font=("Ubuntu", 10), rowheight=24, background="#E0E0E0", fieldbackground="#FFFFFF")
+        trace_list_style.map("TraceList.Treeview", background=[("selected", "#BBDEFB")], foreground=[("selected", "black")])
+
+        self.trace_tree = ttk.Treeview(traces_pane, style="TraceList.Treeview", show="tree", selectmode="browse")
+        self.trace_tree.column("#0", stretch=True)
+        self.trace_tree.tag_configure("trace", background="#E0E0E0", foreground="black")
+        self.trace_tree.tag_configure("search_match", background="yellow", foreground="black")
+        self.trace_tree.tag_configure("selected_trace", background="#BBDEFB", foreground="black")
+        self.trace_scrollbar = tk.Scrollbar(traces_pane, orient="vertical", command=self.trace_tree.yview)
+        self.trace_tree.configure(yscrollcommand=self.trace_scrollbar.set)
+        self.trace_tree.bind("<<TreeviewSelect>>", lambda e, s=self: s._on_trace_row_selected(e))
+
+        self.trace_tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
         self.trace_scrollbar.pack(side="right", fill="y")
 
-        self.trace_buttons = {}
+        self.trace_row_ids = {}
+        self.trace_row_contents = {}
+        self.trace_contents = {}
         sorted_traces = sorted(self.current_session_data["stack_traces_data"].items(),
                                key=lambda item: (item[1]['weight'], item[1]['count']), reverse=True)
+        self.trace_search_index = None  # Built from the trace bodies when something is first searched
+        self.search_match_rows = set()
+        self.search_after_id = None
 
-        for trace_content, data in sorted_traces:
-            button_text = f"[{data['weight']}] {data['exception_name']} (x{data['count']})"
-            btn = tk.Button(self.scrollable_trace_frame, text=button_text,
-                            command=lambda s=self, tc=trace_content: s.select_stack_trace(tc),
-                            font=("Ubuntu", 10), anchor="w", justify="left",
-                            bg="#E0E0E0", fg="black", activebackground="#D0D0D0", activeforeground="black", bd=1, relief="raised")
-            btn.pack(fill="x", pady=2, padx=5)
-            btn.trace_data_keys = {'exception_class_key': data['exception_class_key'], 'log_package_key': data['log_package_key']}
-            self.trace_buttons[trace_content] = btn
+        for row_index, (trace_content, data) in enumerate(sorted_traces):
+            row_id = str(row_index)
+            self.trace_tree.insert("", tk.END, iid=row_id, text=self._trace_row_text(data), tags=("trace",))
+            self.trace_row_ids[trace_content] = row_id
+            self.trace_row_contents[row_id] = trace_content
 
         details_pane = tk.Frame(self.top_horizontal_pane, bd=2, relief="groove", bg="#FFFFFF")
         self.top_horizontal_pane.add(details_pane)
@@ -483,6 +3591,10 @@ class ScopeApp:
         self.stack_trace_code_block.config(state="disabled")
 
         self.stack_trace_code_block.tag_configure("search_highlight", background="yellow", foreground="black")
+        self.stack_trace_code_block.configure(yscrollcommand=self._on_trace_viewer_scrolled)
+        self.trace_highlight_ranges = []
+        self.trace_highlight_lines = []
+        self.trace_highlight_after_id = None
 
 
         bottom_pane_content = tk.Frame(self.master_pane, bg="#2F3136")
@@ -507,6 +3619,7 @@ class ScopeApp:
                                                  highlightthickness=0)
         self.notes_text.insert(tk.END, self.current_session_data.get("notes", ""))
         self.notes_text.pack(fill="both", expand=True, pady=5, padx=10)
+        self.notes_text.bind("<KeyPress>", lambda e, s=self: s._on_notes_key_press(e))
         self.notes_text.bind("<KeyRelease>", lambda e, s=self: s._on_notes_change(e))
         
         self.notes_text.tag_configure("code_block_tag", font=("Courier New", self.notes_default_font_size), background="#404245", foreground="white", relief="flat", borderwidth=0)
@@ -519,6 +3632,14 @@ class ScopeApp:
         self.relevant_files_label = tk.Label(bottom_pane_content, text=f"Relevant Files (copied to: {self.current_session_data['files_path']}):", font=("Ubuntu", 14, "bold"), bg="#2F3136", fg="white")
         self.relevant_files_label.pack(anchor="w", pady=(15, 5), padx=10)
         tk.Button(bottom_pane_content, text="Copy Relevant Files", command=lambda s=self: s.copy_relevant_files(), font=("Ubuntu", 12), bg="#4CAF50", fg="black", activebackground="#45a049", activeforeground="black").pack(pady=10, padx=10, anchor="w")
+        tk.Button(bottom_pane_content, text="Search Logs", command=lambda s=self: s.open_log_search_popup(), font=("Ubuntu", 12), bg="#2196F3", fg="black", activebackground="#1976D2", activeforeground="black").pack(pady=(0, 10), padx=10, anchor="w")
+        tk.Button(bottom_pane_content, text="Add Logs to Session", command=lambda s=self: s.add_logs_to_session(), font=("Ubuntu", 12), bg="#2196F3", fg="black", activebackground="#1976D2", activeforeground="black").pack(pady=(0, 10), padx=10, anchor="w")
+        follow_frame = tk.Frame(bottom_pane_content, bg="#2F3136")
+        follow_frame.pack(fill="x", pady=(0, 10), padx=10, anchor="w")
+        self.follow_button = tk.Button(follow_frame, text="Follow Logs", command=lambda s=self: s.toggle_follow_logs(), font=("Ubuntu", 12), bg="#2196F3", fg="black", activebackground="#1976D2", activeforeground="black")
+        self.follow_button.pack(side="left")
+        self.follow_status_var = tk.StringVar(value="")
+        tk.Label(follow_frame, textvariable=self.follow_status_var, font=("Ubuntu", 10), bg="#2F3136", fg="white").pack(side="left", padx=10)
 
         bottom_buttons_frame = tk.Frame(self.dashboard_frame, bg="#2F3136")
         bottom_buttons_frame.pack(fill="x", pady=(10, 0))
@@ -544,16 +3665,24 @@ class ScopeApp:
                 if sorted_traces_content:
                     self.select_stack_trace(sorted_traces_content[0])
             self.define_button.config(state=tk.NORMAL)
+            self.occurrences_button.config(state=tk.NORMAL)
         else:
             self.current_stack_trace_title.config(text="No Stack Traces Found in Log")
             self.define_button.config(state=tk.DISABLED)
+            self.occurrences_button.config(state=tk.DISABLED)
 
         # After dashboard is fully loaded, perform initial search based on an empty term
         self._perform_search() 
 
 
+    def _on_trace_row_selected(self, event=None):
+        selected_rows = self.trace_tree.selection()
+        if selected_rows and self.trace_row_contents[selected_rows[0]] != current_selected_stack_trace_content:
+            self.select_stack_trace(self.trace_row_contents[selected_rows[0]])
+
     def select_stack_trace(self, trace_content):
         global current_selected_stack_trace_content
+        previous_trace_content = current_selected_stack_trace_content
         current_selected_stack_trace_content = trace_content
 
         data = self.current_session_data["stack_traces_data"].get(trace_content)
@@ -564,52 +3693,153 @@ class ScopeApp:
         if data:
             self.stack_trace_code_block.config(state="normal")
             self.stack_trace_code_block.delete("1.0", tk.END)
-            self.stack_trace_code_block.insert(tk.END, trace_content)
+            self.stack_trace_code_block.insert(tk.END, self._trace_content(trace_content))
             self._apply_search_highlight_to_current_trace()
             self.stack_trace_code_block.config(state="disabled")
 
-            self.current_stack_trace_title.config(text=f"{data['exception_name']} (Count: {data['count']}, Weight: {data['weight']})")
+            self._show_trace_title(data)
 
-            for tr_content, btn_widget in self.trace_buttons.items():
-                self._update_trace_button_color(tr_content, btn_widget) 
+            if previous_trace_content in self.trace_row_ids:
+                self._update_trace_row_color(previous_trace_content)
+            row_id = self.trace_row_ids.get(trace_content)
+            if row_id is not None:
+                self._update_trace_row_color(trace_content)
+                if self.trace_tree.selection() != (row_id,):
+                    self.trace_tree.selection_set(row_id)
+                self.trace_tree.see(row_id)
             
             if self.define_button:
                 self.define_button.config(state=tk.NORMAL)
-
-    def _update_trace_button_color(self, trace_content, button_widget):
+            if self.occurrences_button:
+                self.occurrences_button.config(state=tk.NORMAL)
+
+    def _trace_content(self, trace_key):
+        # Traces of a SQLite session are keyed by row id, and their bodies read when first needed
+        if isinstance(trace_key, str):
+            return trace_key
+        if trace_key not in self.trace_contents:
+            self.trace_contents.update(session_store.load_trace_contents(self.current_session_data["files_path"], [trace_key]))
+        return self.trace_contents[trace_key]
+
+    def _get_trace_search_index(self):
+        if self.trace_search_index is None:
+            row_trace_keys = [self.trace_row_contents[str(row_index)] for row_index in range(len(self.trace_row_contents))]
+            unread_trace_ids = [trace_key for trace_key in row_trace_keys if not isinstance(trace_key, str) and trace_key not in self.trace_contents]
+            if unread_trace_ids:
+                self.trace_contents.update(session_store.load_trace_contents(self.current_session_data["files_path"], unread_trace_ids))
+            self.trace_search_index = TraceSearchIndex([self._trace_content(trace_key) for trace_key in row_trace_keys])
+        return self.trace_search_index
+
+    def _trace_row_text(self, data):
+        return f"[{data['weight']}] {data['exception_name']} (x{data['count']})"
+
+    def _show_trace_title(self, data):
+        self.current_stack_trace_title.config(text=f"{data['exception_name']} (Count: {data['count']}, Variants: {data.get('variant_count', 1)}, Weight: {data['weight']})")
+
+    def _update_trace_rows(self, trace_contents):
+        """Updates the rows of traces whose counts changed and adds rows for new traces, moving them to
+        where they belong in the list, without rebuilding it."""
+        stack_traces_data = self.current_session_data["stack_traces_data"]
+        sort_key = lambda trace_content: (-stack_traces_data[trace_content]['weight'], -stack_traces_data[trace_content]['count'])
+        trace_contents = set(trace_contents)
+        new_trace_contents = [trace_content for trace_content in trace_contents if trace_content not in self.trace_row_ids]
+        for trace_content in new_trace_contents:
+            # Row ids double as TraceSearchIndex trace indexes, so new rows continue the numbering
+            row_id = str(len(self.trace_row_contents))
+            self.trace_row_ids[trace_content] = row_id
+            self.trace_row_contents[row_id] = trace_content
+            self.trace_tree.insert("", tk.END, iid=row_id, tags=("trace",))
+        if self.trace_search_index is not None:
+            self.trace_search_index.add([self._trace_content(trace_content) for trace_content in new_trace_contents])
+
+        for trace_content in trace_contents:
+            row_id = self.trace_row_ids[trace_content]
+            self.trace_tree.item(row_id, text=self._trace_row_text(stack_traces_data[trace_content]))
+            self.trace_tree.detach(row_id)
+        row_keys = [sort_key(self.trace_row_contents[row_id]) for row_id in self.trace_tree.get_children()]
+        for trace_content in sorted(trace_contents, key=sort_key):
+            row_index = bisect.bisect_right(row_keys, sort_key(trace_content))
+            row_keys.insert(row_index, sort_key(trace_content))
+            self.trace_tree.move(self.trace_row_ids[trace_content], "", row_index)
+
+        if current_selected_stack_trace_content in trace_contents:
+            self._show_trace_title(stack_traces_data[current_selected_stack_trace_content])
+            self.trace_tree.selection_set(self.trace_row_ids[current_selected_stack_trace_content])
+        elif current_selected_stack_trace_content not in stack_traces_data:
+            self.select_stack_trace(self.trace_row_contents[self.trace_tree.get_children()[0]])
+        if new_trace_contents and self.search_term_var.get().strip():
+            self._perform_search()
+
+    def _update_trace_row_color(self, trace_content):
         # FIX: Declare current_selected_stack_trace_content as global
         global current_selected_stack_trace_content 
 
-        search_term = self.search_term_var.get().strip().lower()
+        row_id = self.trace_row_ids[trace_content]
         is_selected = (trace_content == current_selected_stack_trace_content)
         
         if is_selected:
-            button_widget.config(relief="sunken", bg="#BBDEFB", fg="black")
-        elif search_term and search_term in trace_content.lower():
-            button_widget.config(relief="raised", bg="yellow", fg="black")
+            row_tag = "selected_trace"
+        elif row_id in self.search_match_rows:
+            row_tag = "search_match"
         else:
-            button_widget.config(relief="raised", bg="#E0E0E0", fg="black")
+            row_tag = "trace"
+        self.trace_tree.item(row_id, tags=(row_tag,))
 
 
     def _apply_search_highlight_to_current_trace(self):
-        self.stack_trace_code_block.tag_remove("search_highlight", "1.0", tk.END)
+        """Finds the search term in the displayed trace with one pass over the trace text, then
+        tags the hits with a single tag_add call."""
         search_term = self.search_term_var.get().strip()
-
-        if search_term:
-            start_pos = "1.0"
-            while True:
-                start_pos = self.stack_trace_code_block.search(search_term, start_pos, tk.END, nocase=1)
-                if not start_pos:
-                    break
-                end_pos = self.stack_trace_code_block.index(f"{start_pos}+{len(search_term)}c")
-                self.stack_trace_code_block.tag_add("search_highlight", start_pos, end_pos)
-                start_pos = end_pos
+        trace_content = None
+        if search_term and current_selected_stack_trace_content in self.current_session_data["stack_traces_data"]:
+            trace_content = self._trace_content(current_selected_stack_trace_content)
+
+        self.trace_highlight_ranges = []
+        if search_term and trace_content:
+            line_starts = [0] + [match.end() for match in re.finditer("\n", trace_content)]
+            for match in re.finditer(re.escape(search_term), trace_content, re.IGNORECASE):
+                line_index = bisect.bisect_right(line_starts, match.start()) - 1
+                self.trace_highlight_ranges.append((line_index + 1, match.start() - line_starts[line_index], match.end() - line_starts[line_index]))
+        self.trace_highlight_lines = [line_number for line_number, start_column, end_column in self.trace_highlight_ranges]
+        self._tag_search_highlight()
+
+    def _tag_search_highlight(self):
+        self.trace_highlight_after_id = None
+        if not self.stack_trace_code_block.winfo_exists():
+            return
+        self.stack_trace_code_block.tag_remove("search_highlight", "1.0", tk.END)
+        ranges = self.trace_highlight_ranges
+        if len(ranges) > TRACE_HIGHLIGHT_VISIBLE_ONLY_HITS:
+            first_visible_line = int(self.stack_trace_code_block.index("@0,0").split(".")[0])
+            last_visible_line = int(self.stack_trace_code_block.index(f"@0,{self.stack_trace_code_block.winfo_height()}").split(".")[0])
+            ranges = ranges[bisect.bisect_left(self.trace_highlight_lines, first_visible_line - TRACE_HIGHLIGHT_MARGIN_LINES):
+                            bisect.bisect_right(self.trace_highlight_lines, last_visible_line + TRACE_HIGHLIGHT_MARGIN_LINES)]
+        if ranges:
+            tag_indices = []
+            for line_number, start_column, end_column in ranges:
+                tag_indices += (f"{line_number}.{start_column}", f"{line_number}.{end_column}")
+            self.stack_trace_code_block.tag_add("search_highlight", *tag_indices)
+
+    def _on_trace_viewer_scrolled(self, first, last):
+        self.stack_trace_code_block.vbar.set(first, last)
+        if len(self.trace_highlight_ranges) > TRACE_HIGHLIGHT_VISIBLE_ONLY_HITS and not self.trace_highlight_after_id:
+            self.trace_highlight_after_id = self.master.after_idle(self._tag_search_highlight)
+
+    def _schedule_search(self, event=None):
+        if self.search_after_id:
+            self.master.after_cancel(self.search_after_id)
+        self.search_after_id = self.master.after(SEARCH_DELAY_MS, self._perform_search)
 
     def _perform_search(self, event=None):
+        self.search_after_id = None
         self._apply_search_highlight_to_current_trace()
 
-        for trace_content, btn_widget in self.trace_buttons.items():
-            self._update_trace_button_color(trace_content, btn_widget)
+        previous_match_rows = self.search_match_rows
+        search_term = self.search_term_var.get().strip()
+        if search_term or self.trace_search_index is not None:
+            self.search_match_rows = {str(trace_index) for trace_index in self._get_trace_search_index().search(search_term)}
+        for row_id in previous_match_rows ^ self.search_match_rows:
+            self._update_trace_row_color(self.trace_row_contents[row_id])
 
 
     def increase_stack_trace_font_size(self):
@@ -647,33 +3877,160 @@ class ScopeApp:
         else:
             messagebox.showinfo("Info", "Please select a stack trace on the left to reference its name.")
 
-    def _on_notes_change(self, event=None):
-        self.save_notes()
-        self._apply_markdown_formatting()
+    def _on_notes_key_press(self, event=None):
+        """Marks the lines a keystroke can change before the Text class binding applies it, so that a
+        replaced selection or a joined line is re-tagged too."""
+        first_index = "insert -1 lines linestart"
+        last_index = "insert +1 lines lineend"
+        if self.notes_text.tag_ranges("sel"):
+            first_index = self.notes_text.index("sel.first -1 lines linestart")
+            last_index = self.notes_text.index("sel.last +1 lines lineend")
+            if self.notes_text.compare("insert -1 lines linestart", "<", first_index):
+                first_index = "insert -1 lines linestart"
+            if self.notes_text.compare("insert +1 lines lineend", ">", last_index):
+                last_index = "insert +1 lines lineend"
+        self._mark_notes_format_region(first_index, last_index)
+
+    def _mark_notes_format_region(self, first_index, last_index):
+        """Adds whole lines to the region re-tagged by the next formatting, and counts the {{code}}
+        markers they hold before they are edited (the lines added lie outside the edited region)."""
+        # The region is kept as marks rather than line numbers so it follows the text while formatting is debounced
+        if "notes_format_start" in self.notes_text.mark_names():
+            if self.notes_text.compare("notes_format_start", ">", first_index):
+                self.notes_format_marker_count += self.notes_text.get(first_index, "notes_format_start").count("{{code}}")
+            else:
+                first_index = "notes_format_start"
+            if self.notes_text.compare("notes_format_end", "<", last_index):
+                self.notes_format_marker_count += self.notes_text.get("notes_format_end", last_index).count("{{code}}")
+            else:
+                last_index = "notes_format_end"
+        else:
+            self.notes_format_marker_count = self.notes_text.get(first_index, last_index).count("{{code}}")
+        first_index = self.notes_text.index(first_index)
+        last_index = self.notes_text.index(last_index)
+        self.notes_text.mark_set("notes_format_start", first_index)
+        self.notes_text.mark_gravity("notes_format_start", "left")
+        self.notes_text.mark_set("notes_format_end", last_index)
+        self.notes_text.mark_gravity("notes_format_end", "right")
 
-    def _apply_markdown_formatting(self):
-        content = self.notes_text.get("1.0", tk.END)
+    def _on_notes_change(self, event=None):
+        if self.notes_autosave_id:
+            self.master.after_cancel(self.notes_autosave_id)
+        self.notes_autosave_id = self.master.after(NOTES_AUTOSAVE_DELAY_MS, self.save_notes)
 
-        for tag_name in ["code_block_tag", "h1_tag", "h2_tag"]:
-            self.notes_text.tag_remove(tag_name, "1.0", tk.END)
+        if event is None:
+            # Inserted programmatically (template, code block, trace name); the edited range isn't tracked
+            self.notes_format_full = True
+        else:
+            self._mark_notes_format_region("insert -1 lines linestart", "insert +1 lines lineend")
+        if self.notes_format_after_id:
+            self.master.after_cancel(self.notes_format_after_id)
+        self.notes_format_after_id = self.master.after(NOTES_FORMAT_DELAY_MS, self._apply_markdown_formatting)
 
-        code_block_pattern = re.compile(r"\{\{code\}\}(.*?)\{\{code\}\}", re.DOTALL)
-        for match in code_block_pattern.finditer(content):
-            start_index = self.notes_text.index(f"1.0 + {match.start()}c")
-            end_index = self.notes_text.index(f"1.0 + {match.end()}c")
-            self.notes_text.tag_add("code_block_tag", start_index, end_index)
+    def flush_notes_autosave(self):
+        """Saves notes right away if an autosave is still pending, e.g. before leaving the dashboard."""
+        if self.notes_autosave_id:
+            self.save_notes()
 
-        h1_pattern = re.compile(r"^h1\.(.*)", re.MULTILINE)
-        for match in h1_pattern.finditer(content):
-            start_index = self.notes_text.index(f"1.0 + {match.start()}c")
-            end_index = self.notes_text.index(f"1.0 + {match.end()}c")
-            self.notes_text.tag_add("h1_tag", start_index, end_index)
+    def _apply_markdown_formatting(self):
+        """Re-tags the notes markup. After typing only the marked lines are re-tagged, unless a {{code}}
+        marker was added or removed there: that re-pairs the markers after it, so the blocks are then
+        re-paired from the marker opening the block the edit is in. The whole buffer is rescanned for a
+        full format."""
+        self.notes_format_after_id = None
+        if not self.notes_text.winfo_exists():
+            return
 
-        h2_pattern = re.compile(r"^h2\.(.*)", re.MULTILINE)
-        for match in h2_pattern.finditer(content):
-            start_index = self.notes_text.index(f"1.0 + {match.start()}c")
-            end_index = self.notes_text.index(f"1.0 + {match.end()}c")
-            self.notes_text.tag_add("h2_tag", start_index, end_index)
+        format_all = self.notes_format_full or "notes_format_start" not in self.notes_text.mark_names()
+        if format_all:
+            first_line = 1
+            last_line = int(self.notes_text.index("end -1c").split(".")[0])
+        else:
+            first_line = int(self.notes_text.index("notes_format_start").split(".")[0])
+            last_line = int(self.notes_text.index("notes_format_end").split(".")[0])
+        region_text = self.notes_text.get(f"{first_line}.0", f"{last_line}.end")
+
+        self.notes_text.tag_remove("h1_tag", f"{first_line}.0", f"{last_line}.end")
+        self.notes_text.tag_remove("h2_tag", f"{first_line}.0", f"{last_line}.end")
+        heading_indices = {"h1_tag": [], "h2_tag": []}
+        for line_number, line in enumerate(region_text.split("\n"), first_line):
+            if line.startswith("h1."):
+                heading_indices["h1_tag"] += (f"{line_number}.0", f"{line_number}.{len(line)}")
+            elif line.startswith("h2."):
+                heading_indices["h2_tag"] += (f"{line_number}.0", f"{line_number}.{len(line)}")
+        for tag_name, tag_indices in heading_indices.items():
+            if tag_indices:
+                self.notes_text.tag_add(tag_name, *tag_indices)
+
+        marker_count_change = region_text.count("{{code}}") - self.notes_format_marker_count
+        if format_all:
+            self._format_code_blocks("1.0", "end -1c")
+        elif marker_count_change == 0:
+            self._retag_code_blocks_in_region(first_line, last_line, region_text)
+        else:
+            self._repair_code_blocks_from_region(first_line, last_line, marker_count_change % 2 == 1)
+
+        self.notes_text.mark_unset("notes_format_start", "notes_format_end")
+        self.notes_format_full = False
+        self.notes_format_marker_count = 0
+
+    def _retag_code_blocks_in_region(self, first_line, last_line, region_text):
+        """Re-tags the blocks in the region when it holds as many markers as before the edit, so every
+        marker outside it kept its pairing and the tags around the region still tell where blocks are."""
+        inside_code_block = first_line > 1 and "code_block_tag" in self.notes_text.tag_names(f"{first_line - 1}.end")
+        block_start = 0
+        tag_offsets = []
+        for match in re.finditer(r"\{\{code\}\}", region_text):
+            if inside_code_block:
+                tag_offsets += (block_start, match.end())
+            else:
+                block_start = match.start()
+            inside_code_block = not inside_code_block
+        # A block left open at the end of the region is closed after it if the text after it is tagged
+        if inside_code_block and "code_block_tag" in self.notes_text.tag_names(f"{last_line + 1}.0"):
+            tag_offsets += (block_start, len(region_text) + 1)
+        self.notes_text.tag_remove("code_block_tag", f"{first_line}.0", f"{last_line + 1}.0")
+        if tag_offsets:
+            self.notes_text.tag_add("code_block_tag", *self._notes_offsets_to_indices(first_line, 0, region_text + "\n", tag_offsets))
+
+    def _repair_code_blocks_from_region(self, first_line, last_line, pairing_flipped):
+        """Re-pairs the markers from the one opening the block the region starts in. An odd change in
+        the number of markers flips the pairing of every marker after the region; otherwise only the
+        block still open at the end of the region runs past it."""
+        start_index = f"{first_line}.0"
+        block_range = self.notes_text.tag_prevrange("code_block_tag", start_index)
+        if first_line > 1 and "code_block_tag" in self.notes_text.tag_names(f"{first_line - 1}.end"):
+            start_index = block_range[0]
+        else:
+            # A marker without a closing one isn't tagged, but still opens a block
+            marker_index = self.notes_text.search("{{code}}", start_index, backwards=True, stopindex=block_range[1] if block_range else "1.0")
+            if marker_index and "code_block_tag" not in self.notes_text.tag_names(marker_index):
+                start_index = marker_index
+        end_index = "end -1c" if pairing_flipped else f"{last_line + 1}.0"
+        if not pairing_flipped and self.notes_text.get(start_index, end_index).count("{{code}}") % 2 == 1:
+            closing_index = self.notes_text.search("{{code}}", end_index, stopindex="end")
+            end_index = f"{closing_index} +8c" if closing_index else "end -1c"
+        self._format_code_blocks(start_index, end_index)
+
+    def _format_code_blocks(self, start_index, end_index):
+        """Pairs the markers between start_index, which must not lie inside a block, and end_index."""
+        start_index = self.notes_text.index(start_index)
+        content = self.notes_text.get(start_index, end_index)
+        tag_offsets = [offset for match in re.finditer(r"\{\{code\}\}(.*?)\{\{code\}\}", content, re.DOTALL) for offset in match.span()]
+        self.notes_text.tag_remove("code_block_tag", start_index, end_index)
+        if tag_offsets:
+            first_line, first_column = map(int, start_index.split("."))
+            self.notes_text.tag_add("code_block_tag", *self._notes_offsets_to_indices(first_line, first_column, content, tag_offsets))
+
+    @staticmethod
+    def _notes_offsets_to_indices(first_line, first_column, content, offsets):
+        """Converts character offsets into content, which starts at first_line.first_column, to Text indices."""
+        line_starts = [0] + [match.end() for match in re.finditer("\n", content)]
+        indices = []
+        for offset in offsets:
+            line_index = bisect.bisect_right(line_starts, offset) - 1
+            indices.append(f"{first_line + line_index}.{offset - line_starts[line_index] + (first_column if line_index == 0 else 0)}")
+        return indices
 
 
     def _get_combined_definition_text(self, exception_class_key, log_package_key):
@@ -741,6 +4098,152 @@ class ScopeApp:
         y = self.master.winfo_y() + (self.master.winfo_height() // 2) - (popup_window.winfo_height() // 2)
         popup_window.geometry(f"+{x}+{y}")
 
+    def open_log_search_popup(self):
+        if not current_session_name or not self.current_session_data:
+            messagebox.showinfo("Info", "Please start or continue a troubleshooting session first.")
+            return
+
+        log_index = SessionLogIndex(self.current_session_data["files_path"])
+
+        popup_window = tk.Toplevel(self.master)
+        popup_window.title("Search Logs")
+        popup_window.geometry("900x500")
+        popup_window.transient(self.master)
+
+        search_frame = tk.Frame(popup_window)
+        search_frame.pack(fill="x", padx=10, pady=(10, 5))
+        tk.Label(search_frame, text="Find in logs:", font=("Ubuntu", 11)).pack(side="left")
+        query_entry = tk.Entry(search_frame, font=("Ubuntu", 11), bd=1, relief="solid")
+        query_entry.pack(side="left", fill="x", expand=True, padx=5)
+        regex_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Regex", variable=regex_var, font=("Ubuntu", 10)).pack(side="left")
+
+        results_status_var = tk.StringVar(value="Matching lines are listed as file:line.")
+        tk.Label(popup_window, textvariable=results_status_var, font=("Ubuntu", 10, "italic"), anchor="w").pack(fill="x", padx=10)
+
+        results_frame = tk.Frame(popup_window)
+        results_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        results_listbox = tk.Listbox(results_frame, font=("Courier New", 10), selectbackground="#A0C8F0", selectforeground="black")
+        results_scrollbar = tk.Scrollbar(results_frame, orient="vertical", command=results_listbox.yview)
+        results_listbox.configure(yscrollcommand=results_scrollbar.set)
+        results_listbox.pack(side="left", fill="both", expand=True)
+        results_scrollbar.pack(side="right", fill="y")
+
+        def run_search(event=None):
+            query = query_entry.get()
+            if not query:
+                return
+            started_at = time.monotonic()
+            try:
+                hits = log_index.search(query, regex=regex_var.get())
+            except re.error as e:
+                messagebox.showerror("Search Error", f"Invalid regular expression: {e}", parent=popup_window)
+                return
+            except (OSError, sqlite3.Error) as e:
+                messagebox.showerror("Search Error", f"Could not search the session logs: {e}", parent=popup_window)
+                return
+            results_listbox.delete(0, tk.END)
+            for log_name, line_number, line in hits:
+                results_listbox.insert(tk.END, f"{log_name}:{line_number}: {line}")
+            truncated_note = f" (showing the first {LOG_SEARCH_MAX_HITS})" if len(hits) >= LOG_SEARCH_MAX_HITS else ""
+            results_status_var.set(f"{len(hits):,} matching line(s){truncated_note} in {time.monotonic() - started_at:.2f}s")
+
+        query_entry.bind("<Return>", run_search)
+
+        button_frame = tk.Frame(popup_window)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Search", command=run_search,
+                  font=("Ubuntu", 10), bg="#2196F3", fg="black", activebackground="#1976D2", activeforeground="black").pack(side="left", padx=5)
+        tk.Button(button_frame, text="Close", command=popup_window.destroy,
+                  font=("Ubuntu", 10), bg="#F44336", fg="black", activebackground="#D32F2F", activeforeground="black").pack(side="left", padx=5)
+        query_entry.focus_set()
+
+    def open_occurrences_popup(self):
+        """Lists every occurrence of the selected trace, read from the session's occurrence segments."""
+        if not current_selected_stack_trace_content:
+            messagebox.showinfo("Info", "Please select a stack trace first to view its occurrences.")
+            return
+
+        trace_data = self.current_session_data["stack_traces_data"].get(current_selected_stack_trace_content)
+        if not trace_data:
+            messagebox.showerror("Error", "Selected stack trace data not found in current session data.")
+            return
+
+        session_root_path = self.current_session_data["files_path"]
+        fingerprint = trace_data.get("fingerprint") or fingerprint_stack_trace(self._trace_content(current_selected_stack_trace_content))
+        started_at = time.monotonic()
+        occurrences = SessionOccurrences(session_root_path)
+        if not occurrences.segments:
+            messagebox.showinfo("Info", "This session was analyzed before trace occurrences were recorded. Re-analyze its logs to list them.")
+            return
+        try:
+            file_ids, offsets, line_numbers, timestamps = occurrences.lookup(fingerprint)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not read the trace occurrences: {e}")
+            return
+        lookup_seconds = time.monotonic() - started_at
+
+        known_timestamps = [timestamp for timestamp in timestamps if not math.isnan(timestamp)]
+        summary = f"{len(offsets):,} occurrence(s) in {len(set(file_ids))} log(s)"
+        if known_timestamps:
+            summary += f", first {format_log_timestamp(min(known_timestamps))}, last {format_log_timestamp(max(known_timestamps))}"
+        summary += f" (looked up in {lookup_seconds:.3f}s)"
+        if len(offsets) > OCCURRENCE_LIST_MAX_ROWS:
+            summary += f". Showing the first {OCCURRENCE_LIST_MAX_ROWS:,}."
+
+        popup_window = tk.Toplevel(self.master)
+        popup_window.title(f"Occurrences of {trace_data.get('exception_name', 'Stack Trace')}")
+        popup_window.geometry("900x600")
+        popup_window.transient(self.master)
+
+        tk.Label(popup_window, text=summary, font=("Ubuntu", 10, "italic"), anchor="w", justify="left", wraplength=860).pack(fill="x", padx=10, pady=(10, 5))
+
+        occurrences_pane = tk.PanedWindow(popup_window, orient=tk.VERTICAL, sashrelief=tk.RAISED, sashwidth=6)
+        occurrences_pane.pack(fill="both", expand=True, padx=10, pady=5)
+
+        list_frame = tk.Frame(occurrences_pane)
+        occurrences_listbox = tk.Listbox(list_frame, font=("Courier New", 10), selectbackground="#A0C8F0", selectforeground="black")
+        list_scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=occurrences_listbox.yview)
+        occurrences_listbox.configure(yscrollcommand=list_scrollbar.set)
+        occurrences_listbox.pack(side="left", fill="both", expand=True)
+        list_scrollbar.pack(side="right", fill="y")
+        occurrences_pane.add(list_frame, height=250)
+
+        context_text = scrolledtext.ScrolledText(occurrences_pane, height=12, wrap="none", font=("Courier New", 9), relief="sunken", bd=1,
+                                                 selectbackground="#A0C8F0", selectforeground="black", state="disabled")
+        occurrences_pane.add(context_text)
+
+        shown_count = min(len(offsets), OCCURRENCE_LIST_MAX_ROWS)
+        occurrences_listbox.insert(tk.END, *(f"{occurrences.log_names[file_ids[i]]}:{line_numbers[i]}  {format_log_timestamp(timestamps[i]) or '-':<23}  @{offsets[i]}"
+                                             for i in range(shown_count)))
+
+        def show_context(event=None):
+            selected = occurrences_listbox.curselection()
+            if not selected:
+                return
+            index = selected[0]
+            log_path = os.path.join(session_root_path, SESSION_LOGS_SUBDIR, occurrences.log_names[file_ids[index]])
+            try:
+                if detect_log_compression(log_path) is not None:
+                    context = "The context of occurrences in compressed logs isn't shown. Its offset refers to the decompressed log."
+                else:
+                    with open(log_path, 'rb') as f:
+                        f.seek(offsets[index])
+                        context = "".join(f.readline().decode('utf-8', errors='replace') for _ in range(OCCURRENCE_CONTEXT_LINES))
+            except OSError as e:
+                context = f"Could not read {log_path}: {e}"
+            context_text.config(state="normal")
+            context_text.delete("1.0", tk.END)
+            context_text.insert(tk.END, context)
+            context_text.config(state="disabled")
+
+        occurrences_listbox.bind("<<ListboxSelect>>", show_context)
+
+        button_frame = tk.Frame(popup_window)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Close", command=popup_window.destroy,
+                  font=("Ubuntu", 10), bg="#F44336", fg="black", activebackground="#D32F2F", activeforeground="black").pack(side="left", padx=5)
+
     def copy_definition_to_clipboard(self, text_to_copy):
         self.master.clipboard_clear()
         self.master.clipboard_append(text_to_copy)
@@ -795,30 +4298,30 @@ class ScopeApp:
 
     def save_notes(self, event=None):
         global current_session_name
+        if self.notes_autosave_id:
+            self.master.after_cancel(self.notes_autosave_id)
+            self.notes_autosave_id = None
         if current_session_name and self.current_session_data:
             session_root_path = troubleshooting_sessions[current_session_name]
-            session_data_file = os.path.join(session_root_path, SESSION_DATA_FILENAME)
             
             self.current_session_data["notes"] = self.notes_text.get("1.0", tk.END).strip()
 
             try:
-                with open(session_data_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.current_session_data, f, indent=4)
+                session_store.save_state(session_root_path, self.current_session_data)
             except Exception as e:
                 messagebox.showerror("Error", f"Could not save notes to session file: {e}")
 
     def save_current_session_data(self):
-        """Saves the current_session_data instance attribute to its session.json file.
+        """Saves the state of current_session_data (name, notes, selection) to its session folder.
+        The analysis results in session.json never change once written.
         This also updates the main session index."""
         if current_session_name and self.current_session_data:
             session_root_path = troubleshooting_sessions[current_session_name]
-            session_data_file_path = os.path.join(session_root_path, SESSION_DATA_FILENAME)
             try:
-                with open(session_data_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.current_session_data, f, indent=4)
+                session_store.save_state(session_root_path, self.current_session_data)
                 self.save_sessions()
             except Exception as e:
-                messagebox.showerror("Error", f"Could not save current session data to '{session_data_file_path}': {e}")
+                messagebox.showerror("Error", f"Could not save current session data to '{session_root_path}': {e}")
 
 
     def rename_dashboard(self):
@@ -838,12 +4341,14 @@ class ScopeApp:
             messagebox.showerror("Error", "A dashboard with this name already exists. Please choose a unique name.")
             return
 
+        self.stop_following_logs()  # The followed logs are copied into the session folder
         old_session_root_path = troubleshooting_sessions[old_name]
         new_session_root_path = os.path.join(SESSION_BASE_DIR, new_name)
 
         try:
             if os.path.exists(old_session_root_path):
                 os.rename(old_session_root_path, new_session_root_path)
+            session_store.rename(old_session_root_path, new_session_root_path)
             
             self.current_session_data["session_name"] = new_name
             self.current_session_data["files_path"] = new_session_root_path
@@ -864,7 +4369,7 @@ class ScopeApp:
             
             messagebox.showinfo("Renamed", f"Dashboard renamed to '{new_name}'")
 
-        except OSError as e:
+        except (OSError, sqlite3.Error) as e:
             messagebox.showerror("Rename Error", f"Could not rename directory from '{os.path.basename(old_name)}' to '{new_name}': {e}\nSession name updated in app, but directory rename failed. Please manually rename it if necessary.")
             self.current_session_data["session_name"] = old_name
             self.current_session_data["files_path"] = old_session_root_path
@@ -902,6 +4407,7 @@ class ScopeApp:
         if not current_session_name or not self.current_session_data:
             messagebox.showinfo("Info", "No active troubleshooting session to export notes from.")
             return
+        self.flush_notes_autosave()
 
         notes = self.current_session_data["notes"]
         
@@ -911,7 +4417,7 @@ class ScopeApp:
 
         if selected_trace_content and "stack_traces_data" in self.current_session_data and selected_trace_content in self.current_session_data["stack_traces_data"]:
             trace_data = self.current_session_data["stack_traces_data"].get(selected_trace_content)
-            stack_trace_for_export = selected_trace_content
+            stack_trace_for_export = self._trace_content(selected_trace_content)
             exception_name_for_export = trace_data.get("exception_name", "N/A")
 
         session_name_for_export = self.current_session_data.get("session_name", "Unknown Session")
@@ -949,44 +4455,426 @@ Local Path: {self.current_session_data['files_path']}
             except Exception as e:
                 messagebox.showerror("Export Error", f"Could not export notes: {e}")
 
+    def add_logs_to_session(self):
+        if not current_session_name or not self.current_session_data:
+            messagebox.showinfo("Info", "No active session to add logs to.")
+            return
+        if self.analysis_thread:
+            return
+        self.stop_following_logs()
+        file_paths = filedialog.askopenfilenames(
+            title="Select Log Files to Add",
+            filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("Compressed logs", "*.gz *.bz2 *.xz *.zst *.zip"), ("All files", "*.*")]
+        )
+        if not file_paths:
+            return
+        self.flush_notes_autosave()
+
+        popup_window = tk.Toplevel(self.master)
+        popup_window.title("Add Logs to Session")
+        popup_window.geometry("520x220")
+        popup_window.transient(self.master)
+        popup_window.grab_set()
+        tk.Label(popup_window, text=f"Adding {len(file_paths)} log file(s) to '{current_session_name}'.\n"
+                                    "Logs already in the session are only analyzed past what was analyzed before.",
+                 font=("Ubuntu", 10), justify="left").pack(anchor="w", padx=15, pady=(15, 0))
+        close_popup = self._create_task_popup_widgets(popup_window)
+        close_button = tk.Button(popup_window, text="Close", command=close_popup,
+                                 font=("Ubuntu", 11), bg="#F44336", fg="black", activebackground="#D32F2F", activeforeground="black")
+        close_button.pack(pady=10)
+        self.analysis_locked_buttons = [close_button]
+
+        self._update_status("Adding logs to session...", append=False)
+        self._start_analysis_task(self._add_logs_to_session, (current_session_name, dict(self.current_session_data), list(file_paths)),
+                                  lambda added: self._on_logs_added(added, close_popup))
+
+    def _add_logs_to_session(self, session_name, session_data, selected_log_files):
+        """Background part of add_logs_to_session. Must not touch Tk widgets. A selected file that is one
+        of the session's logs with lines appended only has the appended part copied and analyzed; any
+        other file is copied in as a new log. Returns (new logs, appended logs, unchanged logs)."""
+        session_root_path = session_data["files_path"]
+        logs_subdir = os.path.join(session_root_path, SESSION_LOGS_SUBDIR)
+        os.makedirs(logs_subdir, exist_ok=True)
+        log_checkpoints = session_log_checkpoints(logs_subdir, session_data.get("log_checkpoints"))
+        existing_names = set(os.listdir(logs_subdir))
+
+        jobs = []
+        appended_from = {}
+        unchanged_names = []
+        for original_path in selected_log_files:
+            name = os.path.basename(original_path)
+            checkpoint = log_checkpoints.get(name)
+            start = appended_log_start(checkpoint, original_path) if checkpoint and name in existing_names else None
+            if start is not None and start == os.path.getsize(original_path):
+                unchanged_names.append(name)
+                self._post_analysis_status(f"'{name}' has not changed since it was analyzed. Skipping.")
+                continue
+            copy_path = os.path.join(logs_subdir, name)
+            if start is None:
+                base_path, extension = os.path.splitext(copy_path)
+                duplicate_index = 1
+                while os.path.basename(copy_path) in existing_names or any(copy_path == job[1] for job in jobs):
+                    copy_path = f"{base_path}_{duplicate_index}{extension}"
+                    duplicate_index += 1
+            elif copy_path in appended_from:
+                continue  # Selected twice
+            else:
+                appended_from[copy_path] = start
+            jobs.append((original_path, copy_path, start))
+
+        new_count = sum(1 for job in jobs if job[2] is None)
+        if not jobs:
+            return 0, 0, len(unchanged_names)
+        total_bytes = sum(os.path.getsize(original_path) - (start or 0) for original_path, _, start in jobs)
+        self.analysis_events.put(("total", total_bytes))
+        self._post_analysis_status(f"Analyzing {new_count} new log file(s) and the appended lines of {len(jobs) - new_count} log file(s)...")
+
+        file_results = [None] * len(jobs)
+        definitions_key = analysis_definitions_key() if ANALYSIS_CACHE_DIR else None
+        analysis_jobs = [job + (definitions_key, occurrence_segment_path(session_root_path, os.path.basename(job[1]), job[2] or 0)) for job in jobs]
+        try:
+            for job_index, result, error in _run_analysis_jobs(analyze_added_log, analysis_jobs, None,
+                                                               self.analysis_events, self.analysis_cancel_event, self.analysis_profile):
+                if isinstance(error, AnalysisCancelled) or self.analysis_cancel_event.is_set():
+                    raise AnalysisCancelled()
+                if error is None:
+                    file_results[job_index] = result
+                    self._post_analysis_status(f"Analyzed '{os.path.basename(jobs[job_index][0])}'.")
+                else:
+                    self._post_analysis_status(f"WARNING: Could not copy or analyze '{os.path.basename(jobs[job_index][0])}': {error}. Skipping.")
+                    self._restore_session_log(jobs[job_index])
+            if not any(file_results):
+                raise RuntimeError("None of the selected log files could be added to the session")
+
+            added_jobs = [job for job, result in zip(jobs, file_results) if result is not None]
+            stack_traces_data = {trace_content: dict(trace_data) for trace_content, trace_data in session_data.get("stack_traces_data", {}).items()}
+            session_store.load_log_files(session_root_path, stack_traces_data)
+            for trace_data in stack_traces_data.values():
+                trace_data["log_files"] = dict(trace_data.get("log_files", {}))
+            with self.analysis_profile.stage("aggregation"):
+                add_analysis_results(stack_traces_data, [result for result in file_results if result is not None],
+                                     [os.path.basename(job[1]) for job in added_jobs])
+            for _, copy_path, _ in added_jobs:
+                log_checkpoints[os.path.basename(copy_path)] = log_checkpoint(copy_path)
+            session_data["stack_traces_data"] = stack_traces_data
+            session_data["log_checkpoints"] = log_checkpoints
+            self._save_analyzed_session(session_root_path, session_data)
+        except BaseException:
+            for job in jobs:
+                self._restore_session_log(job)
+            raise
+
+        try:
+            self._build_log_index(session_root_path, [job[1] for job in added_jobs], total_bytes, appended_from)
+        except AnalysisCancelled:
+            self._post_analysis_status("WARNING: Indexing was cancelled. The added logs are scanned in full when searched.")
+        return (sum(1 for job in added_jobs if job[2] is None), sum(1 for job in added_jobs if job[2] is not None), len(unchanged_names))
+
+    def _restore_session_log(self, job):
+        # Undoes what analyze_added_log did to the session's logs and occurrences for a log that is not being added after all
+        _, copy_path, start = job
+        try:
+            segment_path = occurrence_segment_path(os.path.dirname(os.path.dirname(copy_path)), os.path.basename(copy_path), start or 0)
+            if os.path.exists(segment_path):
+                os.remove(segment_path)
+            if start is None:
+                if os.path.exists(copy_path):
+                    os.remove(copy_path)
+            else:
+                os.truncate(copy_path, start)
+        except OSError as e:
+            self._post_analysis_status(f"WARNING: Could not restore '{os.path.basename(copy_path)}': {e}")
+
+    def _on_logs_added(self, added, close_popup):
+        new_count, appended_count, unchanged_count = added
+        if not new_count and not appended_count:
+            close_popup()
+            messagebox.showinfo("Add Logs", "The selected logs have not changed since they were analyzed.")
+            return
+        message = f"Added {new_count} new log file(s) and the appended lines of {appended_count} log file(s)."
+        if unchanged_count:
+            message += f"\n{unchanged_count} unchanged log file(s) were skipped."
+        messagebox.showinfo("Add Logs", message)  # Shown over the popup, whose status box has the stage timings
+        close_popup()
+        self.show_troubleshooting_dashboard(current_session_name)
+
+    def toggle_follow_logs(self):
+        if self.follow_thread:
+            self.stop_following_logs()
+            return
+        if not current_session_name or not self.current_session_data or self.analysis_thread:
+            return
+        logs_subdir = os.path.join(self.current_session_data["files_path"], SESSION_LOGS_SUBDIR)
+        file_paths = filedialog.askopenfilenames(
+            title="Select Growing Log Files to Follow",
+            initialdir=logs_subdir if os.path.isdir(logs_subdir) else None,
+            filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not file_paths:
+            return
+
+        try:
+            os.makedirs(logs_subdir, exist_ok=True)
+            log_checkpoints = session_log_checkpoints(logs_subdir, self.current_session_data.get("log_checkpoints"))
+            followers = []
+            compressed_names = []
+            for path in file_paths:
+                if detect_log_compression(path):
+                    compressed_names.append(os.path.basename(path))
+                elif not any(os.path.samefile(path, follower.path) for follower in followers):
+                    followers.append(self._create_log_follower(path, logs_subdir, log_checkpoints, followers))
+            if followers:
+                # Followed counts are added to the traces' counts per log
+                session_store.load_log_files(self.current_session_data["files_path"], self.current_session_data["stack_traces_data"])
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Follow Error", f"Could not follow the selected logs: {e}")
+            return
+        if compressed_names:
+            messagebox.showwarning("Follow Logs", "Compressed logs can't be followed and were skipped:\n" + "\n".join(compressed_names))
+        if not followers:
+            return
+
+        self.current_session_data["log_checkpoints"] = log_checkpoints
+        self.follow_queue = queue.Queue()
+        self.follow_stop_event = threading.Event()
+        self.follow_unsaved = True
+        self.follow_saved_at = time.monotonic()
+        self.follow_thread = threading.Thread(target=self._follow_logs, args=(followers, self.current_session_data["files_path"], self.follow_queue, self.follow_stop_event), daemon=True)
+        self.follow_thread.start()
+        self.follow_button.config(text="Stop Following")
+        self.follow_status_var.set(f"Following {len(followers)} log(s)...")
+        self.follow_after_id = self.master.after(FOLLOW_POLL_INTERVAL_MS, self._poll_followed_logs)
+
+    def _create_log_follower(self, path, logs_subdir, log_checkpoints, followers):
+        # A log the session already has, grown since it was analyzed, is followed from its checkpoint;
+        # anything else is followed from its start as a new log of the session.
+        session_root_path = os.path.dirname(logs_subdir)
+        name = os.path.basename(path)
+        copy_path = os.path.join(logs_subdir, name)
+        checkpoint = log_checkpoints.get(name)
+        if checkpoint and os.path.isfile(copy_path) and not any(copy_path == follower.copy_path for follower in followers):
+            start = appended_log_start(checkpoint, path)
+            if os.path.samefile(path, copy_path):
+                return LogFollower(path, copy_path, os.path.getsize(path) if start is None else start, session_root_path)
+            if start is not None and os.path.getsize(copy_path) == start:
+                return LogFollower(path, copy_path, start, session_root_path)
+        base_path, extension = os.path.splitext(copy_path)
+        duplicate_index = 1
+        while os.path.exists(copy_path) or any(copy_path == follower.copy_path for follower in followers):
+            copy_path = f"{base_path}_{duplicate_index}{extension}"
+            duplicate_index += 1
+        open(copy_path, 'wb').close()
+        log_checkpoints[os.path.basename(copy_path)] = log_checkpoint(copy_path)
+        return LogFollower(path, copy_path, session_root_path=session_root_path)
+
+    def _follow_logs(self, followers, session_root_path, follow_queue, stop_event):
+        """Background part of follow mode: polls the followed logs until stop_event is set, posting
+        ("traces", log name, analyze_log_file result or None, checkpoint) as logs grow. Must not touch Tk widgets."""
+        errors = [None] * len(followers)
+        try:
+            while not stop_event.is_set():
+                for follower_index, follower in enumerate(followers):
+                    follower.caught_up = False
+                    while not follower.caught_up and not stop_event.is_set():
+                        offset = follower.offset
+                        try:
+                            result = follower.poll()
+                            checkpoint = follower.checkpoint()
+                        except OSError as e:
+                            if str(e) != errors[follower_index]:
+                                errors[follower_index] = str(e)
+                                follow_queue.put(("status", f"WARNING: Could not read '{os.path.basename(follower.path)}': {e}"))
+                            break
+                        errors[follower_index] = None
+                        if result is not None or follower.offset != offset:
+                            follow_queue.put(("traces", os.path.basename(follower.copy_path), result, checkpoint))
+                stop_event.wait(FOLLOW_POLL_INTERVAL_MS / 1000)
+        finally:
+            for follower in followers:
+                follower.close()
+            log_index = SessionLogIndex(session_root_path)
+            for follower in followers:
+                try:
+                    log_index.extend(follower.copy_path)
+                except Exception:
+                    pass  # The log is scanned in full when searched
+            follow_queue.put(None)
+
+    def _poll_followed_logs(self):
+        self.follow_after_id = None
+        self._apply_followed_logs(update_rows=True)
+        if time.monotonic() - self.follow_saved_at >= FOLLOW_SAVE_INTERVAL_SECONDS:
+            self._save_followed_logs()
+        self.follow_after_id = self.master.after(FOLLOW_POLL_INTERVAL_MS, self._poll_followed_logs)
+
+    def _apply_followed_logs(self, update_rows):
+        # Adds what the follow thread posted to the session, and to the trace list if update_rows is set
+        stack_traces_data = self.current_session_data["stack_traces_data"]
+        changed_trace_contents = set()
+        occurrence_count = 0
+        try:
+            while True:
+                event = self.follow_queue.get_nowait()
+                if event is None:
+                    break
+                if event[0] == "status":
+                    self.follow_status_var.set(event[1])
+                    continue
+                _, log_name, result, checkpoint = event
+                self.current_session_data["log_checkpoints"][log_name] = checkpoint
+                if result is not None:
+                    changed_trace_contents.update(add_analysis_results(stack_traces_data, [result], [log_name]))
+                    occurrence_count += sum(group[1] for group in result[0].values())
+                self.follow_unsaved = True
+        except queue.Empty:
+            pass
+        if changed_trace_contents and update_rows:
+            self._update_trace_rows(changed_trace_contents)
+        if occurrence_count:
+            self.follow_status_var.set(f"{datetime.datetime.now().strftime('%H:%M:%S')}: {occurrence_count:,} new occurrence(s) of {len(changed_trace_contents):,} trace(s).")
+
+    def _save_followed_logs(self):
+        self.follow_saved_at = time.monotonic()
+        if not self.follow_unsaved:
+            return
+        try:
+            session_store.save(self.current_session_data["files_path"], self.current_session_data)
+            self.follow_unsaved = False
+        except Exception as e:
+            self.follow_status_var.set(f"WARNING: Could not save the session: {e}")
+
+    def stop_following_logs(self):
+        """Stops follow mode, adding what was read last to the session and saving it."""
+        if not self.follow_thread:
+            return
+        self.follow_stop_event.set()
+        self.follow_thread.join()
+        self.follow_thread = None
+        if self.follow_after_id:
+            self.master.after_cancel(self.follow_after_id)
+            self.follow_after_id = None
+        dashboard_shown = self.follow_button.winfo_exists()
+        self._apply_followed_logs(update_rows=dashboard_shown)
+        self._save_followed_logs()
+        if dashboard_shown:
+            self.follow_button.config(text="Follow Logs")
+            if self.follow_unsaved:
+                messagebox.showerror("Error", f"Could not save the traces found while following logs. {self.follow_status_var.get()}")
+            self.follow_status_var.set("Stopped following logs.")
+
     def export_current_session(self):
         if not current_session_name or not self.current_session_data:
             messagebox.showinfo("Info", "No active session to export.")
             return
+        if self.analysis_thread:
+            return
+        self.stop_following_logs()
+        self.flush_notes_autosave()
 
-        session_root_path = self.current_session_data["files_path"]
-        
-        default_zip_filename = f"{current_session_name}.zip"
+        popup_window = tk.Toplevel(self.master)
+        popup_window.title("Export Session")
+        popup_window.geometry("520x360")
+        popup_window.transient(self.master)
+        popup_window.grab_set()
+
+        tk.Label(popup_window, text="Archive format:", font=("Ubuntu", 12, "bold")).pack(anchor="w", padx=15, pady=(15, 5))
+        format_var = tk.StringVar(value="zip")
+        for archive_format, label in EXPORT_FORMATS.items():
+            unavailable = archive_format == "tar.zst" and zstandard is None
+            tk.Radiobutton(popup_window, text=label + (" - needs the 'zstandard' package" if unavailable else ""), variable=format_var, value=archive_format,
+                           font=("Ubuntu", 11), state=tk.DISABLED if unavailable else tk.NORMAL).pack(anchor="w", padx=25)
+        level_frame = tk.Frame(popup_window)
+        level_frame.pack(anchor="w", padx=25, pady=5)
+        tk.Label(level_frame, text="Deflate level (1 = fastest, 9 = smallest):", font=("Ubuntu", 10)).pack(side="left")
+        level_var = tk.IntVar(value=EXPORT_DEFLATE_LEVEL)
+        tk.Spinbox(level_frame, from_=1, to=9, textvariable=level_var, width=3, state="readonly").pack(side="left", padx=5)
 
-        zip_file_path = filedialog.asksaveasfilename(
-            defaultextension=".zip",
-            initialfile=default_zip_filename,
+        close_popup = self._create_task_popup_widgets(popup_window)
+
+        button_frame = tk.Frame(popup_window)
+        button_frame.pack(pady=10)
+        export_button = tk.Button(button_frame, text="Export...", command=lambda: self._start_session_export(popup_window, format_var.get(), level_var.get(), close_popup),
+                                  font=("Ubuntu", 11), bg="#2196F3", fg="black", activebackground="#1976D2", activeforeground="black")
+        export_button.pack(side="left", padx=5)
+        close_button = tk.Button(button_frame, text="Close", command=close_popup,
+                                 font=("Ubuntu", 11), bg="#F44336", fg="black", activebackground="#D32F2F", activeforeground="black")
+        close_button.pack(side="left", padx=5)
+        self.analysis_locked_buttons = [export_button, close_button]
+
+    def _create_task_popup_widgets(self, popup_window):
+        """Adds the status box and progress line of a background task started from the dashboard to a
+        modal popup. Returns the function that closes the popup; closing it while the task runs cancels the task."""
+        self.status_textbox = scrolledtext.ScrolledText(popup_window, height=4, wrap="word", font=("Courier New", 10), relief="sunken", bd=1, state="disabled")
+        self.status_textbox.pack(fill="x", padx=15, pady=(10, 5))
+        self._create_analysis_progress_widgets(popup_window)
+
+        def close_popup():
+            if self.analysis_thread:
+                self.cancel_analysis()
+                return
+            self.status_textbox = None
+            self.analysis_locked_buttons = []
+            popup_window.destroy()
+
+        popup_window.protocol("WM_DELETE_WINDOW", close_popup)
+        return close_popup
+
+    def _start_session_export(self, popup_window, archive_format, deflate_level, close_popup):
+        extension = ".tar.zst" if archive_format == "tar.zst" else ".zip"
+        archive_path = filedialog.asksaveasfilename(
+            parent=popup_window,
+            defaultextension=extension,
+            initialfile=f"{current_session_name}{extension}",
             title="Save Session Archive As",
-            filetypes=[("Zip files", "*.zip"), ("All files", "*.*")]
+            filetypes=[("tar.zst archives", "*.tar.zst")] if archive_format == "tar.zst" else [("Zip files", "*.zip")]
         )
+        if not archive_path:
+            return
+        self._update_status(f"Exporting to '{os.path.basename(archive_path)}'...", append=False)
+        self._start_analysis_task(self._export_session_archive, (self.current_session_data["files_path"], archive_path, archive_format, deflate_level),
+                                  lambda exported_path: self._on_session_exported(exported_path, close_popup))
 
-        if zip_file_path:
-            try:
-                shutil.make_archive(os.path.splitext(zip_file_path)[0], 'zip', session_root_path)
-                messagebox.showinfo("Export Complete", f"Session '{current_session_name}' exported to:\n{zip_file_path}")
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Failed to export session: {e}")
+    def _export_session_archive(self, session_root_path, archive_path, archive_format, deflate_level):
+        """Background part of export_current_session. Must not touch Tk widgets."""
+        written_files = []
+        try:
+            written_files = session_store.write_session_files(session_root_path)
+            export_session_archive(session_root_path, archive_path, archive_format, deflate_level,
+                                   progress_queue=self.analysis_events, cancel_event=self.analysis_cancel_event)
+            return archive_path
+        finally:
+            for written_file in written_files:
+                if os.path.exists(written_file):
+                    os.remove(written_file)
+
+    def _on_session_exported(self, archive_path, close_popup):
+        close_popup()
+        messagebox.showinfo("Export Complete", f"Session '{current_session_name}' exported to:\n{archive_path}")
 
     def import_session(self):
+        if self.analysis_thread:
+            return
         zip_file_path = filedialog.askopenfilename(
-            title="Select Session Archive (.zip) to Import",
-            filetypes=[("Zip files", "*.zip"), ("All files", "*.*")]
+            title="Select Session Archive (.zip, .tar.zst) to Import",
+            filetypes=[("Session archives", "*.zip *.tar.zst"), ("Zip files", "*.zip"), ("tar.zst archives", "*.tar.zst"), ("All files", "*.*")]
         )
 
         if not zip_file_path:
             return
 
-        temp_extract_dir_base = os.path.splitext(os.path.basename(zip_file_path))[0]
+        self._update_status(f"Importing '{os.path.basename(zip_file_path)}'...", append=False)
+        self._start_analysis_task(self._import_session_archive, (zip_file_path,), self._on_session_imported)
+
+    def _import_session_archive(self, zip_file_path):
+        """Background part of import_session: unpacks the archive and re-analyzes its logs.
+        Must not touch Tk widgets. Returns (session name, session root, whether logs were re-analyzed)."""
         temp_extract_dir = os.path.join(SESSION_BASE_DIR, f"temp_import_{datetime.datetime.now().strftime('%H%M%S_%f')}")
+        final_session_root_path = None
         
         try:
             os.makedirs(temp_extract_dir, exist_ok=True)
-            shutil.unpack_archive(zip_file_path, temp_extract_dir, 'zip')
+            self._post_analysis_status("Unpacking session archive...")
+            unpack_session_archive(zip_file_path, temp_extract_dir)
 
             extracted_session_root = temp_extract_dir
             if len(os.listdir(temp_extract_dir)) == 1 and os.path.isdir(os.path.join(temp_extract_dir, os.listdir(temp_extract_dir)[0])):
@@ -994,12 +4882,9 @@ Local Path: {self.current_session_data['files_path']}
 
             session_json_path_in_temp = os.path.join(extracted_session_root, SESSION_DATA_FILENAME)
             if not os.path.exists(session_json_path_in_temp):
-                messagebox.showerror("Import Error", f"The selected zip file does not contain a '{SESSION_DATA_FILENAME}' at its root level or within its primary extracted folder.")
-                shutil.rmtree(temp_extract_dir)
-                return
+                raise RuntimeError(f"The selected archive does not contain a '{SESSION_DATA_FILENAME}' at its root level or within its primary extracted folder")
 
-            with open(session_json_path_in_temp, 'r', encoding='utf-8') as f:
-                imported_session_data = json.load(f)
+            imported_session_data = JsonSessionStore().load(extracted_session_root)
             
             base_name_from_json = imported_session_data.get("session_name", os.path.basename(extracted_session_root))
             new_session_name = f"{base_name_from_json}_imported_{datetime.datetime.now().strftime('%H%M%S')}"
@@ -1010,52 +4895,75 @@ Local Path: {self.current_session_data['files_path']}
 
             final_session_root_path = os.path.join(SESSION_BASE_DIR, new_session_name)
             shutil.move(extracted_session_root, final_session_root_path)
+            if os.path.exists(temp_extract_dir):
+                shutil.rmtree(temp_extract_dir)
 
             imported_session_data["session_name"] = new_session_name
             imported_session_data["files_path"] = final_session_root_path
 
             logs_subdir_in_final = os.path.join(final_session_root_path, SESSION_LOGS_SUBDIR)
-            full_log_content_for_reanalysis = ""
+            file_results = []
             if os.path.exists(logs_subdir_in_final) and os.path.isdir(logs_subdir_in_final):
-                log_files_in_imported_dir = [os.path.join(logs_subdir_in_final, f) for f in os.listdir(logs_subdir_in_final) if f.endswith((".log", ".txt"))]
-                for log_file_path in log_files_in_imported_dir:
-                    try:
-                        with open(log_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            full_log_content_for_reanalysis += f.read() + "\n"
-                    except Exception as e:
-                        messagebox.showwarning("Import Warning", f"Could not read log file '{os.path.basename(log_file_path)}' during import re-analysis: {e}")
+                log_files_in_imported_dir = [os.path.join(logs_subdir_in_final, f) for f in os.listdir(logs_subdir_in_final) if f.endswith(LOG_FILE_EXTENSIONS)]
+                total_bytes = sum(os.path.getsize(path) for path in log_files_in_imported_dir)
+                self.analysis_events.put(("total", total_bytes))
+                self._post_analysis_status(f"Re-analyzing {len(log_files_in_imported_dir)} log file(s)...")
+                file_results = [None] * len(log_files_in_imported_dir)
+                # Occurrences that came with the archive are recorded again with the traces.
+                shutil.rmtree(os.path.join(final_session_root_path, OCCURRENCES_SUBDIR), ignore_errors=True)
+                for job_index, result, error in analyze_log_files([(log_file_path, None, occurrence_segment_path(final_session_root_path, os.path.basename(log_file_path)))
+                                                                    for log_file_path in log_files_in_imported_dir],
+                                                                   progress_queue=self.analysis_events, cancel_event=self.analysis_cancel_event,
+                                                                   profile=self.analysis_profile):
+                    if isinstance(error, AnalysisCancelled) or self.analysis_cancel_event.is_set():
+                        raise AnalysisCancelled()
+                    if error is None:
+                        file_results[job_index] = result
+                    else:
+                        self._post_analysis_status(f"WARNING: Could not read log file '{os.path.basename(log_files_in_imported_dir[job_index])}' during import re-analysis: {error}")
+                file_names = [os.path.basename(path) for path, result in zip(log_files_in_imported_dir, file_results) if result is not None]
+                file_results = [result for result in file_results if result is not None]
+
+                # An index that came with the archive does not match the unpacked files, so it is rebuilt.
+                if os.path.exists(os.path.join(final_session_root_path, SESSION_LOG_INDEX_FILENAME)):
+                    os.remove(os.path.join(final_session_root_path, SESSION_LOG_INDEX_FILENAME))
+                self._build_log_index(final_session_root_path, log_files_in_imported_dir, total_bytes)
             
-            if full_log_content_for_reanalysis.strip():
-                unique_stack_traces_raw = self.extract_stack_traces(full_log_content_for_reanalysis)
-                counted_traces = Counter(unique_stack_traces_raw)
-                reprocessed_stack_traces = self.process_stack_traces_for_dashboard(counted_traces)
+            if file_results:
+                with self.analysis_profile.stage("aggregation"):
+                    reprocessed_stack_traces = merge_analysis_results(file_results, file_names)
                 imported_session_data["stack_traces_data"] = reprocessed_stack_traces
+                imported_session_data["log_checkpoints"] = {file_name: log_checkpoint(os.path.join(logs_subdir_in_final, file_name)) for file_name in file_names}
             else:
-                messagebox.showinfo("Import Info", f"No log files found or readable in '{SESSION_LOGS_SUBDIR}' for re-analysis in imported session '{new_session_name}'. Stack traces will remain as imported or empty.")
                 imported_session_data["stack_traces_data"] = imported_session_data.get("stack_traces_data", {})
 
 
-            with open(os.path.join(final_session_root_path, SESSION_DATA_FILENAME), 'w', encoding='utf-8') as f:
-                json.dump(imported_session_data, f, indent=4)
+            self._save_analyzed_session(final_session_root_path, imported_session_data)
 
-            troubleshooting_sessions[new_session_name] = final_session_root_path
-            self.save_sessions()
-
-            messagebox.showinfo("Import Complete", f"Session '{new_session_name}' imported successfully!")
-            self.show_continue_troubleshooting_window()
+            return new_session_name, final_session_root_path, bool(file_results)
             
-        except Exception as e:
-            messagebox.showerror("Import Error", f"An error occurred during session import: {e}")
-            if 'temp_extract_dir' in locals() and os.path.exists(temp_extract_dir):
+        except BaseException:
+            if os.path.exists(temp_extract_dir):
                 try:
                     shutil.rmtree(temp_extract_dir)
                 except Exception as cleanup_e:
-                    print(f"Error cleaning up temporary import directory: {cleanup_e}")
-            if 'final_session_root_path' in locals() and os.path.exists(final_session_root_path):
+                    self._post_analysis_status(f"WARNING: Error cleaning up temporary import directory: {cleanup_e}")
+            if final_session_root_path and os.path.exists(final_session_root_path):
                 try:
                     shutil.rmtree(final_session_root_path)
                 except Exception as cleanup_e:
-                    print(f"Error cleaning up final import directory: {cleanup_e}")
+                    self._post_analysis_status(f"WARNING: Error cleaning up final import directory: {cleanup_e}")
+            raise
+
+    def _on_session_imported(self, import_result):
+        new_session_name, final_session_root_path, logs_reanalyzed = import_result
+        troubleshooting_sessions[new_session_name] = final_session_root_path
+        self.save_sessions()
+
+        if not logs_reanalyzed:
+            messagebox.showinfo("Import Info", f"No log files found or readable in '{SESSION_LOGS_SUBDIR}' for re-analysis in imported session '{new_session_name}'. Stack traces will remain as imported or empty.")
+        messagebox.showinfo("Import Complete", f"Session '{new_session_name}' imported successfully!")
+        self.show_continue_troubleshooting_window()
 
 
     def show_continue_troubleshooting_window(self):
@@ -1076,23 +4984,23 @@ Local Path: {self.current_session_data['files_path']}
 
             self.session_listbox = tk.Listbox(self.continue_frame, selectmode=tk.SINGLE, height=15, font=("Ubuntu", 12), borderwidth=2, relief="groove",
                                               bg="white", fg="black", selectbackground="#A0C8F0", selectforeground="black")
-            for name in session_names:
-                session_root_path = troubleshooting_sessions[name]
-                session_data_file = os.path.join(session_root_path, SESSION_DATA_FILENAME)
-                notes_preview = "..."
-                num_traces = "N/A"
-                try:
-                    with open(session_data_file, 'r', encoding='utf-8') as f:
-                        session_data_preview = json.load(f)
-                        notes_preview = session_data_preview.get("notes", "").split('\n')[0][:50]
-                        num_traces = len(session_data_preview.get("stack_traces_data", {}))
-                except Exception:
-                    notes_preview = "Error loading notes"
-                    num_traces = "Error"
-
-                display_text = f"{name} ({num_traces} traces, Notes: '{notes_preview}...')".strip()
-                self.session_listbox.insert(tk.END, display_text)
-                self.session_listbox.item_data = session_names
+            session_root_paths = [troubleshooting_sessions[name] for name in session_names]
+            try:
+                summaries, stale_session_root_paths = session_store.cached_summaries(session_root_paths)
+            except Exception:
+                summaries, stale_session_root_paths = {}, session_root_paths
+            for name, session_root_path in zip(session_names, session_root_paths):
+                if session_root_path in summaries:
+                    self.session_listbox.insert(tk.END, self._session_list_text(name, summaries[session_root_path]))
+                else:
+                    self.session_listbox.insert(tk.END, f"{name} (Loading summary...)")
+            self.session_listbox.item_data = session_names
+            if stale_session_root_paths:
+                # Summaries that are missing or older than the session files are rebuilt in the background
+                summary_queue = queue.Queue()
+                threading.Thread(target=self._refresh_session_summaries, args=(stale_session_root_paths, summary_queue), daemon=True).start()
+                self.master.after(ANALYSIS_POLL_INTERVAL_MS, self._poll_session_summaries, summary_queue, self.session_listbox,
+                                  {session_root_path: index for index, session_root_path in enumerate(session_root_paths)})
 
             self.session_listbox.pack(fill="both", expand=True, pady=15, padx=20)
 
@@ -1105,9 +5013,49 @@ Local Path: {self.current_session_data['files_path']}
             self.import_button = tk.Button(self.continue_frame, text="Import Session", command=lambda s=self: s.import_session(), font=("Ubuntu", 14), bg="#607D8B", fg="black", activebackground="#455A64", activeforeground="black")
             self.import_button.pack(pady=10)
 
+            self.status_textbox = scrolledtext.ScrolledText(self.continue_frame, height=3, wrap="word", font=("Courier New", 10),
+                                                            bg="#2F3136", fg="white", relief="sunken", bd=1, state="disabled")
+            self.status_textbox.pack(pady=(0, 5), fill="x", padx=20)
+            self._create_analysis_progress_widgets(self.continue_frame, bg="#2F3136")
+
 
         self.back_button = tk.Button(self.continue_frame, text="Back to Main Menu", command=lambda s=self: s.create_main_menu(), font=("Ubuntu", 12), activeforeground="black")
         self.back_button.pack(pady=20)
+        if troubleshooting_sessions:
+            self.analysis_locked_buttons = [self.open_session_button, self.delete_session_button, self.import_button, self.back_button]
+
+    def _session_list_text(self, name, summary):
+        if summary is None:
+            return f"{name} (Error traces, Notes: 'Error loading notes...')"
+        return (f"{name} ({summary['trace_count']} traces, Top: {summary['top_exception'] or 'None'}, "
+                f"{summary['size'] / (1024 * 1024):,.1f} MB, Modified: {summary['modified'] or 'N/A'}, "
+                f"Notes: '{summary['notes_preview']}...')").strip()
+
+    def _refresh_session_summaries(self, session_root_paths, summary_queue):
+        try:
+            for session_root_path, summary in session_store.refresh_summaries(session_root_paths):
+                summary_queue.put((session_root_path, summary))
+        finally:
+            summary_queue.put(None)
+
+    def _poll_session_summaries(self, summary_queue, session_listbox, row_indexes):
+        if not session_listbox.winfo_exists():
+            return  # The window was left; the thread still finishes and saves the cache
+        try:
+            while True:
+                item = summary_queue.get_nowait()
+                if item is None:
+                    return
+                session_root_path, summary = item
+                row_index = row_indexes[session_root_path]
+                selected = row_index in session_listbox.curselection()
+                session_listbox.delete(row_index)
+                session_listbox.insert(row_index, self._session_list_text(session_listbox.item_data[row_index], summary))
+                if selected:
+                    session_listbox.selection_set(row_index)
+        except queue.Empty:
+            pass
+        self.master.after(ANALYSIS_POLL_INTERVAL_MS, self._poll_session_summaries, summary_queue, session_listbox, row_indexes)
 
     def open_selected_session(self):
         selected_index = self.session_listbox.curselection()
@@ -1135,6 +5083,10 @@ Local Path: {self.current_session_data['files_path']}
             if confirm:
                 if selected_session_name in troubleshooting_sessions:
                     session_dir = troubleshooting_sessions.pop(selected_session_name)
+                    try:
+                        session_store.delete(session_dir)
+                    except sqlite3.Error as e:
+                        messagebox.showerror("Delete Error", f"Could not remove session '{selected_session_name}' from '{SESSION_DB_FILE}': {e}")
                     
                     if os.path.exists(session_dir):
                         try:
@@ -1153,7 +5105,18 @@ Local Path: {self.current_session_data['files_path']}
 
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["--migrate-to-sqlite"]:
+        migrated_sessions = migrate_json_sessions_to_sqlite()
+        print(f"Migrated {len(migrated_sessions)} session(s) to '{SESSION_DB_FILE}'.")
+        for migrated_session in migrated_sessions:
+            print(f"  {migrated_session}")
+        print("Run Scope with SCOPE_SESSION_STORE=sqlite to use them.")
+        sys.exit(0)
+    if sys.argv[1:2] == ["analyze"]:
+        sys.exit(run_analyze_command(sys.argv[2:]))
+
+    import_gui_toolkit()
     root = tk.Tk()
     app = ScopeApp(root)
-    root.protocol("WM_DELETE_WINDOW", app.save_sessions)
+    root.protocol("WM_DELETE_WINDOW", app.on_window_close)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""Seeded generator of synthetic Trino-style server logs for the Scope benchmarks.
+
+The same seed and size always produce the same bytes. Logs interleave INFO/DEBUG records with
+Java traces (with "Caused by:" chains and "... N more" lines), Python tracebacks, lines that
+mention exceptions without starting a trace, and a few pathological traces that run for
+thousands of lines before anything terminates them.
+
+    python benchmarks/generate_logs.py 10M server.log --seed 1
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+GENERATOR_VERSION = 1  # Bump when the output for a given seed and size changes
+
+SIZE_SUFFIXES = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+JAVA_EXCEPTIONS = [
+    ("io.trino.spi.TrinoException", "Query exceeded per-node memory limit of {n}GB"),
+    ("io.trino.spi.TrinoException", "Error opening Hive split hdfs://nn/warehouse/t{n}/part-{n}.orc"),
+    ("java.lang.IllegalStateException", "Task {query_id}.{n}.0 is not running"),
+    ("java.io.IOException", "Connection reset by peer"),
+    ("java.net.SocketTimeoutException", "Read timed out after {n}ms"),
+    ("java.util.concurrent.ExecutionException", "java.lang.RuntimeException: worker {n} failed"),
+    ("org.apache.hadoop.hdfs.BlockMissingException", "Could not obtain block: BP-{n}:blk_{n}"),
+    ("com.starburstdata.cache.CacheException", "Cache entry {n} expired"),
+    ("java.lang.NullPointerException", "Cannot invoke \"Object.hashCode()\" because \"key\" is null"),
+    ("java.lang.OutOfMemoryError", "Java heap space"),
+]
+CAUSES = [
+    ("java.io.IOException", "Broken pipe"),
+    ("java.net.ConnectException", "Connection refused: worker-{n}.internal/10.0.{n}.{n}:8080"),
+    ("java.util.concurrent.TimeoutException", "Timed out waiting for {n}ms"),
+    ("java.io.EOFException", "Unexpected end of stream"),
+]
+FRAMES = [
+    "io.trino.execution.SqlTaskExecution.run(SqlTaskExecution.java:{n})",
+    "io.trino.operator.Driver.processInternal(Driver.java:{n})",
+    "io.trino.memory.QueryContext.enforceUserMemoryLimit(QueryContext.java:{n})",
+    "io.trino.plugin.hive.HivePageSource.getNextPage(HivePageSource.java:{n})",
+    "io.airlift.http.client.jetty.JettyHttpClient.execute(JettyHttpClient.java:{n})",
+    "java.base/java.util.concurrent.ThreadPoolExecutor.runWorker(ThreadPoolExecutor.java:{n})",
+    "java.base/java.lang.Thread.run(Thread.java:{n})",
+    "org.apache.hadoop.hdfs.DFSInputStream.read(DFSInputStream.java:{n})",
+]
+PYTHON_EXCEPTIONS = [
+    "KeyError: 'partition_id'",
+    "ValueError: invalid literal for int() with base 10: 'n/a'",
+    "TimeoutError: query {query_id} did not finish in {n}s",
+    "ConnectionError: HTTPConnectionPool(host='coordinator', port=8080): Max retries exceeded",
+]
+PYTHON_FRAMES = [
+    ('/opt/etl/jobs/load.py', 'run', 'result = step(ctx)'),
+    ('/opt/etl/lib/trino_client.py', 'execute', 'rows = cursor.fetchall()'),
+    ('/usr/lib/python3/site-packages/trino/client.py', 'fetch', 'status = self._request.process(response)'),
+    ('/opt/etl/lib/partitions.py', 'resolve', "return mapping[row['partition_id']]"),
+]
+INFO_MESSAGES = [
+    "io.trino.event.QueryMonitor\tTIMELINE: Query {query_id} :: FINISHED :: elapsed {n}ms :: planning {n}ms :: execution {n}ms",
+    "io.trino.execution.SqlTaskManager\tTask {query_id}.{n}.0 started on worker-{n}",
+    "io.trino.server.remotetask.HttpRemoteTask\tRemote task {query_id}.{n}.0 returned {n} pages",
+    "io.trino.memory.ClusterMemoryManager\tCluster memory: reserved {n}MB of {n}MB",
+    "io.trino.plugin.hive.util.RetryDriver\tRetrying after IOException, attempt {n} of 10",
+    "io.trino.execution.QueryStateMachine\tQuery {query_id} state changed to RUNNING",
+]
+THREADS = ["dispatcher-query-{n}", "remote-task-callback-{n}", "Query-{query_id}-{n}", "http-worker-{n}", "task-notification-{n}"]
+JAVA_SHAPES = 400  # Distinct Java trace bodies; occurrences of one shape differ only in query IDs and timestamps
+PYTHON_SHAPES = 60
+
+
+def parse_size(text):
+    """Parses a size such as 10M, 1G or 5G (binary units) into bytes."""
+    suffix = text[-1:].upper()
+    if suffix in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[suffix])
+    return int(text)
+
+
+class LogGenerator:
+    """Yields log records as text. Records are built from the tables above with random numbers,
+    timestamps and query IDs filled in. Traces repeat a fixed pool of shapes, so they group the
+    way real ones do."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.clock = datetime.datetime(2024, 3, 5, 12, 0, 0)
+
+    def _fill(self, template, rng=None):
+        if "{query_id}" in template:
+            template = template.replace("{query_id}", self._query_id())
+        parts = template.split("{n}")
+        rng = rng or self.rng
+        return "".join(part + str(rng.randint(1, 9999)) for part in parts[:-1]) + parts[-1]
+
+    def _shape_rng(self, kind, count):
+        """Picks one of count trace shapes and returns a generator seeded for it, so every occurrence
+        of that shape draws the same exception, frames and line numbers."""
+        return random.Random(f"{self.seed}:{kind}:{self.rng.randrange(count)}")
+
+    def _query_id(self):
+        return f"{self.clock:%Y%m%d_%H%M%S}_{self.rng.randint(0, 99999):05d}_{''.join(self.rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(5))}"
+
+    def _header(self, level):
+        self.clock += datetime.timedelta(milliseconds=self.rng.randint(1, 50))
+        return f"{self.clock:%Y-%m-%dT%H:%M:%S}.{self.clock.microsecond // 1000:03d}Z\t{level}\t{self._fill(self.rng.choice(THREADS))}\t"
+
+    def info_record(self):
+        level = "DEBUG" if self.rng.random() < 0.2 else "INFO"
+        return self._header(level) + self._fill(self.rng.choice(INFO_MESSAGES)) + "\n"
+
+    def java_record(self):
+        lines = [self._header("ERROR") + f"io.trino.execution.StageStateMachine\tStage {self._query_id()}.{self.rng.randint(0, 9)} failed"]
+        rng = self._shape_rng("java", JAVA_SHAPES)
+        name, message = rng.choice(JAVA_EXCEPTIONS)
+        lines.append(f"{name}: {self._fill(message, rng)}")
+        lines += [f"\tat {self._fill(rng.choice(FRAMES), rng)}" for _ in range(rng.randint(4, 25))]
+        for _ in range(rng.choice((0, 0, 1, 1, 2, 3))):
+            cause_name, cause_message = rng.choice(CAUSES)
+            lines.append(f"Caused by: {cause_name}: {self._fill(cause_message, rng)}")
+            lines += [f"\tat {self._fill(rng.choice(FRAMES), rng)}" for _ in range(rng.randint(2, 8))]
+            lines.append(f"\t... {self.rng.randint(5, 60)} more")
+        if rng.random() < 0.2:
+            lines.append(f"\tSuppressed: java.io.IOException: {self._fill('close failed for stream {n}', rng)}")
+            lines.append(f"\t\tat {self._fill(rng.choice(FRAMES), rng)}")
+        return "\n".join(lines) + "\n"
+
+    def python_record(self):
+        lines = [self._header("ERROR") + "etl.scheduler\tTask failed", "Traceback (most recent call last):"]
+        rng = self._shape_rng("python", PYTHON_SHAPES)
+        for _ in range(rng.randint(2, 6)):
+            path, function, code = rng.choice(PYTHON_FRAMES)
+            lines += [f'  File "{path}", line {rng.randint(10, 900)}, in {function}', f"    {code}"]
+        lines.append(self._fill(rng.choice(PYTHON_EXCEPTIONS), rng))
+        return "\n".join(lines) + "\n"
+
+    def pathological_record(self):
+        """A trace that runs for thousands of lines: a deep StackOverflowError, or a traceback
+        followed by an undated, indented dump that never terminates it early."""
+        rng = self.rng
+        if rng.random() < 0.5:
+            lines = [self._header("ERROR") + "io.trino.sql.planner.PlanOptimizers\tOptimizer failed", "java.lang.StackOverflowError"]
+            lines += ["\tat io.trino.sql.planner.iterative.rule.PushPredicateIntoTableScan.apply(PushPredicateIntoTableScan.java:%d)" % rng.randint(1, 500)
+                      for _ in range(rng.randint(1000, 4000))]
+        else:
+            lines = [self._header("ERROR") + "etl.worker\tDumping failed batch", "Traceback (most recent call last):"]
+            lines += ["    row = {'partition_id': %d, 'value': %d}" % (rng.randint(1, 10 ** 6), rng.randint(1, 10 ** 6)) for _ in range(rng.randint(1000, 4000))]
+            lines.append(self._fill(rng.choice(PYTHON_EXCEPTIONS)))
+        return "\n".join(lines) + "\n"
+
+    def records(self):
+        """Yields records forever, about 1 in 12 of them a trace."""
+        rng = self.rng
+        while True:
+            roll = rng.random()
+            if roll < 0.05:
+                yield self.java_record()
+            elif roll < 0.08:
+                yield self.python_record()
+            elif roll < 0.0801:
+                yield self.pathological_record()
+            else:
+                yield self.info_record()
+
+
+def write_log(path, size, seed):
+    """Writes about size bytes of generated log (whole records, so slightly more) to path."""
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline="\n") as f:
+        buffer = []
+        buffered = 0
+        for record in LogGenerator(seed).records():
+            buffer.append(record)
+            buffered += len(record)
+            if buffered >= 1024 * 1024 or written + buffered >= size:
+                f.write("".join(buffer))
+                written += buffered
+                buffer = []
+                buffered = 0
+                if written >= size:
+                    break
+    return written
+
+
+def generated_log(work_dir, size, seed):
+    """Returns the path of the generated log for size and seed in work_dir, generating it only if it
+    isn't there yet."""
+    path = os.path.join(work_dir, f"scope_bench_v{GENERATOR_VERSION}_seed{seed}_{size}.log")
+    if not os.path.exists(path):
+        os.makedirs(work_dir, exist_ok=True)
+        write_log(path + ".part", size, seed)
+        os.replace(path + ".part", path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates a synthetic Trino-style log for benchmarking Scope.")
+    parser.add_argument("size", help="approximate size, e.g. 10M, 1G or 5G")
+    parser.add_argument("output", help="log file to write")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    written = write_log(args.output, parse_size(args.size), args.seed)
+    print(f"Wrote {written:,} bytes to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Benchmarks the Scope analysis pipeline on generated logs and writes the results as JSON.
+
+For each log size, a fresh process times every stage on the same seeded log:
+stack trace extraction, classification of the traces found, writing and reading session.json,
+and opening the dashboard (only where Tk and a display are available). It also records the
+peak RSS after each stage. Generated logs are kept in --work-dir and reused.
+
+    python benchmarks/run_benchmarks.py --sizes 10M --output results.json
+    python benchmarks/run_benchmarks.py --sizes 10M,1G,5G --repeat 3 --compare results.json
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import mmap
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generate_logs import GENERATOR_VERSION, generated_log, parse_size  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCOPE_SCRIPT = os.path.join(REPO_DIR, "Scope Concept Code.py")
+RESULTS_FORMAT_VERSION = 1
+
+
+def load_scope():
+    """Imports "Scope Concept Code.py" (which has no importable name) as the module scope."""
+    spec = importlib.util.spec_from_file_location("scope", SCOPE_SCRIPT)
+    scope = importlib.util.module_from_spec(spec)
+    sys.modules["scope"] = scope
+    spec.loader.exec_module(scope)
+    return scope
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # Bytes on macOS, KiB elsewhere
+
+
+def run_case(log_path, dashboard):
+    """Times each stage on log_path in this process and returns {stage: metrics}."""
+    scope = load_scope()
+    scope.EXCEPTION_DEFINITIONS_FILE = os.path.join(REPO_DIR, scope.EXCEPTION_DEFINITIONS_FILE)
+    scope.TRACE_NORMALIZATION_FILE = os.path.join(REPO_DIR, scope.TRACE_NORMALIZATION_FILE)
+    scope.load_exception_definitions()
+    scope.load_trace_normalization_rules()
+    log_bytes = os.path.getsize(log_path)
+    stages = {}
+
+    started = time.perf_counter()
+    trace_groups = scope._TraceGroups()
+    trace_count = 0
+    with open(log_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for trace_content in scope.iter_stack_traces(scope._MappedLogLines(data, scope._AnalysisProgress())):
+            trace_groups.add(trace_content)
+            trace_count += 1
+    seconds = time.perf_counter() - started
+    stages["extraction"] = {"seconds": seconds, "bytes": log_bytes, "mb_per_second": log_bytes / (1024 * 1024) / seconds,
+                            "traces": trace_count, "fingerprints": len(trace_groups.groups), "peak_rss_mb": peak_rss_mb()}
+
+    started = time.perf_counter()
+    classifications = {fingerprint: scope.classify_stack_trace(group[0]) for fingerprint, group in trace_groups.groups.items()}
+    stack_traces_data = scope.merge_analysis_results([(trace_groups.groups, classifications)], [os.path.basename(log_path)])
+    seconds = time.perf_counter() - started
+    stages["classification"] = {"seconds": seconds, "fingerprints": len(classifications), "peak_rss_mb": peak_rss_mb()}
+
+    work_dir = tempfile.mkdtemp(prefix="scope-bench-")
+    try:
+        session_name = "Benchmark"
+        session_root_path = os.path.join(work_dir, session_name)
+        os.makedirs(session_root_path)
+        session_data = {"session_name": session_name, "notes": "", "files_path": session_root_path,
+                        "stack_traces_data": stack_traces_data, "current_selected_stack_trace_content": None}
+        store = scope.JsonSessionStore()
+        started = time.perf_counter()
+        store.save(session_root_path, session_data)
+        stages["session_write"] = {"seconds": time.perf_counter() - started, "bytes": os.path.getsize(os.path.join(session_root_path, scope.SESSION_DATA_FILENAME)),
+                                   "peak_rss_mb": peak_rss_mb()}
+        started = time.perf_counter()
+        store.load(session_root_path)
+        stages["session_read"] = {"seconds": time.perf_counter() - started, "peak_rss_mb": peak_rss_mb()}
+        stages["dashboard_open"] = time_dashboard_open(scope, work_dir, session_name, session_root_path) if dashboard else {"skipped": "--no-dashboard"}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return stages
+
+
+def time_dashboard_open(scope, work_dir, session_name, session_root_path):
+    try:
+        scope.import_gui_toolkit()
+        root = scope.tk.Tk()
+    except Exception as e:  # No tkinter, or no display
+        return {"skipped": str(e)}
+    try:
+        scope.SESSION_BASE_DIR = work_dir
+        scope.SESSIONS_INDEX_FILE = os.path.join(work_dir, "index.json")
+        scope.SESSION_SUMMARY_CACHE_FILE = os.path.join(work_dir, "summaries.json")
+        scope.ESCALATION_TEMPLATE_FILE = os.path.join(REPO_DIR, scope.ESCALATION_TEMPLATE_FILE)
+        scope.session_store = scope.JsonSessionStore()
+        scope.session_store.save_index({session_name: session_root_path})
+        app = scope.ScopeApp(root)
+        started = time.perf_counter()
+        app.show_troubleshooting_dashboard(session_name)
+        root.update()
+        return {"seconds": time.perf_counter() - started, "peak_rss_mb": peak_rss_mb()}
+    finally:
+        root.destroy()
+
+
+def median_stages(runs):
+    """Combines the stage metrics of repeated runs: medians of the timings, maxima of the peak RSS."""
+    combined = {}
+    for stage in runs[0]:
+        if "skipped" in runs[0][stage]:
+            combined[stage] = runs[0][stage]
+            continue
+        combined[stage] = dict(runs[0][stage])
+        combined[stage]["seconds"] = statistics.median(run[stage]["seconds"] for run in runs)
+        if "mb_per_second" in combined[stage]:
+            combined[stage]["mb_per_second"] = combined[stage]["bytes"] / (1024 * 1024) / combined[stage]["seconds"]
+        if combined[stage].get("peak_rss_mb") is not None:
+            combined[stage]["peak_rss_mb"] = max(run[stage]["peak_rss_mb"] for run in runs)
+    return combined
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(results, baseline, threshold):
+    """Prints the change of every stage's time against baseline. Returns True if any stage got slower
+    by more than threshold (a fraction)."""
+    baseline_cases = {case["size"]: case for case in baseline["cases"]}
+    regressed = False
+    for case in results["cases"]:
+        baseline_case = baseline_cases.get(case["size"])
+        if baseline_case is None:
+            continue
+        for stage, metrics in case["stages"].items():
+            baseline_metrics = baseline_case["stages"].get(stage, {})
+            if "seconds" not in metrics or "seconds" not in baseline_metrics:
+                continue
+            change = metrics["seconds"] / baseline_metrics["seconds"] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"{case['size']:>6} {stage:<16} {baseline_metrics['seconds']:10.3f}s -> {metrics['seconds']:10.3f}s  {change:+7.1%}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks Scope's analysis pipeline on generated logs.")
+    parser.add_argument("--sizes", default="10M", help="comma-separated log sizes, e.g. 10M,1G,5G (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size; timings are the median (default: %(default)s)")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "scope-benchmarks"), help="where generated logs are kept (default: %(default)s)")
+    parser.add_argument("--output", help="JSON file to write the results to (default: print them)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown reported as a regression (default: %(default)s)")
+    parser.add_argument("--no-dashboard", action="store_true", help="skip timing the dashboard, which needs Tk and a display")
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # Runs one case in this process and prints its stages
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, not args.no_dashboard)))
+        return 0
+
+    results = {"format_version": RESULTS_FORMAT_VERSION, "started_at": datetime.datetime.now().isoformat(timespec='seconds'),
+               "git_commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+               "seed": args.seed, "generator_version": GENERATOR_VERSION, "repeat": args.repeat, "cases": []}
+    for size in args.sizes.split(","):
+        print(f"Generating the {size} log...", file=sys.stderr)
+        log_path = generated_log(args.work_dir, parse_size(size), args.seed)
+        runs = []
+        for run_index in range(args.repeat):
+            print(f"Running {size} ({run_index + 1}/{args.repeat})...", file=sys.stderr)
+            command = [sys.executable, os.path.abspath(__file__), "--case", log_path] + (["--no-dashboard"] if args.no_dashboard else [])
+            runs.append(json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout))
+        results["cases"].append({"size": size, "log_bytes": os.path.getsize(log_path), "stages": median_stages(runs)})
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            return 1 if compare_results(results, json.load(f), args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCOPE_SCRIPT = os.path.join(REPO_DIR, "Scope Concept Code.py")
+
+
+@pytest.fixture(scope="session")
+def scope():
+    """Imports "Scope Concept Code.py" (which has no importable name) as the module scope."""
+    spec = importlib.util.spec_from_file_location("scope", SCOPE_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["scope"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def exception_definitions():
+    with open(os.path.join(REPO_DIR, "exceptions_data.json"), encoding="utf-8") as f:
+        return json.load(f)
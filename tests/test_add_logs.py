@@ -0,0 +1,115 @@
+"""Adds logs to an analyzed session and checks the merged counts, the checkpoints, and that grown logs are analyzed from their checkpoint."""
+import gzip
+import os
+import re
+import shutil
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def record_start(data, position):
+    """Offset of the first record after position that follows a record without a trace, so no trace runs across it."""
+    return re.compile(rb"\n\d{4}-[^\n]*\tINFO\t(?:(?!Error|Exception|Warning|Throwable)[^\n])*\n(?=\d{4}-)").search(data, position).end()
+
+
+@pytest.fixture
+def session(scope, tmp_path):
+    """A session of the first part of trino_seed1.log. Returns (session folder, stack_traces_data, log_checkpoints, full log)."""
+    with open(os.path.join(DATA_DIR, "trino_seed1.log"), 'rb') as f:
+        data = f.read()
+    source_path = str(tmp_path / "server.log")
+    with open(source_path, 'wb') as f:
+        f.write(data[:record_start(data, len(data) // 2)])
+    session_root_path = str(tmp_path / "session")
+    copy_path = os.path.join(session_root_path, scope.SESSION_LOGS_SUBDIR, "server.log")
+    os.makedirs(os.path.dirname(copy_path))
+    result = scope.analyze_added_log(source_path, copy_path, occurrences_path=scope.occurrence_segment_path(session_root_path, "server.log"))
+    stack_traces_data = scope.merge_analysis_results([result], ["server.log"])
+    log_checkpoints = scope.session_log_checkpoints(os.path.dirname(copy_path), {})
+    return session_root_path, stack_traces_data, log_checkpoints, data
+
+
+def analyzed_in_one_go(scope, tmp_path, logs):
+    """stack_traces_data of a session created from logs, {name: bytes}, in that order."""
+    results = []
+    for name, data in logs.items():
+        path = str(tmp_path / "whole" / name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        results.append(scope.analyze_log_file(path))
+    return scope.merge_analysis_results(results, list(logs))
+
+
+def counts(stack_traces_data):
+    return {trace_data["fingerprint"]: (trace_data["count"], trace_data["log_files"]) for trace_data in stack_traces_data.values()}
+
+
+def test_grown_log_is_analyzed_from_its_checkpoint(scope, session, tmp_path, monkeypatch):
+    session_root_path, stack_traces_data, log_checkpoints, data = session
+    source_path = str(tmp_path / "server.log")
+    with open(source_path, 'wb') as f:
+        f.write(data)
+    copy_path = os.path.join(session_root_path, scope.SESSION_LOGS_SUBDIR, "server.log")
+    start = scope.appended_log_start(log_checkpoints["server.log"], source_path)
+    assert start == os.path.getsize(copy_path)
+
+    analyzed_from = []
+    analyze_log_file = scope.analyze_log_file
+    monkeypatch.setattr(scope, "analyze_log_file", lambda path, *args, **kwargs: analyzed_from.append(kwargs.get("start", 0)) or analyze_log_file(path, *args, **kwargs))
+    result = scope.analyze_added_log(source_path, copy_path, start, occurrences_path=scope.occurrence_segment_path(session_root_path, "server.log", start))
+    assert analyzed_from == [start]
+    changed = scope.add_analysis_results(stack_traces_data, [result], ["server.log"])
+    assert set(changed) <= set(stack_traces_data)
+
+    assert counts(stack_traces_data) == counts(analyzed_in_one_go(scope, tmp_path, {"server.log": data}))
+    with open(copy_path, 'rb') as f:
+        assert f.read() == data
+    assert scope.log_checkpoint(copy_path) == scope.log_checkpoint(source_path)
+    occurrences = scope.SessionOccurrences(session_root_path)
+    for trace_data in stack_traces_data.values():
+        assert len(occurrences.lookup(trace_data["fingerprint"])[0]) == trace_data["count"]
+
+
+def test_new_log_is_added_to_the_counts(scope, session, tmp_path):
+    session_root_path, stack_traces_data, log_checkpoints, data = session
+    with open(os.path.join(DATA_DIR, "trace_edge_cases.log"), 'rb') as f:
+        added_data = f.read()
+    added_path = str(tmp_path / "worker.log")
+    with open(added_path, 'wb') as f:
+        f.write(added_data)
+    assert scope.appended_log_start(log_checkpoints["server.log"], added_path) is None
+    copy_path = os.path.join(session_root_path, scope.SESSION_LOGS_SUBDIR, "worker.log")
+    result = scope.analyze_added_log(added_path, copy_path)
+    scope.add_analysis_results(stack_traces_data, [result], ["worker.log"])
+
+    expected = analyzed_in_one_go(scope, tmp_path, {"server.log": data[:log_checkpoints["server.log"]["offset"]], "worker.log": added_data})
+    assert counts(stack_traces_data) == counts(expected)
+    assert set(scope.session_log_checkpoints(os.path.dirname(copy_path), log_checkpoints)) == {"server.log", "worker.log"}
+
+
+def test_changed_logs_do_not_match_their_checkpoint(scope, session, tmp_path):
+    _, _, log_checkpoints, data = session
+    checkpoint = log_checkpoints["server.log"]
+    path = str(tmp_path / "changed.log")
+    changed = bytearray(data)
+    changed[checkpoint["offset"] - 10] ^= 1  # Rewritten just before the checkpoint
+    with open(path, 'wb') as f:
+        f.write(changed)
+    assert scope.appended_log_start(checkpoint, path) is None
+    with open(path, 'wb') as f:
+        f.write(data[:checkpoint["offset"] - 1])  # Truncated
+    assert scope.appended_log_start(checkpoint, path) is None
+
+    compressed_path = str(tmp_path / "server.log.gz")
+    with gzip.open(compressed_path, 'wb') as f:
+        f.write(data)
+    compressed_checkpoint = scope.log_checkpoint(compressed_path)
+    assert compressed_checkpoint["compressed"]
+    assert scope.appended_log_start(compressed_checkpoint, compressed_path) == os.path.getsize(compressed_path)
+    shutil.copyfile(compressed_path, path)
+    with open(path, 'ab') as f:
+        f.write(gzip.compress(b"appended\n"))  # A second gzip member
+    assert scope.appended_log_start(compressed_checkpoint, path) is None
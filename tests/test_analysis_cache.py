@@ -0,0 +1,86 @@
+"""Checks when analyze_log_file_cached reuses a cached result, and which entries the cache evicts."""
+import os
+import shutil
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def cache_entries(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_cache_miss_then_hit(scope, tmp_path, monkeypatch):
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_DIR", str(tmp_path / "cache"))
+    log_path = str(tmp_path / "server.log")
+    shutil.copyfile(os.path.join(DATA_DIR, "trino_seed1.log"), log_path)
+    definitions_key = scope.analysis_definitions_key()
+    expected = scope.analyze_log_file(log_path)
+
+    first_occurrences = str(tmp_path / "first" / "server.log@0.occ")
+    assert scope.analyze_log_file_cached(log_path, None, definitions_key, first_occurrences) == expected
+    entries = cache_entries(scope.ANALYSIS_CACHE_DIR)
+    assert [os.path.splitext(name)[1] for name in entries] == [".json", ".occ"]
+
+    def analyze_log_file(*args, **kwargs):
+        raise AssertionError("cached log analyzed again")
+    with monkeypatch.context() as patch:
+        patch.setattr(scope, "analyze_log_file", analyze_log_file)
+        second_occurrences = str(tmp_path / "second" / "server.log@0.occ")
+        assert scope.analyze_log_file_cached(log_path, None, definitions_key, second_occurrences) == expected
+    with open(first_occurrences, 'rb') as first, open(second_occurrences, 'rb') as second:
+        assert first.read() == second.read()
+    assert cache_entries(scope.ANALYSIS_CACHE_DIR) == entries
+
+
+def test_cache_misses_when_log_or_key_changes(scope, tmp_path, monkeypatch):
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_KEY_SPAN", 1024)  # The log is larger than the quick key covers
+    log_path = str(tmp_path / "server.log")
+    shutil.copyfile(os.path.join(DATA_DIR, "trino_seed1.log"), log_path)
+    definitions_key = scope.analysis_definitions_key()
+    scope.analyze_log_file_cached(log_path, None, definitions_key)
+
+    analyzed = []
+    analyze_log_file = scope.analyze_log_file
+    monkeypatch.setattr(scope, "analyze_log_file", lambda *args, **kwargs: analyzed.append(args[0]) or analyze_log_file(*args, **kwargs))
+    scope.analyze_log_file_cached(log_path, None, definitions_key)
+    assert analyzed == []
+
+    scope.analyze_log_file_cached(log_path, None, "other definitions")
+    assert analyzed == [log_path]
+    with monkeypatch.context() as patch:
+        patch.setattr(scope, "ANALYSIS_EXTRACTOR_VERSION", scope.ANALYSIS_EXTRACTOR_VERSION + 1)
+        scope.analyze_log_file_cached(log_path, None, definitions_key)
+    assert len(analyzed) == 2
+
+    # Same size, first and last KiB, but a trace in the middle is renamed
+    with open(log_path, 'r+b') as f:
+        data = f.read()
+        middle = data.index(b"Exception", len(data) // 2)
+        f.seek(middle)
+        f.write(b"Exceptiom")
+    assert scope.analyze_log_file_cached(log_path, None, definitions_key) == analyze_log_file(log_path)
+    assert len(analyzed) == 3
+
+
+def test_eviction_removes_least_recently_used_entries(scope, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_MAX_BYTES", 1800)
+    # Entries used at times 1 to 5, each a 500 byte result and a 100 byte occurrence segment
+    for used, name in enumerate(["c", "a", "kept", "e", "b"], 1):
+        for extension, size in ((".json", 500), (".occ", 100)):
+            path = cache_dir / (name + extension)
+            path.write_bytes(b"x" * size)
+            os.utime(path, (used, used if extension == ".json" else 0))  # An entry was last used when its newest file was
+
+    scope._evict_analysis_cache("kept")
+    assert cache_entries(str(cache_dir)) == ["b.json", "b.occ", "e.json", "e.occ", "kept.json", "kept.occ"]
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_MAX_BYTES", 1300)
+    scope._evict_analysis_cache("kept")
+    assert cache_entries(str(cache_dir)) == ["b.json", "b.occ", "kept.json", "kept.occ"]
+
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_MAX_BYTES", 0)
+    scope._evict_analysis_cache("kept")
+    assert cache_entries(str(cache_dir)) == ["kept.json", "kept.occ"]
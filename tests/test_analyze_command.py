@@ -0,0 +1,52 @@
+"""Runs the headless analyze command on tests/data in a subprocess and checks its output."""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(REPO_DIR, "tests", "data")
+# Runs the script as __main__, then reports whether tkinter was imported on the last line of stderr
+RUN_AND_REPORT_TKINTER = """
+import runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+finally:
+    print("tkinter imported:", "tkinter" in sys.modules, file=sys.stderr)
+"""
+
+
+def run_scope(tmp_path, *args):
+    """Runs Scope in tmp_path, which gets the exception definitions it reads from the working directory."""
+    shutil.copyfile(os.path.join(REPO_DIR, "exceptions_data.json"), tmp_path / "exceptions_data.json")
+    return subprocess.run([sys.executable, "-c", RUN_AND_REPORT_TKINTER, os.path.join(REPO_DIR, "Scope Concept Code.py"), *args],
+                          cwd=str(tmp_path), capture_output=True, text=True, timeout=300,
+                          env={**os.environ, "SCOPE_ANALYSIS_CACHE_DIR": str(tmp_path / "cache")})
+
+
+def test_analyze_command_writes_sessions_without_tkinter(scope, exception_definitions, tmp_path, monkeypatch):
+    output_dir = tmp_path / "sessions"
+    completed = run_scope(tmp_path, "analyze", DATA_DIR, "--output-dir", str(output_dir), "--jsonl", "-", "--workers", "1")
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stderr.splitlines()[-1] == "tkinter imported: False"
+
+    monkeypatch.setattr(scope, "exception_definitions", exception_definitions)
+    stack_traces_data, _, _ = scope.analyze_log_bundle(DATA_DIR)
+    records = [json.loads(line) for line in completed.stdout.splitlines()]
+    assert {record["stack_trace"]: record["count"] for record in records} == \
+        {trace_content: trace_data["count"] for trace_content, trace_data in stack_traces_data.items()}
+    assert {record["session_name"] for record in records} == {"data"}
+    with open(output_dir / "data" / scope.SESSION_DATA_FILENAME, encoding="utf-8") as f:
+        assert json.load(f)["stack_traces_data"] == stack_traces_data
+    with open(tmp_path / scope.SESSIONS_INDEX_FILE, encoding="utf-8") as f:
+        assert json.load(f) == {"data": str(output_dir / "data")}
+
+
+def test_analyze_command_fails_on_a_missing_bundle(scope, tmp_path):
+    completed = run_scope(tmp_path, "analyze", str(tmp_path / "missing"), "--output-dir", str(tmp_path / "sessions"), "--no-register")
+    assert completed.returncode == 1
+    assert "FAILED" in completed.stderr
+    assert completed.stderr.splitlines()[-1] == "tkinter imported: False"
+    assert not os.path.exists(tmp_path / scope.SESSIONS_INDEX_FILE)
@@ -0,0 +1,78 @@
+"""Compresses the logs in tests/data in every supported format and checks they give the traces of the uncompressed logs."""
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CORPORA = ["trino_seed1.log", "trace_edge_cases.log"]
+
+
+def read_corpus(name):
+    with open(os.path.join(DATA_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def compress(compression, data):
+    if compression == "gzip":
+        return gzip.compress(data)
+    if compression == "bz2":
+        return bz2.compress(data)
+    if compression == "xz":
+        return lzma.compress(data)
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def scanned_traces(scope, data):
+    return list(scope.iter_stack_traces(scope._MappedLogLines(data, scope._AnalysisProgress())))
+
+
+@pytest.mark.parametrize("corpus", CORPORA)
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz", "zstd"])
+def test_compressed_log_gives_traces_of_uncompressed_log(scope, tmp_path, corpus, compression):
+    data = read_corpus(corpus)
+    path = str(tmp_path / (corpus + "." + compression))
+    with open(path, 'wb') as f:
+        f.write(compress(compression, data))
+    assert scope.detect_log_compression(path) == compression
+    lines = scope._CompressedLogLines(path, compression, scope._AnalysisProgress())
+    assert list(scope.iter_stack_traces(lines)) == scanned_traces(scope, data)
+
+    plain_path = str(tmp_path / corpus)
+    with open(plain_path, 'wb') as f:
+        f.write(data)
+    assert scope.analyze_log_file(path) == scope.analyze_log_file(plain_path)
+
+
+@pytest.mark.parametrize("compress_type", [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_zip_members_follow_each_other(scope, tmp_path, compress_type):
+    path = str(tmp_path / "logs.zip")
+    with zipfile.ZipFile(path, 'w', compress_type) as archive:
+        archive.writestr("logs/", b"")
+        for corpus in CORPORA:
+            archive.writestr("logs/" + corpus, read_corpus(corpus))
+        archive.writestr("logs/plugin.jar", b"PK not a log")  # Archives other than compressed logs are skipped
+    assert scope.detect_log_compression(path) == "zip"
+
+    with open(path, 'rb') as f:
+        assert [(member_name, stream.read()) for member_name, stream in scope._iter_decompressed_streams(f, "zip")] == \
+            [("logs/" + corpus, read_corpus(corpus)) for corpus in CORPORA]
+    lines = scope._CompressedLogLines(path, "zip", scope._AnalysisProgress())
+    assert list(scope.iter_stack_traces(lines)) == scanned_traces(scope, b"".join(read_corpus(corpus) for corpus in CORPORA))
+
+
+def test_concatenated_gzip_members(scope, tmp_path):
+    data = read_corpus("trino_seed1.log")
+    middle = data.index(b"\n", len(data) // 2) + 1
+    path = str(tmp_path / "server.log.gz")
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(data[:middle]) + gzip.compress(data[middle:]))
+    with open(path, 'rb') as f:
+        assert [stream.read() for _, stream in scope._iter_decompressed_streams(f, "gzip")] == [data]
+    lines = scope._CompressedLogLines(path, "gzip", scope._AnalysisProgress())
+    assert list(scope.iter_stack_traces(lines)) == scanned_traces(scope, data)
@@ -0,0 +1,76 @@
+"""Exports session folders in each archive format and unpacks them again."""
+import os
+import random
+import shutil
+import zipfile
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def make_session_folder(scope, session_root_path):
+    """Fills session_root_path with what a session folder holds: logs (one that deflates well and one
+    that doesn't), session files, an occurrence segment, an empty file and folder, and a log index."""
+    logs_subdir = os.path.join(session_root_path, scope.SESSION_LOGS_SUBDIR)
+    os.makedirs(logs_subdir)
+    shutil.copy(os.path.join(DATA_DIR, "trino_seed1.log"), logs_subdir)
+    with open(os.path.join(logs_subdir, "random.bin"), 'wb') as f:
+        f.write(random.Random(3).randbytes(300 * 1024))
+    with open(os.path.join(logs_subdir, "empty.log"), 'wb'):
+        pass
+    os.makedirs(os.path.join(session_root_path, "notes", "attachments"))
+    with open(os.path.join(session_root_path, scope.SESSION_DATA_FILENAME), 'w', encoding='utf-8') as f:
+        f.write('{"session_name": "Séance", "stack_traces_data": {}}')
+    with open(os.path.join(session_root_path, scope.SESSION_LOG_INDEX_FILENAME), 'wb') as f:
+        f.write(b"rebuilt on import")
+    scope.analyze_log_file(os.path.join(logs_subdir, "trino_seed1.log"),
+                           occurrences_path=scope.occurrence_segment_path(session_root_path, "trino_seed1.log"))
+
+
+def folder_contents(root):
+    contents = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        relative_dir = os.path.relpath(dir_path, root)
+        for name in dir_names:
+            contents[os.path.normpath(os.path.join(relative_dir, name))] = None
+        for name in file_names:
+            with open(os.path.join(dir_path, name), 'rb') as f:
+                contents[os.path.normpath(os.path.join(relative_dir, name))] = f.read()
+    return contents
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "zip_store"])
+def test_zip_export_round_trip(scope, tmp_path, archive_format):
+    session_root_path = str(tmp_path / "session")
+    make_session_folder(scope, session_root_path)
+    archive_path = str(tmp_path / "session.zip")
+
+    scope.export_session_archive(session_root_path, archive_path, archive_format, workers=2)
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.testzip() is None
+        compress_types = {info.filename: info.compress_type for info in archive.infolist()}
+    unpacked_path = str(tmp_path / "unpacked")
+    scope.unpack_session_archive(archive_path, unpacked_path)
+
+    expected = folder_contents(session_root_path)
+    del expected[scope.SESSION_LOG_INDEX_FILENAME]
+    assert folder_contents(unpacked_path) == expected
+    assert not os.path.exists(archive_path + ".part")
+    assert compress_types["logs/random.bin"] == zipfile.ZIP_STORED
+    assert compress_types["logs/trino_seed1.log"] == (zipfile.ZIP_DEFLATED if archive_format == "zip" else zipfile.ZIP_STORED)
+
+
+def test_tar_zst_export_round_trip(scope, tmp_path):
+    pytest.importorskip("zstandard")
+    session_root_path = str(tmp_path / "session")
+    make_session_folder(scope, session_root_path)
+    archive_path = str(tmp_path / "session.tar.zst")
+
+    scope.export_session_archive(session_root_path, archive_path, "tar.zst", workers=2)
+    unpacked_path = str(tmp_path / "unpacked")
+    scope.unpack_session_archive(archive_path, unpacked_path)
+
+    expected = folder_contents(session_root_path)
+    del expected[scope.SESSION_LOG_INDEX_FILENAME]
+    assert folder_contents(unpacked_path) == expected
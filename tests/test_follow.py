@@ -0,0 +1,83 @@
+"""Feeds logs to the follow mode in arbitrary pieces and checks it finds what a scan of the whole log finds."""
+import os
+import random
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MULTIBYTE_RECORD = ("2024-03-05T12:00:09.000Z\tERROR\tdispatcher-7\tio.trino.server.Coordinator\tTâche refusée\n"
+                    "java.lang.IllegalStateException: état invalide pour 日本語のクエリ\n"
+                    "\tat io.trino.execution.SqlQueryManager.createQuery(SqlQueryManager.java:251)\n"
+                    "\tat io.trino.dispatcher.LocalDispatchQuery.startExecution(LocalDispatchQuery.java:150)\n").encode("utf-8")
+
+
+class _AddedTraces:
+    """Stands in for _TraceGroups, keeping the traces added in order."""
+
+    def __init__(self):
+        self.traces = []
+
+    def add(self, trace_content):
+        self.traces.append(trace_content)
+        return str(len(self.traces))
+
+
+def read_log(newline):
+    with open(os.path.join(DATA_DIR, "trino_seed1.log"), 'rb') as f:
+        data = f.read()
+    middle = data.index(b"\n20", len(data) // 2) + 1
+    return (data[:middle] + MULTIBYTE_RECORD + data[middle:]).replace(b"\n", newline)
+
+
+def split_points(data, rng):
+    """Random cuts, plus ones inside a multibyte character and between a CR and its LF."""
+    cuts = {rng.randrange(1, len(data)) for _ in range(200)}
+    cuts.add(data.index("日".encode("utf-8")) + 1)
+    cuts.add(data.index(b"\r\n") + 1 if b"\r\n" in data else 1)
+    return sorted(cuts) + [len(data)]
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+def test_appended_pieces_give_the_traces_of_the_whole_log(scope, newline):
+    data = read_log(newline)
+    expected = list(scope.iter_stack_traces(scope._MappedLogLines(data, scope._AnalysisProgress())))
+    assert any("日本語" in trace_content for trace_content in expected)
+    added = _AddedTraces()
+    pending = b""
+    position = 0
+    for cut in split_points(data, random.Random(21)):
+        pending += data[position:cut]
+        position = cut
+        pending = pending[scope.extract_appended_traces(pending, added, final=position == len(data)):]
+    assert pending == b""
+    assert added.traces == expected
+
+
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+def test_followed_log_matches_analysis_of_the_whole_log(scope, tmp_path, newline):
+    data = read_log(newline)
+    whole_path = str(tmp_path / "whole.log")
+    with open(whole_path, 'wb') as f:
+        f.write(data)
+    trace_groups, _ = scope.analyze_log_file(whole_path)
+
+    log_path = str(tmp_path / "server.log")
+    copy_path = str(tmp_path / "copy.log")
+    for path in (log_path, copy_path):
+        open(path, 'wb').close()
+    follower = scope.LogFollower(log_path, copy_path)
+    counts = {}
+    position = 0
+    for cut in split_points(data, random.Random(22)):
+        with open(log_path, 'ab') as f:
+            f.write(data[position:cut])
+        position = cut
+        for _ in range(1 if position < len(data) else scope.FOLLOW_SETTLE_POLLS + 1):
+            result = follower.poll()
+            for fingerprint, group in (result[0] if result else {}).items():
+                counts[fingerprint] = counts.get(fingerprint, 0) + group[1]
+    follower.close()
+
+    assert counts == {fingerprint: group[1] for fingerprint, group in trace_groups.items()}
+    with open(copy_path, 'rb') as f:
+        assert f.read() == data
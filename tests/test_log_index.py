@@ -0,0 +1,138 @@
+"""Checks SessionLogIndex searches against a scan of every line, and the blocks the index narrows a search to."""
+import contextlib
+import os
+import random
+import shutil
+import sqlite3
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+UNICODE_LINES = ("2024-03-05T12:00:09.000Z\tERROR\tdispatcher-7\tio.trino.server.Coordinator\tTâche refusée\n"
+                 "java.lang.IllegalStateException: ÉTAT invalide pour 日本語のクエリ\r\n"
+                 "\tat io.trino.execution.SqlQueryManager.createQuery(SqlQueryManager.java:251)\n").encode("utf-8")
+
+
+@pytest.fixture
+def session_root(scope, tmp_path, monkeypatch):
+    monkeypatch.setattr(scope, "LOG_INDEX_BLOCK_SIZE", 4096)  # Many blocks, so there is something to narrow down
+    logs_dir = tmp_path / scope.SESSION_LOGS_SUBDIR
+    logs_dir.mkdir()
+    shutil.copyfile(os.path.join(DATA_DIR, "trino_seed1.log"), logs_dir / "coordinator.log")
+    with open(os.path.join(DATA_DIR, "trace_edge_cases.log"), 'rb') as f:
+        (logs_dir / "worker.log").write_bytes(f.read() + UNICODE_LINES)
+    return str(tmp_path)
+
+
+def index_logs(scope, session_root):
+    index = scope.SessionLogIndex(session_root)
+    for name in sorted(os.listdir(index.logs_dir)):
+        index.extend(os.path.join(index.logs_dir, name))
+    return index
+
+
+def expected_hits(logs_dir, query, max_hits):
+    """Every line that contains query, ignoring case."""
+    hits = []
+    for name in sorted(os.listdir(logs_dir)):
+        with open(os.path.join(logs_dir, name), 'rb') as f:
+            for line_number, line in enumerate(f.read().split(b"\n"), 1):
+                text = line.decode('utf-8', errors='replace').rstrip("\r")
+                if query.lower() in text.lower():
+                    hits.append((name, line_number, text))
+    return hits[:max_hits]
+
+
+def search_queries(logs_dir, rng, count):
+    """Pieces of log lines cut at any character, some with their case flipped."""
+    lines = []
+    for name in sorted(os.listdir(logs_dir)):
+        with open(os.path.join(logs_dir, name), 'rb') as f:
+            lines += [line for line in f.read().decode('utf-8').split("\n") if line.strip()]
+    queries = ["exception", "EXCEPTION", "Caused by: ", "état", "ÉTAT INVALIDE", "日本語", "TÂCHE REFUSÉE", "no such text"]
+    for _ in range(count):
+        line = rng.choice(lines)
+        start = rng.randrange(len(line))
+        query = line[start:start + rng.randint(1, 40)]
+        queries.append(query.swapcase() if rng.random() < 0.3 else query)
+    return queries
+
+
+def test_search_matches_line_scan(scope, session_root):
+    index = index_logs(scope, session_root)
+    for query in search_queries(index.logs_dir, random.Random(13), 200):
+        assert index.search(query, max_hits=100000) == expected_hits(index.logs_dir, query, 100000), query
+    assert index.search("exception", max_hits=7) == expected_hits(index.logs_dir, "exception", 7)
+
+
+def test_search_without_trigram_index(scope, session_root, monkeypatch):
+    index = index_logs(scope, session_root)
+    monkeypatch.setattr(scope.SessionLogIndex, "_create_token_trigrams", staticmethod(lambda connection: False))
+    for query in search_queries(index.logs_dir, random.Random(14), 50):
+        assert index.search(query, max_hits=100000) == expected_hits(index.logs_dir, query, 100000), query
+
+
+def test_candidates_are_the_blocks_containing_the_query_tokens(scope, session_root):
+    index = index_logs(scope, session_root)
+    with contextlib.closing(index._connect()) as connection:
+        block_count = connection.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+        query_id = "20240305_120004_73837_zpxdo"
+        for query in [query_id, query_id[5:], query_id[:-3], query_id[4:-4], " " + query_id + " "]:
+            candidates = scope._log_search_candidates(connection, query)
+            candidate_count = sum(len(block_numbers) for block_numbers in candidates.values())
+            assert 1 <= candidate_count < block_count / 10, query
+            assert scope._log_search_candidates(connection, query, has_trigrams=False) == candidates, query
+        assert scope._log_search_candidates(connection, "no_such_token_anywhere") == {}
+        assert scope._log_search_candidates(connection, " " + query_id[6:]) == {}  # Has to start a token
+        assert scope._log_search_candidates(connection, query_id[:-3] + " ") == {}  # Has to end one
+        assert scope._log_search_candidates(connection, "ab") is None  # Too short to look up as a substring
+        assert scope._log_search_candidates(connection, "!?") is None
+
+
+def test_index_built_before_the_trigram_index(scope, session_root):
+    index = index_logs(scope, session_root)
+    with contextlib.closing(sqlite3.connect(index.db_path)) as connection, connection:
+        connection.executescript("DROP TABLE token_trigrams; DROP TRIGGER vocabulary_added; DROP TABLE vocabulary;")
+    for query in ["73837_zpx", "xception: ", "QueryManager.java"]:
+        assert index.search(query, max_hits=100000) == expected_hits(index.logs_dir, query, 100000), query
+
+
+def test_extend_indexes_appended_lines(scope, session_root):
+    index = scope.SessionLogIndex(session_root)
+    path = os.path.join(index.logs_dir, "coordinator.log")
+    with open(path, 'rb') as f:
+        data = f.read()
+    first_part = data.index(b"\n", len(data) // 2) + 1
+    with open(path, 'wb') as f:
+        f.write(data[:first_part])
+    index.extend(path)
+    with contextlib.closing(index._connect()) as connection:
+        first_blocks = connection.execute("SELECT * FROM blocks ORDER BY block_number").fetchall()
+    assert index.append_point(path, first_part) == len(first_blocks)
+    assert index.append_point(path, first_part - 1) is None
+
+    with open(path, 'ab') as f:
+        f.write(data[first_part:])
+    index.extend(path)
+    with contextlib.closing(index._connect()) as connection:
+        blocks = connection.execute("SELECT * FROM blocks ORDER BY block_number").fetchall()
+    assert blocks[:len(first_blocks)] == first_blocks  # Only the appended lines were indexed
+    assert blocks[-1][2] + blocks[-1][3] == len(data)
+    for query in search_queries(index.logs_dir, random.Random(15), 50):
+        assert index.search(query, max_hits=100000) == expected_hits(index.logs_dir, query, 100000), query
+
+
+def test_extend_after_a_partial_line_indexes_the_log_again(scope, session_root):
+    index = scope.SessionLogIndex(session_root)
+    path = os.path.join(index.logs_dir, "coordinator.log")
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 2])  # Ends in the middle of a line
+    index.extend(path)
+    assert index.append_point(path, len(data) // 2) is None
+    with open(path, 'wb') as f:
+        f.write(data)
+    index.extend(path)
+    for query in search_queries(index.logs_dir, random.Random(16), 50):
+        assert index.search(query, max_hits=100000) == expected_hits(index.logs_dir, query, 100000), query
@@ -0,0 +1,150 @@
+"""Writes and reads occurrence segments, and checks the occurrences an analysis records."""
+import array
+import io
+import math
+import os
+import random
+import re
+import struct
+import sys
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def test_occurrence_segment_round_trip(scope, tmp_path):
+    recorder = scope._OccurrenceRecorder()
+    occurrences = {"fp-a": [(0, 1, 1709640000.5), (4096, 80, None), (2 ** 40, 2 ** 31, 0.0)],
+                   "fp-b": [(17, 2, None)],
+                   "fp-é": [(18, 3, 1709640001.0)]}
+    for fingerprint, rows in occurrences.items():
+        for row in rows:
+            recorder.add(fingerprint, *row)
+    path = scope.occurrence_segment_path(str(tmp_path), "server log #1.log", 100)
+    recorder.write(path, 100, 5000, 321)
+
+    segment = scope.OccurrenceSegment(path)
+    assert (segment.start, segment.end, segment.lines, segment.count) == (100, 5000, 321, 5)
+    for fingerprint, rows in occurrences.items():
+        offsets, line_numbers, timestamps = segment.read(fingerprint)
+        assert list(offsets) == [row[0] for row in rows]
+        assert list(line_numbers) == [row[1] for row in rows]
+        assert [None if math.isnan(timestamp) else timestamp for timestamp in timestamps] == [row[2] for row in rows]
+    assert segment.read("fp-missing") is None
+    assert scope.occurrence_lines_before(os.path.dirname(path), "server log #1.log", 5000) == 321
+    assert scope.occurrence_lines_before(os.path.dirname(path), "server log #1.log", 4999) is None
+
+
+def test_occurrence_segment_in_other_byte_order(scope, tmp_path):
+    recorder = scope._OccurrenceRecorder()
+    recorder.add("fp", 123456789, 42, 1709640000.25)
+    path = scope.occurrence_segment_path(str(tmp_path), "a.log")
+    recorder.write(path, 0, 200, 50)
+    segment = scope.OccurrenceSegment(path)
+    with open(path, 'rb') as f:
+        header_end = segment.column_starts[0]
+        data = f.read()
+    columns = [array.array(typecode) for typecode in segment.typecodes]
+    body = io.BytesIO(data[header_end:])
+    for column in columns:
+        column.fromfile(body, 1)
+        column.byteswap()
+    other_byteorder = "big" if sys.byteorder == "little" else "little"
+    header = data[len(scope.OCCURRENCE_SEGMENT_MAGIC) + 8:header_end].replace(
+        f'"byteorder": "{sys.byteorder}"'.encode(), f'"byteorder": "{other_byteorder}"'.encode())
+    with open(path, 'wb') as f:
+        f.write(scope.OCCURRENCE_SEGMENT_MAGIC + struct.pack("<II", scope.OCCURRENCE_SEGMENT_VERSION, len(header)) + header)
+        for column in columns:
+            column.tofile(f)
+
+    offsets, line_numbers, timestamps = scope.OccurrenceSegment(path).read("fp")
+    assert (list(offsets), list(line_numbers), list(timestamps)) == ([123456789], [42], [1709640000.25])
+
+
+def test_analyzed_occurrences_point_at_their_traces(scope, tmp_path):
+    log_path = os.path.join(DATA_DIR, "trino_seed1.log")
+    with open(log_path, 'rb') as f:
+        data = f.read()
+    session_root_path = str(tmp_path)
+    trace_groups, _ = scope.analyze_log_file(log_path, occurrences_path=scope.occurrence_segment_path(session_root_path, "trino_seed1.log"))
+
+    occurrences = scope.SessionOccurrences(session_root_path)
+    assert occurrences.log_names == ["trino_seed1.log"]
+    for fingerprint, (trace_content, count, _) in trace_groups.items():
+        file_ids, offsets, line_numbers, timestamps = occurrences.lookup(fingerprint)
+        assert list(file_ids) == [0] * count
+        assert list(offsets) == sorted(offsets)
+        for offset, line_number, timestamp in zip(offsets, line_numbers, timestamps):
+            line = data[offset:data.index(b"\n", offset)].decode("utf-8")
+            assert trace_content.split("\n")[0].split(":")[0] in line
+            assert line_number == data.count(b"\n", 0, offset) + 1
+            assert not math.isnan(timestamp)
+
+
+def session_occurrences(scope, session_root_path, fingerprints):
+    occurrences = scope.SessionOccurrences(session_root_path)
+    return {fingerprint: [tuple(column) for column in occurrences.lookup(fingerprint)] for fingerprint in fingerprints}
+
+
+def follow_growing_log(scope, follower, log_path, data, rng):
+    """Appends data to log_path in pieces cut at random bytes, polling follower after each, then
+    polls until the log has settled. Returns the trace counts found by fingerprint."""
+    counts = {}
+    position = 0
+    while True:
+        piece_end = min(len(data), position + rng.randint(1, 20000))
+        with open(log_path, 'ab') as f:
+            f.write(data[position:piece_end])
+        position = piece_end
+        for _ in range(1 if position < len(data) else scope.FOLLOW_SETTLE_POLLS + 1):
+            result = follower.poll()
+            for fingerprint, group in (result[0] if result else {}).items():
+                counts[fingerprint] = counts.get(fingerprint, 0) + group[1]
+        if position == len(data):
+            follower.close()
+            return counts
+
+
+def test_followed_log_records_the_occurrences_of_a_full_analysis(scope, tmp_path):
+    log_path = os.path.join(DATA_DIR, "trino_seed1.log")
+    with open(log_path, 'rb') as f:
+        data = f.read()
+    analyzed_root = str(tmp_path / "analyzed")
+    trace_groups, _ = scope.analyze_log_file(log_path, occurrences_path=scope.occurrence_segment_path(analyzed_root, "server.log"))
+
+    followed_root = str(tmp_path / "followed")
+    os.makedirs(os.path.join(followed_root, scope.SESSION_LOGS_SUBDIR))
+    growing_path = str(tmp_path / "server.log")
+    copy_path = os.path.join(followed_root, scope.SESSION_LOGS_SUBDIR, "server.log")
+    for path in (growing_path, copy_path):
+        open(path, 'wb').close()
+    follower = scope.LogFollower(growing_path, copy_path, session_root_path=followed_root)
+    counts = follow_growing_log(scope, follower, growing_path, data, random.Random(11))
+
+    assert counts == {fingerprint: group[1] for fingerprint, group in trace_groups.items()}
+    assert session_occurrences(scope, followed_root, trace_groups) == session_occurrences(scope, analyzed_root, trace_groups)
+    segments = scope._occurrence_segments(os.path.join(followed_root, scope.OCCURRENCES_SUBDIR))
+    assert [(log_name, start) for log_name, start, _ in segments] == [("server.log", 0)]
+    assert scope.occurrence_lines_before(os.path.join(followed_root, scope.OCCURRENCES_SUBDIR), "server.log", len(data)) == data.count(b"\n")
+
+
+def test_log_followed_in_place_from_its_checkpoint(scope, tmp_path):
+    with open(os.path.join(DATA_DIR, "trino_seed1.log"), 'rb') as f:
+        data = f.read()
+    analyzed_root = str(tmp_path / "analyzed")
+    full_log_path = str(tmp_path / "full.log")
+    with open(full_log_path, 'wb') as f:
+        f.write(data)
+    trace_groups, _ = scope.analyze_log_file(full_log_path, occurrences_path=scope.occurrence_segment_path(analyzed_root, "server.log"))
+
+    session_root_path = str(tmp_path / "session")
+    log_path = os.path.join(session_root_path, scope.SESSION_LOGS_SUBDIR, "server.log")
+    os.makedirs(os.path.dirname(log_path))
+    # Cut after an INFO record without a trace that is followed by another record, so no trace runs into the cut
+    start = re.compile(rb"\n\d{4}-[^\n]*\tINFO\t(?:(?!Error|Exception|Warning|Throwable)[^\n])*\n(?=\d{4}-)").search(data, len(data) // 3).end()
+    with open(log_path, 'wb') as f:
+        f.write(data[:start])
+    scope.analyze_log_file(log_path, occurrences_path=scope.occurrence_segment_path(session_root_path, "server.log"))
+    follower = scope.LogFollower(log_path, log_path, start, session_root_path)
+    follow_growing_log(scope, follower, log_path, data[start:], random.Random(12))
+
+    assert session_occurrences(scope, session_root_path, trace_groups) == session_occurrences(scope, analyzed_root, trace_groups)
@@ -0,0 +1,56 @@
+"""Checks PackageKeyIndex against the loop it replaced, on the shipped definitions and overlapping keys."""
+import os
+import random
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def baseline_longest_package_key(definitions, name):
+    """The loop process_stack_traces_for_dashboard used to find a trace's log_package_key."""
+    best_log_package_key = None
+    longest_pkg_match_len = 0
+    for defined_key, def_data in definitions.items():
+        if "." in defined_key and "weighting" not in def_data:
+            if defined_key in name:
+                if len(defined_key) > longest_pkg_match_len:
+                    best_log_package_key = defined_key
+                    longest_pkg_match_len = len(defined_key)
+    return best_log_package_key
+
+
+def package_key_definitions(exception_definitions):
+    """The shipped definitions, plus package keys that contain, overlap and tie with each other."""
+    definitions = dict(exception_definitions)
+    for key in ["io.trino", "io.trino.spi", "trino.spi.Trino", "spi.TrinoException", "java.io", "a.b", "b.c", "a.b.c",
+                "x.yz", "xy.z", "net.Socket"]:
+        definitions.setdefault(key, {"definition": key})
+    definitions["java.lang.Weighted"] = {"definition": "not a package key", "weighting": 3}
+    return definitions
+
+
+def test_package_key_index_matches_longest_match_loop(scope, exception_definitions):
+    definitions = package_key_definitions(exception_definitions)
+    index = scope.PackageKeyIndex(definitions)
+    package_keys = [key for key, def_data in definitions.items() if "." in key and "weighting" not in def_data]
+
+    names = ["io.trino.spi.TrinoException", "java.lang.Weighted", "a.b.c.d", "xy.z", "x.yz", "xy.zException", "Exception", ""]
+    for corpus in ["trino_seed1.log", "trace_edge_cases.log"]:
+        with open(os.path.join(DATA_DIR, corpus), encoding="utf-8") as f:
+            trace_contents = list(scope.iter_stack_traces(f))
+        for trace_content in trace_contents:
+            match = scope.FULL_EXCEPTION_NAME_PATTERN.search(trace_content)
+            if match:
+                names.append(match.group(0))
+    rng = random.Random(7)
+    for _ in range(2000):
+        parts = [rng.choice(package_keys)[rng.randrange(3):] for _ in range(rng.randint(1, 3))]
+        names.append(rng.choice([".", "", "$"]).join(parts) + rng.choice(["", "Exception", ".FooError"]))
+
+    for name in names:
+        assert index.longest_match(name) == baseline_longest_package_key(definitions, name), name
+
+
+def test_package_key_index_prefers_earliest_key_on_ties(scope):
+    definitions = {"x.yz": {"definition": ""}, "xy.z": {"definition": ""}}
+    assert scope.PackageKeyIndex(definitions).longest_match("x.yz xy.z") == "x.yz"
+    assert scope.PackageKeyIndex(dict(reversed(definitions.items()))).longest_match("x.yz xy.z") == "xy.z"
@@ -0,0 +1,54 @@
+"""Runs a profiled analysis and checks the stages PipelineProfile reports, and how _memory_increase measures a stage."""
+import json
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+ANALYZE_COMMAND_STAGES = ["read", "copy", "extraction", "occurrences", "classification", "cache_write", "aggregation", "json_dump"]
+
+
+def test_profiled_analysis_reports_every_stage(scope, exception_definitions, tmp_path, monkeypatch):
+    # The command loads the definitions itself; the module's are restored afterwards
+    monkeypatch.setattr(scope, "exception_definitions", exception_definitions)
+    monkeypatch.setattr(scope, "EXCEPTION_DEFINITIONS_FILE", os.path.join(os.path.dirname(os.path.dirname(DATA_DIR)), "exceptions_data.json"))
+    monkeypatch.setattr(scope, "ANALYSIS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+    output_dir = str(tmp_path / "sessions")
+    assert scope.run_analyze_command([DATA_DIR, "--output-dir", output_dir, "--copy-logs", "--no-register", "--workers", "1"]) == 0
+
+    with open(os.path.join(output_dir, "data", scope.ANALYSIS_PROFILE_FILENAME), encoding="utf-8") as f:
+        runs = json.load(f)
+    assert len(runs) == 1
+    assert runs[0]["task"] == "analyze_command"
+    assert runs[0]["total_seconds"] >= 0
+    stages = runs[0]["stages"]
+    assert list(stages) == ANALYZE_COMMAND_STAGES
+    for name, stage in stages.items():
+        assert stage["seconds"] >= 0 and stage["bytes"] >= 0, name
+        assert stage["memory_increase_mb"] is None or stage["memory_increase_mb"] >= 0, name
+        assert stage["runs"] == (1 if name in ("aggregation", "json_dump") else len(os.listdir(DATA_DIR))), name
+    log_bytes = sum(os.path.getsize(os.path.join(DATA_DIR, name)) for name in os.listdir(DATA_DIR))
+    assert stages["copy"]["bytes"] == stages["extraction"]["bytes"] == log_bytes
+
+
+def test_stage_memory_increase_with_tracemalloc(scope, monkeypatch):
+    monkeypatch.setattr(scope, "PROFILE_TRACEMALLOC", True)
+    profile = scope.PipelineProfile()
+    with profile.stage("extraction", 10) as metrics:
+        allocated = bytearray(8 * 1024 * 1024)
+        metrics["bytes"] = 20
+    del allocated
+    with profile.stage("extraction"):
+        pass
+    stage = profile.stages["extraction"]
+    assert stage["runs"] == 2 and stage["bytes"] == 20 and stage["seconds"] >= 0
+    assert stage["memory_increase"] >= 8 * 1024 * 1024  # The largest of the two runs
+
+
+def test_memory_increase_from_rss_samples(scope, monkeypatch):
+    monkeypatch.setattr(scope, "PROFILE_TRACEMALLOC", False)
+    assert scope._memory_increase((100, 500), (300, 800)) == 700  # Set a new peak: up to the peak
+    assert scope._memory_increase((100, 500), (300, 500)) == 200  # Below the old peak: up to the RSS at its end
+    assert scope._memory_increase((300, 500), (100, 500)) == 0  # Freed more than it allocated
+    assert scope._memory_increase((100, None), (250, None)) == 150  # No peak RSS on this platform
+    assert scope._memory_increase((None, 500), (None, 900)) == 400  # No current RSS on this platform
+    assert scope._memory_increase((None, None), (None, None)) is None
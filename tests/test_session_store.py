@@ -0,0 +1,81 @@
+"""Migrates a JSON session to the SQLite store and checks that saving it again only writes the rows that changed."""
+import contextlib
+import os
+import sqlite3
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+@pytest.fixture
+def migrated_session(scope, tmp_path, monkeypatch):
+    """A session of the logs in tests/data saved by the JSON store, then migrated. Returns (store, session folder, JSON session data)."""
+    monkeypatch.chdir(tmp_path)  # The JSON session index is kept in the working directory
+    base_dir = str(tmp_path / "sessions")
+    session_root_path = os.path.join(base_dir, "incident")
+    os.makedirs(session_root_path)
+    stack_traces_data, _, failures = scope.analyze_log_bundle(DATA_DIR)
+    assert not failures
+    session_data = {"session_name": "incident", "notes": "Notes", "files_path": session_root_path,
+                    "stack_traces_data": stack_traces_data, "current_selected_stack_trace_content": next(iter(stack_traces_data))}
+    scope.JsonSessionStore().save(session_root_path, session_data)
+    db_path = str(tmp_path / "sessions.db")
+    assert scope.migrate_json_sessions_to_sqlite(db_path, base_dir) == ["incident"]
+    return scope.SqliteSessionStore(db_path), session_root_path, scope.JsonSessionStore().load(session_root_path)
+
+
+def stored_rows(db_path):
+    with contextlib.closing(sqlite3.connect(db_path)) as connection:
+        return (connection.execute("SELECT * FROM traces ORDER BY id").fetchall(),
+                connection.execute("SELECT * FROM occurrences ORDER BY trace_id, log_file").fetchall())
+
+
+def test_migrated_session_loads_as_saved(migrated_session):
+    store, session_root_path, json_data = migrated_session
+    session_data = store.load(session_root_path, trace_contents=True)
+    assert session_data["stack_traces_data"] == json_data["stack_traces_data"]
+    assert session_data["current_selected_stack_trace_content"] == json_data["current_selected_stack_trace_content"]
+    assert session_data["notes"] == "Notes"
+
+
+def test_saving_an_edited_trace_changes_only_its_row(migrated_session):
+    store, session_root_path, _ = migrated_session
+    traces_before, occurrences_before = stored_rows(store.db_path)
+    session_data = store.load(session_root_path)
+    trace_id = traces_before[len(traces_before) // 2][0]
+    assert all(isinstance(trace_key, int) for trace_key in session_data["stack_traces_data"])
+    session_data["stack_traces_data"][trace_id]["selected_for_investigation"] = True
+    store.save(session_root_path, session_data)
+
+    traces_after, occurrences_after = stored_rows(store.db_path)
+    assert occurrences_after == occurrences_before
+    changed_rows = [(before, after) for before, after in zip(traces_before, traces_after) if before != after]
+    assert len(traces_after) == len(traces_before)
+    assert [after[0] for _, after in changed_rows] == [trace_id]
+    assert store.load(session_root_path)["stack_traces_data"][trace_id]["selected_for_investigation"]
+
+
+def test_saving_traces_keyed_by_content_reads_their_rows_at_once(scope, migrated_session, monkeypatch):
+    store, session_root_path, json_data = migrated_session
+    traces_before, occurrences_before = stored_rows(store.db_path)
+    trace_content, trace_data = next(iter(json_data["stack_traces_data"].items()))
+    log_file = next(iter(trace_data["log_files"]))
+    trace_data["log_files"][log_file] += 1
+
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        connection = connect(*args, **kwargs)
+        connection.set_trace_callback(statements.append)
+        return connection
+    monkeypatch.setattr(scope.sqlite3, "connect", traced_connect)
+    store.save(session_root_path, json_data)
+
+    assert len([statement for statement in statements if statement.startswith("SELECT id, content FROM traces")]) == 1
+    traces_after, occurrences_after = stored_rows(store.db_path)
+    assert traces_after == traces_before
+    changed_occurrences = [row for row in occurrences_after if row not in occurrences_before]
+    trace_id = next(row[0] for row in traces_before if row[2] == trace_content)
+    assert changed_occurrences == [(trace_id, log_file, trace_data["log_files"][log_file])]
@@ -0,0 +1,64 @@
+"""Checks the stack trace parser against the regular expression it replaced.
+
+The corpora in tests/data are checked in so every run parses the same bytes:
+trino_seed1.log is `python benchmarks/generate_logs.py 128K tests/data/trino_seed1.log --seed 1`,
+and trace_edge_cases.log is 3,000 lines drawn with random.Random(2) from lines that sit on the
+boundaries of the old pattern (bare "at", dates, "LEVEL:" prefixes, "))" closers, names glued to
+other text). Both are small enough for the old pattern to parse in a fraction of a second.
+"""
+import io
+import os
+import re
+
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CORPORA = ["trino_seed1.log", "trace_edge_cases.log"]
+
+# stack_trace_pattern of extract_stack_traces before it was replaced by iter_stack_traces
+BASELINE_STACK_TRACE_PATTERN = re.compile(
+    r"(?:Traceback \(most recent call last\):[\s\S]*?(?=\n(?:[A-Z]+:\s+\S+|\d{4}-\d{2}-\d{2})|\Z)"
+    r"|\b(?:[a-zA-Z_][a-zA-Z0-9_]*\.)*[a-zA-Z_][a-zA-Z0-9_]*(?:Error|Exception|Warning|Throwable|RuntimeException)(?=[:\s\n]|$)(?:.*?\n)*?(?=\n(?!(?:\s*at\s+|Caused by:|^\s*\.\.\.\s+\d+\s+more\s*$))(?=\S+)|^\s*(?:[A-Z]+:\s+\S+|\d{4}-\d{2}-\d{2})|^\s*\)\s*\}\s*$|^\s*\)\s*\)\s*$|\Z))",
+    re.MULTILINE | re.DOTALL
+)
+
+
+def read_corpus(name):
+    with open(os.path.join(DATA_DIR, name), 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("corpus", CORPORA)
+def test_iter_stack_traces_matches_baseline_pattern(scope, corpus):
+    text = read_corpus(corpus).decode("utf-8")
+    expected = BASELINE_STACK_TRACE_PATTERN.findall(text)
+    assert expected
+    assert list(scope.iter_stack_traces(io.StringIO(text))) == expected
+
+
+@pytest.mark.parametrize("corpus", CORPORA)
+@pytest.mark.parametrize("newline", [b"\n", b"\r\n"])
+def test_mapped_log_lines_match_baseline_pattern(scope, corpus, newline):
+    # The old code read logs in text mode, so CRLF logs were parsed with LF line ends
+    data = read_corpus(corpus)
+    expected = BASELINE_STACK_TRACE_PATTERN.findall(data.decode("utf-8"))
+    lines = scope._MappedLogLines(data.replace(b"\n", newline), scope._AnalysisProgress())
+    assert list(scope.iter_stack_traces(lines)) == expected
+
+
+def test_mapped_log_lines_from_offset(scope):
+    data = read_corpus("trino_seed1.log")
+    start = data.index(b"\n", len(data) // 2) + 1
+    expected = BASELINE_STACK_TRACE_PATTERN.findall(data[start:].decode("utf-8"))
+    lines = scope._MappedLogLines(data, scope._AnalysisProgress(), start, 0)
+    assert list(scope.iter_stack_traces(lines)) == expected
+
+
+def test_trace_starts_point_at_trace_lines(scope):
+    data = read_corpus("trace_edge_cases.log")
+    trace_starts = []
+    for trace_content in scope.iter_stack_traces(scope._MappedLogLines(data, scope._AnalysisProgress()), trace_starts):
+        line_start = trace_starts[-1]
+        assert line_start == 0 or data[line_start - 1:line_start] == b"\n"
+        line_end = data.find(b"\n", line_start)
+        assert trace_content.split("\n")[0] in data[line_start:line_end].decode("utf-8")
@@ -0,0 +1,49 @@
+"""Checks which traces DEFAULT_TRACE_NORMALIZATION_RULES put in the same _TraceGroups group."""
+import pytest
+
+TRACE_TEMPLATE = ("io.trino.spi.TrinoException: Query {query_id} failed at {timestamp} on {thread}\n"
+                  "\tat io.trino.execution.QueryStateMachine.transitionToFailed(QueryStateMachine.java:1021)\n"
+                  "\tat {frame}\n"
+                  "\t... {more} more\n"
+                  "Caused by: java.net.SocketTimeoutException: Read timed out after {millis} ms\n")
+FRAME = "io.trino.execution.SqlQueryExecution.start(SqlQueryExecution.java:412)"
+OTHER_FRAME = "io.trino.execution.SqlQueryExecution.planDistribution(SqlQueryExecution.java:498)"
+
+
+def trace(query_id="20240305_120004_73837_zpxdo", timestamp="2024-03-05T12:00:04.342Z", thread="dispatcher-query-12",
+          frame=FRAME, more=17, millis=1200000):
+    return TRACE_TEMPLATE.format(query_id=query_id, timestamp=timestamp, thread=thread, frame=frame, more=more, millis=millis)
+
+
+@pytest.fixture
+def default_rules(scope, monkeypatch):
+    monkeypatch.setattr(scope, "trace_normalization_rules", scope.compile_trace_normalization_rules(scope.DEFAULT_TRACE_NORMALIZATION_RULES))
+
+
+def test_traces_differing_in_ids_timestamps_and_frame_counts_are_grouped(scope, default_rules):
+    variants = [trace(),
+                trace(query_id="20240306_083015_00001_abcde"),
+                trace(timestamp="2024-03-06 08:30:15,001+01:00"),
+                trace(more=4),
+                trace(millis=3600000),
+                trace(query_id="20240307_000000_99999_zzzzz", timestamp="2024-03-07T00:00:00Z", more=123)]
+    trace_groups = scope._TraceGroups()
+    fingerprints = {trace_groups.add(trace_content) for trace_content in variants + variants[:2]}
+    assert len(fingerprints) == 1
+    assert list(trace_groups.groups.values()) == [[variants[0], len(variants) + 2, {scope._trace_digest(variant) for variant in variants}]]
+
+
+def test_traces_with_different_frames_are_not_grouped(scope, default_rules):
+    trace_groups = scope._TraceGroups()
+    assert trace_groups.add(trace()) != trace_groups.add(trace(frame=OTHER_FRAME))
+    assert trace_groups.add(trace(query_id="20240306_083015_00001_abcde")) == trace_groups.add(trace(more=3))
+    assert [group[1] for group in trace_groups.groups.values()] == [3, 1]
+    assert scope.fingerprint_stack_trace("java.io.IOException: disk full") != scope.fingerprint_stack_trace("java.io.IOException: disk failed")
+    assert scope.fingerprint_stack_trace("java.lang.Exception: 12345") != scope.fingerprint_stack_trace("java.lang.Exception: 12346")  # Short numbers are kept
+
+
+def test_normalized_trace(scope, default_rules):
+    assert scope.normalize_stack_trace(trace()) == TRACE_TEMPLATE.format(
+        query_id="<query_id>", timestamp="<timestamp>", thread="dispatcher-query-12", frame=FRAME, more="<n>", millis="<n>")
+    assert scope.normalize_stack_trace("pool-3-thread-17 0x7f3a2c uuid 123e4567-e89b-12d3-a456-426614174000 at Obj@1a2b3c4d") == \
+        "pool-<n> <hex> uuid <uuid> at Obj@<hex>"
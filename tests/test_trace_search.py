@@ -0,0 +1,70 @@
+"""Checks TraceSearchIndex against the case-insensitive substring test the trace list used before it."""
+import os
+import random
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def corpus_traces(scope):
+    traces = []
+    for name in ["trino_seed1.log", "trace_edge_cases.log"]:
+        with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+            traces += scope.iter_stack_traces(f)
+    return list(dict.fromkeys(traces))
+
+
+def expected_matches(traces, term):
+    return {trace_index for trace_index, trace_content in enumerate(traces) if term and term.lower() in trace_content.lower()}
+
+
+def search_terms(traces, rng, count):
+    """Substrings of the traces, some with their case flipped, typed out one character at a time."""
+    terms = ["", "\0", "exception", "EXCEPTION", "at io.trino", "no such text anywhere", "İ", "i̇stanbul"]
+    for _ in range(count):
+        trace_content = rng.choice(traces)
+        start = rng.randrange(len(trace_content))
+        term = trace_content[start:start + rng.randint(1, 30)]
+        term = term.swapcase() if rng.random() < 0.3 else term
+        terms += [term[:length] for length in range(1, len(term) + 1)]
+        terms.append(term[:len(term) // 2])  # Backspacing widens the search again
+    return terms
+
+
+def test_search_matches_substring_test(scope):
+    traces = corpus_traces(scope) + ["İstanbulError: dotted capital", "Straße Exception", "ﬁle Exception"]
+    index = scope.TraceSearchIndex(traces)
+    for term in search_terms(traces, random.Random(5), 300):
+        assert index.search(term) == expected_matches(traces, term), term
+
+
+def test_search_after_adding_traces(scope):
+    traces = corpus_traces(scope)
+    rng = random.Random(6)
+    index = scope.TraceSearchIndex(traces[:10])
+    added = traces[:10]
+    for batch_start in range(10, len(traces), 40):
+        for term in search_terms(added, rng, 5):
+            assert index.search(term) == expected_matches(added, term), term
+        batch = traces[batch_start:batch_start + 40]
+        index.add(batch)
+        added += batch
+    for term in search_terms(added, rng, 50):
+        assert index.search(term) == expected_matches(added, term), term
+
+
+def test_empty_index(scope):
+    index = scope.TraceSearchIndex([])
+    assert index.search("exception") == set()
+    index.add(["java.io.IOException: x\n\tat a.B(B.java:1)"])
+    assert index.search("ioexception") == {0}
+    assert scope.TraceSearchIndex([""]).search("a") == set()
+
+
+def test_adding_traces_does_not_copy_the_corpus(scope):
+    index = scope.TraceSearchIndex(["java.io.IOException: first"])
+    corpus = index.corpus
+    for trace_number in range(100):
+        index.add([f"java.lang.IllegalStateException: added {trace_number}"])
+    assert index.corpus is corpus
+    assert index.search("added 42") == {43}
+    assert index.search("Exception: ") == set(range(101))
@@ -0,0 +1,38 @@
+"""Checks that write_json_atomic replaces files whole and keeps their permissions."""
+import json
+import os
+import stat
+
+import pytest
+
+
+def test_replaces_file_and_keeps_its_permissions(scope, tmp_path):
+    path = str(tmp_path / "session.json")
+    scope.write_json_atomic(path, {"notes": "first"})
+    os.chmod(path, 0o640)
+    first_inode = os.stat(path).st_ino
+
+    scope.write_json_atomic(path, {"notes": "second"})
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"notes": "second"}
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert os.stat(path).st_ino != first_inode  # A new file was renamed over it
+    assert os.listdir(tmp_path) == ["session.json"]
+
+
+def test_new_file_gets_default_permissions(scope, tmp_path):
+    path = str(tmp_path / "session.json")
+    scope.write_json_atomic(path, [])
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+
+def test_failed_write_leaves_the_old_file(scope, tmp_path):
+    path = str(tmp_path / "session.json")
+    scope.write_json_atomic(path, {"notes": "saved"})
+    with pytest.raises(TypeError):
+        scope.write_json_atomic(path, {"notes": "unsaved", "bad": object()})  # Fails after part of the JSON was written
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"notes": "saved"}
+    assert os.listdir(tmp_path) == ["session.json"]